@@ -0,0 +1,322 @@
+# backtest/busqueda.py
+
+"""
+Módulo: backtest/busqueda.py
+
+Estrategias de búsqueda sobre la grilla de grid_config.py para cuando
+recorrerla completa (mass_test.py en modo grilla) no es viable:
+
+  - aleatoria:     muestreo uniforme sin repetición del espacio completo.
+  - halving:       successive halving; muchas configuraciones se evalúan en
+                   una ventana corta de velas y solo la mejor fracción pasa a
+                   la siguiente ronda, con una ventana más grande.
+  - coordenadas:   descenso por coordenadas; se mejora una dimensión a la vez
+                   dejando fijas las demás hasta que ninguna mejora.
+
+Todas respetan un Presupuesto (evaluaciones y/o segundos). Un punto del
+espacio es un dict con las columnas de parámetros de backtest/resultados.py
+(Symbol, Interval, Total_Candles, RSI_CORTE, ADX_THRESHOLD, DIFERENCIA_DI,
+TP (%), SL (%)); cada resultado agrega las métricas y el LIMITE_DRAWDOWN
+usado, de modo que es directamente una fila del CSV.
+
+Los puntos que comparten velas y umbrales se evalúan juntos (una sola
+evaluación de señales y toda su grilla TP × SL en una pasada).
+"""
+
+import math
+import time
+
+import numpy as np
+
+import grid_config
+from runBacktest import preparar_df, backtest_grilla
+from backtest.resultados import COLUMNAS_PARAMETROS
+
+OBJETIVO = "Rentabilidad (%)"
+
+# Valores máximos a probar por dimensión en cada vuelta de coordenadas
+MAX_VALORES_COORDENADA = 16
+
+
+class Presupuesto:
+    """
+    Límite de evaluaciones y/o de tiempo (segundos) para una búsqueda.
+    Sin ninguno de los dos, la búsqueda termina por sí sola.
+    """
+
+    def __init__(self, evaluaciones: int = None, segundos: float = None):
+        self.evaluaciones = evaluaciones
+        self.segundos = segundos
+        self.usadas = 0
+        self.inicio = time.perf_counter()
+
+    def restantes(self):
+        """Evaluaciones disponibles (None si no hay límite de evaluaciones)."""
+        if self.evaluaciones is None:
+            return None
+        return max(self.evaluaciones - self.usadas, 0)
+
+    def agotado(self) -> bool:
+        if self.evaluaciones is not None and self.usadas >= self.evaluaciones:
+            return True
+        if self.segundos is not None and time.perf_counter() - self.inicio >= self.segundos:
+            return True
+        return False
+
+    def consumir(self, n: int = 1):
+        self.usadas += n
+
+
+def espacio_grid_config() -> dict:
+    """Espacio de búsqueda {columna clave: valores} tomado de grid_config.py."""
+    return {
+        "Symbol": list(grid_config.SYMBOL_LIST),
+        "Interval": list(grid_config.INTERVAL_LIST),
+        "Total_Candles": list(grid_config.TOTAL_CANDLES_LIST),
+        "RSI_CORTE": list(grid_config.RSI_CORTE_LIST),
+        "ADX_THRESHOLD": list(grid_config.ADX_THRESHOLD_LIST),
+        "DIFERENCIA_DI": list(grid_config.DIFERENCIA_DI_LIST),
+        "TP (%)": list(grid_config.TP_LIST),
+        "SL (%)": list(grid_config.SL_LIST),
+    }
+
+
+def tamano_espacio(espacio: dict) -> int:
+    """Cantidad total de puntos (combinaciones) del espacio."""
+    return math.prod(len(v) for v in espacio.values())
+
+
+def _punto(espacio: dict, indice: int) -> dict:
+    """Decodifica un índice plano (orden de itertools.product) en un punto."""
+    punto = {}
+    for columna in reversed(COLUMNAS_PARAMETROS):
+        valores = espacio[columna]
+        indice, resto = divmod(indice, len(valores))
+        punto[columna] = valores[resto]
+    return {c: punto[c] for c in COLUMNAS_PARAMETROS}
+
+
+def _clave(punto: dict) -> tuple:
+    return tuple(punto[c] for c in COLUMNAS_PARAMETROS)
+
+
+def evaluar_puntos(puntos: list, base, fraccion: float = 1.0) -> list:
+    """
+    Ejecuta el backtest de cada punto.
+
+    Parámetros:
+        puntos   (list[dict]): Puntos del espacio (columnas de parámetros).
+        base     (Parametros): Resto de parámetros (DIAS_TEST, capital, límite
+                               de drawdown, …).
+        fraccion (float)     : Parte final de la ventana de DIAS_TEST a usar
+                               (1.0 = ventana completa).
+
+    Retorna:
+        list[dict|None]: Métricas + columnas de parámetros + LIMITE_DRAWDOWN
+                         por punto, en el mismo orden; None si no hubo datos
+                         para ese punto.
+    """
+    grupos = {}
+    for n, punto in enumerate(puntos):
+        clave = _clave(punto)[:6]
+        grupos.setdefault(clave, []).append(n)
+
+    salida = [None] * len(puntos)
+    for (symbol, interval, total, rsi, adx, dif), miembros in grupos.items():
+        df = preparar_df(symbol, interval, total, base.DIAS_TEST)
+        if df.empty:
+            continue
+        if fraccion < 1:
+            df = df.iloc[-max(2, int(len(df) * fraccion)):]
+
+        tp_list = sorted({puntos[n]["TP (%)"] for n in miembros})
+        sl_list = sorted({puntos[n]["SL (%)"] for n in miembros})
+        p = base._replace(RSI_CORTE=rsi, ADX_THRESHOLD=adx, DIFERENCIA_DI=dif)
+        metricas = backtest_grilla(df, p, tp_list, [-abs(sl) for sl in sl_list])
+
+        for n in miembros:
+            punto = puntos[n]
+            k = tp_list.index(punto["TP (%)"]) * len(sl_list) + sl_list.index(punto["SL (%)"])
+            salida[n] = {**metricas[k], **punto, "LIMITE_DRAWDOWN": base.LIMITE_DRAWDOWN}
+    return salida
+
+
+def _ordenar(resultados: list, objetivo: str) -> list:
+    return sorted((r for r in resultados if r is not None), key=lambda r: r[objetivo], reverse=True)
+
+
+def busqueda_aleatoria(base, presupuesto: Presupuesto, espacio: dict = None,
+                       semilla: int = None, tam_lote: int = 64,
+                       objetivo: str = OBJETIVO) -> list:
+    """
+    Muestreo uniforme sin repetición hasta agotar el presupuesto (o el espacio).
+
+    Retorna:
+        list[dict]: Resultados evaluados, de mejor a peor según `objetivo`.
+    """
+    espacio = espacio or espacio_grid_config()
+    total = tamano_espacio(espacio)
+    rng = np.random.default_rng(semilla)
+    vistos = set()
+    resultados = []
+
+    while not presupuesto.agotado() and len(vistos) < total:
+        cupo = presupuesto.restantes()
+        n = min(tam_lote, total - len(vistos), cupo if cupo is not None else tam_lote)
+        lote = []
+        while len(lote) < n:
+            indice = int(rng.integers(total))
+            if indice not in vistos:
+                vistos.add(indice)
+                lote.append(_punto(espacio, indice))
+        resultados.extend(evaluar_puntos(lote, base))
+        presupuesto.consumir(len(lote))
+
+    return _ordenar(resultados, objetivo)
+
+
+def successive_halving(base, presupuesto: Presupuesto, espacio: dict = None,
+                       configuraciones: int = None, eta: int = 3, rondas: int = 3,
+                       semilla: int = None, objetivo: str = OBJETIVO) -> list:
+    """
+    Successive halving sobre ventanas de datos crecientes.
+
+    La ronda r evalúa los sobrevivientes en la parte final de la ventana de
+    DIAS_TEST de tamaño eta**(r - rondas + 1) (p. ej. 1/9, 1/3 y completa con
+    eta=3, rondas=3) y conserva el mejor 1/eta para la siguiente.
+
+    La ronda con la ventana completa siempre se reserva: si las evaluaciones
+    restantes no alcanzan para la ronda siguiente y las posteriores, se pasa
+    directo a la ventana completa con los mejores sobrevivientes; si se acaba
+    el tiempo, la ronda final se ejecuta igual con los que el calendario le
+    habría dejado (puede exceder --segundos en lo que dure esa ronda).
+
+    Parámetros:
+        configuraciones (int): Puntos de la primera ronda. Por defecto se
+                               deduce del presupuesto de evaluaciones (o 243).
+        eta             (int): Factor de reducción entre rondas.
+        rondas          (int): Cantidad de rondas (la última usa toda la ventana).
+
+    Retorna:
+        list[dict]: Resultados de la última ronda alcanzada, de mejor a peor;
+                    cada uno con "Ventana" (fracción de velas usada).
+    """
+    espacio = espacio or espacio_grid_config()
+    if configuraciones is None:
+        if presupuesto.evaluaciones is not None:
+            costo = sum(eta ** -r for r in range(rondas))
+            configuraciones = max(eta, int(presupuesto.evaluaciones / costo))
+        else:
+            configuraciones = eta ** 5
+    configuraciones = min(configuraciones, tamano_espacio(espacio))
+
+    rng = np.random.default_rng(semilla)
+    indices = rng.choice(tamano_espacio(espacio), size=configuraciones, replace=False)
+    vivos = [_punto(espacio, int(i)) for i in indices]
+    ultimos = []
+
+    for r in range(rondas):
+        cupo = presupuesto.restantes()
+        if not vivos or cupo == 0:
+            break
+        faltan = rondas - 1 - r             # rondas posteriores a esta
+        if faltan and presupuesto.agotado():
+            if not ultimos:
+                break
+            # Sin tiempo: solo la ronda final, con los que le habrían llegado
+            vivos = vivos[:max(1, len(vivos) // eta ** faltan)]
+            faltan = 0
+        elif faltan and cupo is not None and cupo < _costo_rondas(len(vivos), eta, faltan + 1):
+            # No alcanza para esta ronda y las siguientes: directo a la ventana completa
+            faltan = 0
+        fraccion = float(eta) ** -faltan
+        if cupo is not None:
+            vivos = vivos[:cupo]
+
+        evaluados = _ordenar(evaluar_puntos(vivos, base, fraccion), objetivo)
+        presupuesto.consumir(len(vivos))
+        for fila in evaluados:
+            fila["Ventana"] = fraccion
+        ultimos = evaluados
+        print(f"🔎 Ronda {r + 1}/{rondas}: {len(vivos)} configuraciones, ventana {fraccion:.0%}, "
+              f"mejor {objetivo}={evaluados[0][objetivo] if evaluados else float('nan'):.2f}")
+
+        if not faltan:
+            break
+        conservar = max(1, len(evaluados) // eta)
+        vivos = [{c: fila[c] for c in COLUMNAS_PARAMETROS} for fila in evaluados[:conservar]]
+
+    return ultimos
+
+
+def _costo_rondas(n: int, eta: int, rondas: int) -> int:
+    """Evaluaciones de `rondas` rondas de halving que empiezan con n configuraciones."""
+    return sum(max(1, n // eta ** r) for r in range(rondas))
+
+
+def descenso_coordenadas(base, presupuesto: Presupuesto, espacio: dict = None,
+                         inicio: dict = None, max_valores: int = MAX_VALORES_COORDENADA,
+                         objetivo: str = OBJETIVO) -> list:
+    """
+    Descenso por coordenadas: en cada vuelta recorre las dimensiones y mueve
+    el punto actual al mejor valor de esa dimensión (las demás fijas). Termina
+    cuando una vuelta completa no mejora o se agota el presupuesto.
+
+    En dimensiones con muchos valores (p. ej. Total_Candles) cada vuelta
+    prueba como máximo `max_valores` valores espaciados más los vecinos del
+    valor actual, de modo que el paso se va refinando.
+
+    Parámetros:
+        inicio (dict): Punto inicial; por defecto, el valor central de cada lista.
+
+    Retorna:
+        list[dict]: Todos los resultados evaluados, de mejor a peor.
+    """
+    espacio = espacio or espacio_grid_config()
+    actual = dict(inicio) if inicio else {c: v[len(v) // 2] for c, v in espacio.items()}
+    memoria = {}
+
+    def evaluar(puntos):
+        nuevos = [p for p in puntos if _clave(p) not in memoria]
+        cupo = presupuesto.restantes()
+        if cupo is not None:
+            nuevos = nuevos[:cupo]
+        for punto, fila in zip(nuevos, evaluar_puntos(nuevos, base)):
+            memoria[_clave(punto)] = fila
+        presupuesto.consumir(len(nuevos))
+
+    def valor(punto):
+        fila = memoria.get(_clave(punto))
+        return fila[objetivo] if fila is not None else -math.inf
+
+    evaluar([actual])
+    mejora = True
+    while mejora and not presupuesto.agotado():
+        mejora = False
+        for columna in COLUMNAS_PARAMETROS:
+            if presupuesto.agotado():
+                break
+            valores = espacio[columna]
+            if len(valores) < 2:
+                continue
+            paso = max(1, math.ceil(len(valores) / max_valores))
+            pos = valores.index(actual[columna])
+            posiciones = set(range(0, len(valores), paso))
+            posiciones.update(q for q in (pos - paso, pos - 1, pos + 1, pos + paso) if 0 <= q < len(valores))
+            candidatos = [{**actual, columna: valores[q]} for q in sorted(posiciones)]
+
+            evaluar(candidatos)
+            mejor = max(candidatos, key=valor)
+            if valor(mejor) > valor(actual):
+                actual = mejor
+                mejora = True
+                print(f"🔎 {columna}={actual[columna]} → {objetivo}={valor(actual):.2f}")
+
+    return _ordenar(memoria.values(), objetivo)
+
+
+ESTRATEGIAS = {
+    "aleatoria": busqueda_aleatoria,
+    "halving": successive_halving,
+    "coordenadas": descenso_coordenadas,
+}
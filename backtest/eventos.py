@@ -0,0 +1,85 @@
+# backtest/eventos.py
+
+"""
+Módulo: backtest/eventos.py
+
+Sumideros de eventos para los bucles de backtest.
+
+Los bucles ya no imprimen directamente: emiten registros estructurados
+(dicts con "tipo" + datos: fecha, lado, precio, saldo, …) a un sumidero con
+un nivel de detalle:
+
+  - SILENCIO    (0): no se emite nada.
+  - OPERACIONES (1): entradas, cierres y resumen final.
+  - VELAS       (2): además, cada confirmación parcial y cada vela con
+                     operación abierta.
+
+El bucle consulta `sumidero.nivel` antes de armar un registro, así que con
+SILENCIO no se construye ni se formatea nada. Solo SumideroConsola formatea
+texto, y únicamente para los registros que recibe.
+"""
+
+SILENCIO = 0
+OPERACIONES = 1
+VELAS = 2
+
+NIVELES = {
+    "silencio": SILENCIO,
+    "operaciones": OPERACIONES,
+    "velas": VELAS,
+}
+
+FORMATO_FECHA = "%Y-%m-%d %H:%M:%S"
+
+
+def nivel_desde_texto(texto: str) -> int:
+    """Convierte "silencio" / "operaciones" / "velas" en su nivel."""
+    try:
+        return NIVELES[texto.lower()]
+    except KeyError:
+        raise ValueError(f"Nivel desconocido: {texto}. Usa uno de: {list(NIVELES)}")
+
+
+class Sumidero:
+    """Sumidero base: descarta todos los registros (nivel SILENCIO)."""
+
+    def __init__(self, nivel: int = SILENCIO):
+        self.nivel = nivel
+
+    def emitir(self, tipo: str, **datos):
+        pass
+
+
+class SumideroLista(Sumidero):
+    """Guarda los registros en `self.registros` (p. ej. para analizarlos luego)."""
+
+    def __init__(self, nivel: int = VELAS):
+        super().__init__(nivel)
+        self.registros = []
+
+    def emitir(self, tipo: str, **datos):
+        datos["tipo"] = tipo
+        self.registros.append(datos)
+
+
+class SumideroConsola(Sumidero):
+    """
+    Imprime cada registro con el formato de su tipo.
+
+    Parámetros:
+        formatos (dict): {tipo: función(registro) -> str}. Los tipos sin
+                         formato se ignoran.
+        nivel    (int) : Nivel de detalle (por defecto VELAS).
+    """
+
+    def __init__(self, formatos: dict, nivel: int = VELAS):
+        super().__init__(nivel)
+        self.formatos = formatos
+
+    def emitir(self, tipo: str, **datos):
+        formato = self.formatos.get(tipo)
+        if formato is not None:
+            print(formato(datos))
+
+
+SILENCIOSO = Sumidero()
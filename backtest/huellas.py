@@ -0,0 +1,151 @@
+# backtest/huellas.py
+
+"""
+Módulo: backtest/huellas.py
+
+Huellas (hashes) de las entradas de una simulación para no repetir trabajo
+en la grilla de mass_test.py.
+
+El resultado de simular_tp_sl depende solo de:
+  - la ventana de velas ya recortada a DIAS_TEST (Open/High/Low),
+  - los arreglos de señales long/short,
+  - CONFIRMACION_AVISO, los niveles TP/SL/apalancamiento, el saldo inicial
+    y el límite de drawdown.
+
+Muchas combinaciones de la grilla producen exactamente esas mismas entradas:
+distintos TOTAL_CANDLES dan la misma ventana una vez cubierto el warm-up de
+los indicadores y distintos DIFERENCIA_DI suelen dar las mismas señales. Con
+la huella de la ventana y la de las señales se reutiliza el resultado ya
+simulado y se cuenta el duplicado.
+
+El registro es una caché en memoria (LRU). Cada resultado son ~13 arreglos
+de largo K (niveles TP × SL), así que el límite es de memoria y no de
+entradas: cuando se supera CACHE_SIMULACIONES_MB (config.py) se descartan
+los menos usados recientemente. Con --paralelo cada proceso tiene la suya.
+"""
+
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+from config import CACHE_SIMULACIONES_MB
+from utils.estrategia import evaluar_senales_lote
+
+_simulaciones = OrderedDict()   # clave -> (resultado de simular_tp_sl, bytes)
+_estado = {
+    "limite": CACHE_SIMULACIONES_MB * 1024 * 1024,
+    "bytes": 0,
+    "simuladas": 0,
+    "reutilizadas": 0,
+    "descartes": 0,
+}
+
+
+def _digest(*arreglos) -> bytes:
+    h = hashlib.blake2b(digest_size=16)
+    for arreglo in arreglos:
+        arreglo = np.ascontiguousarray(arreglo)
+        h.update(str(arreglo.shape).encode())
+        h.update(arreglo.tobytes())
+    return h.digest()
+
+
+def huella_velas(datos) -> bytes:
+    """Huella de la ventana de velas (columnas Open, High y Low)."""
+    return _digest(*(np.asarray(datos[c], dtype=float) for c in ("Open", "High", "Low")))
+
+
+def huella_senales(senal_long: np.ndarray, senal_short: np.ndarray) -> bytes:
+    """Huella de los arreglos de señales (empaquetados a bits)."""
+    return _digest(np.packbits(np.asarray(senal_long, dtype=bool)),
+                   np.packbits(np.asarray(senal_short, dtype=bool)))
+
+
+def clave_simulacion(huella_ventana: bytes, senal_long, senal_short, confirmacion,
+                     tp, sl, apalancamiento, saldo_inicial, saldo_minimo) -> tuple:
+    """Clave que identifica por completo una llamada a simular_tp_sl."""
+    return (
+        huella_ventana,
+        huella_senales(senal_long, senal_short),
+        int(confirmacion),
+        _digest(np.asarray(tp, dtype=float), np.asarray(sl, dtype=float),
+                np.asarray(apalancamiento, dtype=float)),
+        float(saldo_inicial),
+        saldo_minimo,
+    )
+
+
+def obtener(clave: tuple):
+    """Resultado ya simulado para `clave` (cuenta el duplicado) o None."""
+    entrada = _simulaciones.get(clave)
+    if entrada is None:
+        return None
+    _simulaciones.move_to_end(clave)
+    _estado["reutilizadas"] += 1
+    return entrada[0]
+
+
+def guardar(clave: tuple, resultado: dict):
+    """
+    Guarda el resultado de una simulación nueva. Si por sí solo excede el
+    límite de memoria, no se guarda.
+    """
+    _estado["simuladas"] += 1
+    tam = sum(np.asarray(v).nbytes for v in resultado.values())
+    if tam > _estado["limite"]:
+        return
+    if clave in _simulaciones:
+        _estado["bytes"] -= _simulaciones.pop(clave)[1]
+    _simulaciones[clave] = (resultado, tam)
+    _estado["bytes"] += tam
+    _recortar()
+
+
+def _recortar():
+    """Descarta las entradas menos usadas hasta respetar el límite."""
+    while _simulaciones and _estado["bytes"] > _estado["limite"]:
+        _, (_, tam_viejo) = _simulaciones.popitem(last=False)
+        _estado["bytes"] -= tam_viejo
+        _estado["descartes"] += 1
+
+
+def limpiar():
+    """Vacía el registro y reinicia los contadores."""
+    _simulaciones.clear()
+    _estado.update(bytes=0, simuladas=0, reutilizadas=0, descartes=0)
+
+
+def fijar_limite_mb(megabytes: float):
+    """Cambia el límite de memoria y descarta lo que sobre."""
+    _estado["limite"] = int(megabytes * 1024 * 1024)
+    _recortar()
+
+
+def estadisticas() -> dict:
+    """Simulaciones ejecutadas, reutilizadas (duplicados), entradas guardadas, memoria (MB) y descartes."""
+    return {
+        "simuladas": _estado["simuladas"],
+        "reutilizadas": _estado["reutilizadas"],
+        "entradas": len(_simulaciones),
+        "memoria_mb": round(_estado["bytes"] / (1024 * 1024), 2),
+        "descartes": _estado["descartes"],
+    }
+
+
+def huellas_lote(datos, lista_parametros, tam_lote: int) -> list:
+    """
+    Huellas de señales de cada Parametros sobre las mismas velas, evaluando
+    por lotes como backtest_lote pero sin simular (para planificar).
+
+    Retorna:
+        list[tuple]: (huella_senales, CONFIRMACION_AVISO) por Parametros.
+    """
+    salida = []
+    for inicio in range(0, len(lista_parametros), tam_lote):
+        lote = lista_parametros[inicio:inicio + tam_lote]
+        senal_long, senal_short = evaluar_senales_lote(datos, lote)
+        for k, parametros in enumerate(lote):
+            salida.append((huella_senales(senal_long[k], senal_short[k]),
+                           parametros.CONFIRMACION_AVISO))
+    return salida
@@ -0,0 +1,184 @@
+# backtest/libro.py
+
+"""
+Módulo: backtest/libro.py
+
+Libro de operaciones en columnas (arreglos de NumPy) y métricas de
+rendimiento vectorizadas.
+
+Cada operación cerrada registra:
+  - barra_entrada / barra_salida : posiciones de vela.
+  - ts_entrada / ts_salida       : marcas de tiempo (ns UTC, int64).
+  - lado                         : LONG (1) o SHORT (-1).
+  - precio_entrada / precio_salida
+  - pnl_pct                      : P/L de la operación en % (con apalancamiento).
+  - causa                        : CAUSA_TP (1) o CAUSA_SL (2).
+  - saldo                        : saldo (equity) tras el cierre.
+
+El libro se exporta a un .npz (un arreglo por columna) con guardar() y se
+lee con cargar_libro().
+
+Métricas (las que persigue el README):
+  - Profit Factor   : ganancia bruta / pérdida bruta (en USDT).
+  - Sharpe          : media / desvío de pnl_pct por operación (sin anualizar).
+  - Max Drawdown (%): mayor caída del saldo desde su máximo previo.
+  - Exposición (%)  : velas con operación abierta / velas evaluadas.
+
+indicadores_rendimiento trabaja sobre acumulados (sumas, máximos), de modo
+que simular_tp_sl las obtiene para toda una grilla sin guardar operaciones.
+"""
+
+import numpy as np
+import pandas as pd
+
+CAUSA_TP = 1
+CAUSA_SL = 2
+CAUSAS = {CAUSA_TP: "TP", CAUSA_SL: "SL"}
+
+COLUMNAS_LIBRO = {
+    "barra_entrada": np.int64,
+    "barra_salida": np.int64,
+    "ts_entrada": np.int64,
+    "ts_salida": np.int64,
+    "lado": np.int8,
+    "precio_entrada": np.float64,
+    "precio_salida": np.float64,
+    "pnl_pct": np.float64,
+    "causa": np.int8,
+    "saldo": np.float64,
+}
+
+
+class LibroOperaciones:
+    """
+    Libro de operaciones cerradas de un backtest.
+
+    Uso:
+        libro = LibroOperaciones(SALDO_INICIAL)
+        libro.agregar(...)           # una vez por cierre
+        columnas = libro.columnas()  # {columna: np.ndarray}
+    """
+
+    def __init__(self, saldo_inicial: float, total_velas: int = 0):
+        self.saldo_inicial = float(saldo_inicial)
+        self.total_velas = int(total_velas)
+        self._filas = {c: [] for c in COLUMNAS_LIBRO}
+        self._columnas = None
+
+    def __len__(self):
+        return len(self._filas["saldo"]) if self._columnas is None else len(self._columnas["saldo"])
+
+    def agregar(self, barra_entrada, barra_salida, ts_entrada, ts_salida, lado,
+                precio_entrada, precio_salida, pnl_pct, causa, saldo):
+        """Registra una operación cerrada."""
+        if self._columnas is not None:
+            for c, valores in self._columnas.items():
+                self._filas[c] = valores.tolist()
+            self._columnas = None
+        filas = self._filas
+        filas["barra_entrada"].append(barra_entrada)
+        filas["barra_salida"].append(barra_salida)
+        filas["ts_entrada"].append(ts_entrada)
+        filas["ts_salida"].append(ts_salida)
+        filas["lado"].append(lado)
+        filas["precio_entrada"].append(precio_entrada)
+        filas["precio_salida"].append(precio_salida)
+        filas["pnl_pct"].append(pnl_pct)
+        filas["causa"].append(causa)
+        filas["saldo"].append(saldo)
+
+    def columnas(self) -> dict:
+        """{columna: np.ndarray} con el tipo de COLUMNAS_LIBRO."""
+        if self._columnas is None:
+            self._columnas = {c: np.asarray(self._filas[c], dtype=t) for c, t in COLUMNAS_LIBRO.items()}
+            self._filas = {c: [] for c in COLUMNAS_LIBRO}
+        return self._columnas
+
+    def metricas(self) -> dict:
+        """Profit Factor, Sharpe, Max Drawdown (%) y Exposición (%) del libro."""
+        return metricas_libro(self.columnas(), self.saldo_inicial, self.total_velas)
+
+    def a_dataframe(self) -> pd.DataFrame:
+        """Libro como DataFrame (fechas UTC y causa/lado como texto), para inspección."""
+        c = self.columnas()
+        return pd.DataFrame({
+            "entrada": pd.to_datetime(c["ts_entrada"], utc=True),
+            "salida": pd.to_datetime(c["ts_salida"], utc=True),
+            "lado": np.where(c["lado"] == 1, "long", "short"),
+            "precio_entrada": c["precio_entrada"],
+            "precio_salida": c["precio_salida"],
+            "pnl_pct": c["pnl_pct"],
+            "causa": [CAUSAS.get(int(x), "") for x in c["causa"]],
+            "saldo": c["saldo"],
+        })
+
+    def guardar(self, ruta: str):
+        """Exporta el libro a un .npz binario (una entrada por columna)."""
+        np.savez(ruta, saldo_inicial=self.saldo_inicial,
+                 total_velas=self.total_velas, **self.columnas())
+
+
+def cargar_libro(ruta: str) -> LibroOperaciones:
+    """Lee un libro exportado con LibroOperaciones.guardar."""
+    with np.load(ruta) as datos:
+        libro = LibroOperaciones(float(datos["saldo_inicial"]), int(datos["total_velas"]))
+        libro._columnas = {c: datos[c].astype(t) for c, t in COLUMNAS_LIBRO.items()}
+    libro._filas = {c: [] for c in COLUMNAS_LIBRO}
+    return libro
+
+
+def indicadores_rendimiento(ganancia_bruta, perdida_bruta, suma_pnl, suma_pnl2,
+                            operaciones, max_drawdown, velas_expuestas, total_velas) -> dict:
+    """
+    Métricas a partir de acumulados; todos los argumentos pueden ser arreglos
+    (una posición por backtest), así que se calcula una grilla entera a la vez.
+
+    Parámetros:
+        ganancia_bruta, perdida_bruta: Suma de ganancias y de pérdidas (USDT, ≥ 0).
+        suma_pnl, suma_pnl2          : Suma de pnl_pct y de pnl_pct².
+        operaciones                  : Operaciones cerradas.
+        max_drawdown                 : Máxima caída relativa del saldo (0..1).
+        velas_expuestas              : Velas con operación abierta.
+        total_velas                  : Velas evaluadas.
+
+    Retorna:
+        dict: "Profit Factor", "Sharpe", "Max Drawdown (%)", "Exposicion (%)".
+    """
+    ganancia_bruta = np.asarray(ganancia_bruta, dtype=float)
+    perdida_bruta = np.asarray(perdida_bruta, dtype=float)
+    operaciones = np.asarray(operaciones, dtype=float)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        profit_factor = np.where(
+            perdida_bruta > 0, ganancia_bruta / perdida_bruta,
+            np.where(ganancia_bruta > 0, np.inf, np.nan)
+        )
+        media = np.asarray(suma_pnl, dtype=float) / operaciones
+        varianza = np.asarray(suma_pnl2, dtype=float) / operaciones - media ** 2
+        desvio = np.sqrt(np.maximum(varianza, 0))
+        sharpe = np.where(desvio > 1e-12, media / desvio, np.nan)
+        exposicion = np.asarray(velas_expuestas, dtype=float) / np.asarray(total_velas, dtype=float) * 100
+
+    return {
+        "Profit Factor": profit_factor,
+        "Sharpe": sharpe,
+        "Max Drawdown (%)": np.asarray(max_drawdown, dtype=float) * 100,
+        "Exposicion (%)": exposicion,
+    }
+
+
+def metricas_libro(columnas: dict, saldo_inicial: float, total_velas: int) -> dict:
+    """indicadores_rendimiento para un libro (dict de columnas)."""
+    saldo = columnas["saldo"]
+    previo = np.concatenate(([saldo_inicial], saldo[:-1]))
+    ganancia = saldo - previo
+    curva = np.concatenate(([saldo_inicial], saldo))
+    caida = 1 - curva / np.maximum.accumulate(curva)
+    pnl = columnas["pnl_pct"]
+    metricas = indicadores_rendimiento(
+        ganancia[ganancia > 0].sum(), -ganancia[ganancia < 0].sum(),
+        pnl.sum(), (pnl ** 2).sum(), len(saldo), caida.max(),
+        (columnas["barra_salida"] - columnas["barra_entrada"] + 1).sum(),
+        max(total_velas, 1)
+    )
+    return {k: float(v) for k, v in metricas.items()}
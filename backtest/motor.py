@@ -0,0 +1,491 @@
+# backtest/motor.py
+
+"""
+Módulo: backtest/motor.py
+
+Piezas vectorizadas que comparten los simuladores de backtest:
+  - Convertir los arreglos long/short de `evaluar_senales` en una secuencia
+    de eventos (velas con señal) con la longitud de racha de cada uno.
+  - Buscar la vela en la que una señal alcanza CONFIRMACION_AVISO, respetando
+    el reinicio de contadores al cerrar una operación y el enfriamiento
+    (cooldown) por tipo de señal.
+  - Buscar la primera vela que cumple una condición de salida (TP/SL) sin
+    recorrer las velas una a una en Python.
+  - Simular en una sola pasada una grilla completa de niveles TP/SL/
+    apalancamiento sobre las mismas señales (simular_tp_sl).
+
+Reglas de confirmación que se reproducen (las mismas del bucle original):
+  - Cada vela con señal suma 1 al contador de su tipo y pone a 0 el contrario.
+  - Las velas sin señal no modifican los contadores.
+  - Al abrir o cerrar una operación ambos contadores vuelven a 0.
+  - Una señal bloqueada por cooldown se ignora por completo.
+"""
+
+import numpy as np
+
+LONG = 1
+SHORT = -1
+
+# Tamaño inicial del bloque al buscar el primer toque (se duplica en cada vuelta)
+_BLOQUE_INICIAL = 64
+
+
+def nombre_lado(lado: int) -> str:
+    """Devuelve "long" o "short" para el código numérico del lado."""
+    return "long" if lado == LONG else "short"
+
+
+def desplazar(arreglo: np.ndarray) -> np.ndarray:
+    """
+    Desplaza un arreglo booleano una vela hacia adelante: la posición i pasa a
+    contener el valor de i-1 (la primera queda en False). Útil cuando la señal
+    de la vela i se evalúa con los indicadores de la vela anterior.
+    """
+    salida = np.zeros(len(arreglo), dtype=bool)
+    salida[1:] = arreglo[:-1]
+    return salida
+
+
+def _rachas(lados: np.ndarray) -> np.ndarray:
+    """Longitud de la racha de lados iguales que termina en cada posición."""
+    n = len(lados)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    posiciones = np.arange(n)
+    inicio = np.ones(n, dtype=bool)
+    inicio[1:] = lados[1:] != lados[:-1]
+    comienzo = np.maximum.accumulate(np.where(inicio, posiciones, 0))
+    return posiciones - comienzo + 1
+
+
+def preparar_eventos(senal_long: np.ndarray, senal_short: np.ndarray) -> dict:
+    """
+    Comprime las señales por vela en una secuencia de eventos.
+
+    Parámetros:
+        senal_long  (np.ndarray): Booleanos, True donde hay señal LONG.
+        senal_short (np.ndarray): Booleanos, True donde hay señal SHORT.
+
+    Retorna:
+        dict con:
+          - "idx":   índice de vela de cada evento (ascendente).
+          - "lado":  LONG (1) o SHORT (-1) de cada evento.
+          - "racha": eventos consecutivos del mismo lado hasta ese evento.
+    """
+    lado = np.where(senal_long, LONG, np.where(senal_short, SHORT, 0)).astype(np.int8)
+    idx = np.flatnonzero(lado)
+    lados = lado[idx]
+    return {
+        "idx": idx,
+        "lado": lados,
+        "racha": _rachas(lados),
+        "candidatos": {},
+    }
+
+
+def _candidatos(eventos: dict, confirmacion: int) -> np.ndarray:
+    """Eventos cuya racha global ya alcanza `confirmacion` (se cachea por valor)."""
+    cache = eventos["candidatos"]
+    if confirmacion not in cache:
+        cache[confirmacion] = np.flatnonzero(eventos["racha"] >= confirmacion)
+    return cache[confirmacion]
+
+
+def _mascara_bloqueo(idx: np.ndarray, lados: np.ndarray, bloqueos: dict) -> np.ndarray:
+    """True para los eventos ignorados por cooldown ({lado: vela_hasta_exclusiva})."""
+    bloqueado = np.zeros(len(idx), dtype=bool)
+    for lado, hasta in bloqueos.items():
+        bloqueado |= (lados == lado) & (idx < hasta)
+    return bloqueado
+
+
+def _conteos(eventos: dict, p0: int, p1: int, bloqueos: dict = None):
+    """
+    Valor del contador de su propio lado en cada evento p0..p1-1, suponiendo
+    contadores en 0 justo antes de p0. Los eventos bloqueados quedan en 0.
+
+    Retorna:
+        tuple: (cuentas, fin_bloqueo) donde fin_bloqueo es la primera posición
+               de evento posterior a la ventana de cooldown.
+    """
+    idx, lados, racha = eventos["idx"], eventos["lado"], eventos["racha"]
+    cuentas = np.zeros(max(p1 - p0, 0), dtype=np.int64)
+    pw = p0
+    lado_s = cuenta_s = 0
+
+    if bloqueos:
+        fin = int(np.searchsorted(idx, max(bloqueos.values())))
+        pw = min(max(p0, fin), max(p1, p0))
+        if pw > p0:
+            libre = ~_mascara_bloqueo(idx[p0:pw], lados[p0:pw], bloqueos)
+            r = _rachas(lados[p0:pw][libre])
+            cuentas[:pw - p0][libre] = r
+            if r.size:
+                lado_s = lados[p0:pw][libre][-1]
+                cuenta_s = r[-1]
+
+    if p1 > pw:
+        c = np.arange(1, p1 - pw + 1)
+        r = racha[pw:p1]
+        cont = np.minimum(r, c)
+        if lado_s:
+            # La racha que venía de la ventana de cooldown continúa
+            sigue = (lados[pw:p1] == lado_s) & (r >= c)
+            cont[sigue] = c[sigue] + cuenta_s
+        cuentas[pw - p0:] = cont
+
+    return cuentas, pw
+
+
+def buscar_entrada(eventos: dict, desde: int, confirmacion: int, bloqueos: dict = None):
+    """
+    Busca el primer evento, a partir de la vela `desde`, cuyo contador llega a
+    `confirmacion`, con los contadores en 0 justo antes de `desde`.
+
+    Parámetros:
+        eventos      (dict): Resultado de preparar_eventos.
+        desde        (int) : Primera vela a considerar.
+        confirmacion (int) : Señales consecutivas necesarias (CONFIRMACION_AVISO).
+        bloqueos     (dict): Opcional, {lado: vela_hasta} — los eventos de ese
+                             lado anteriores a vela_hasta se ignoran (cooldown).
+
+    Retorna:
+        int|None: Posición del evento confirmado dentro de `eventos`
+                  (la vela es eventos["idx"][pos]) o None si no hay entrada.
+    """
+    confirmacion = max(int(confirmacion), 1)
+    idx, lados, racha = eventos["idx"], eventos["lado"], eventos["racha"]
+    n = len(idx)
+    p0 = int(np.searchsorted(idx, desde))
+    lado_s = cuenta_s = 0
+
+    if bloqueos:
+        fin = max(p0, int(np.searchsorted(idx, max(bloqueos.values()))))
+        if fin > p0:
+            cuentas, _ = _conteos(eventos, p0, fin, bloqueos)
+            llegan = np.flatnonzero(cuentas >= confirmacion)
+            if llegan.size:
+                return p0 + int(llegan[0])
+            libres = np.flatnonzero(cuentas)
+            if libres.size:
+                lado_s = lados[p0 + libres[-1]]
+                cuenta_s = int(cuentas[libres[-1]])
+            p0 = fin
+
+    if p0 >= n:
+        return None
+
+    if lado_s and lados[p0] == lado_s:
+        q = p0 + confirmacion - cuenta_s - 1
+        if q < n and racha[q] >= q - p0 + 1:
+            return q
+
+    candidatos = _candidatos(eventos, confirmacion)
+    k = int(np.searchsorted(candidatos, p0 + confirmacion - 1))
+    return int(candidatos[k]) if k < len(candidatos) else None
+
+
+def detalle_confirmacion(eventos: dict, desde: int, hasta: int, bloqueos: dict = None):
+    """
+    Detalle de los eventos entre las velas [desde, hasta) para poder informar
+    las confirmaciones parciales (mismas reglas que buscar_entrada).
+
+    Retorna:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: (velas, lados, cuentas);
+        una cuenta 0 indica un evento ignorado por cooldown.
+    """
+    idx = eventos["idx"]
+    p0 = int(np.searchsorted(idx, desde))
+    p1 = int(np.searchsorted(idx, hasta))
+    cuentas, _ = _conteos(eventos, p0, p1, bloqueos)
+    return idx[p0:p1], eventos["lado"][p0:p1], cuentas
+
+
+def primer_indice(condicion, desde: int, n: int) -> int:
+    """
+    Primer índice j >= desde (j < n) donde `condicion` es True.
+
+    `condicion(inicio, fin)` debe devolver el arreglo booleano para las velas
+    [inicio, fin). Se evalúa por bloques que crecen al doble, de modo que el
+    costo es proporcional a la duración de la operación y no al total de velas.
+
+    Retorna:
+        int: Índice encontrado o -1 si ninguna vela cumple la condición.
+    """
+    inicio = desde
+    tam = _BLOQUE_INICIAL
+    while inicio < n:
+        fin = min(n, inicio + tam)
+        toque = condicion(inicio, fin)
+        if toque.any():
+            return inicio + int(toque.argmax())
+        inicio = fin
+        tam *= 2
+    return -1
+
+
+def primeros_toques(maximos: np.ndarray, minimos: np.ndarray, desde: int,
+                    nivel_alto: np.ndarray, nivel_bajo: np.ndarray) -> np.ndarray:
+    """
+    Para cada par de niveles, primera vela j >= desde con
+    maximos[j] >= nivel_alto o minimos[j] <= nivel_bajo.
+
+    Trabaja por bloques que crecen al doble: en cada bloque calcula el máximo y
+    el mínimo acumulados (monótonos) y resuelve todos los niveles pendientes
+    con búsquedas binarias, en vez de comparar nivel por vela.
+
+    Parámetros:
+        maximos, minimos       (np.ndarray): Columnas High y Low.
+        desde                  (int)       : Primera vela a revisar.
+        nivel_alto, nivel_bajo (np.ndarray): Un valor por par de niveles.
+
+    Retorna:
+        np.ndarray: Vela del primer toque por par (-1 si nunca se toca).
+    """
+    nivel_alto = np.asarray(nivel_alto, dtype=float)
+    nivel_bajo = np.asarray(nivel_bajo, dtype=float)
+    salida = np.full(nivel_alto.shape, -1, dtype=np.int64)
+    pendientes = np.arange(nivel_alto.size)
+    n = len(maximos)
+    inicio = desde
+    tam = _BLOQUE_INICIAL
+    while inicio < n and pendientes.size:
+        fin = min(n, inicio + tam)
+        techo = np.fmax.accumulate(maximos[inicio:fin])
+        piso = np.fmin.accumulate(minimos[inicio:fin])
+        j_alto = np.searchsorted(techo, nivel_alto[pendientes], side="left")
+        j_bajo = np.searchsorted(-piso, -nivel_bajo[pendientes], side="left")
+        j = np.minimum(j_alto, j_bajo)
+        hay = j < fin - inicio
+        salida[pendientes[hay]] = inicio + j[hay]
+        pendientes = pendientes[~hay]
+        inicio = fin
+        tam *= 2
+    return salida
+
+
+def _niveles(entrada, tp, sl, apalancamiento, lado):
+    """Precios de TP y de SL de una entrada (escalares o arreglos por combinación)."""
+    if lado == LONG:
+        return entrada * (1 + (tp / 100) / apalancamiento), entrada * (1 + (sl / 100) / apalancamiento)
+    return entrada * (1 - (tp / 100) / apalancamiento), entrada * (1 - (sl / 100) / apalancamiento)
+
+
+def _limites(nivel_tp, nivel_sl, lado):
+    """(nivel_alto, nivel_bajo): la operación se cierra en la primera vela con High >= alto o Low <= bajo."""
+    return (nivel_tp, nivel_sl) if lado == LONG else (nivel_sl, nivel_tp)
+
+
+def _elegir(condicion, si, no):
+    """np.where para escalares (sin el costo de crear arreglos)."""
+    return si if condicion else no
+
+
+def _variacion(entrada, nivel_tp, nivel_sl, maximo, minimo, apalancamiento, lado, elegir=np.where):
+    """
+    Variación % (apalancada) de una operación que se cierra en la vela con
+    `maximo` y `minimo`. Si esa vela toca los dos niveles, cuenta el SL.
+    Con escalares se pasa elegir=_elegir.
+    """
+    if lado == LONG:
+        sl_tocado = minimo <= nivel_sl
+    else:
+        sl_tocado = maximo >= nivel_sl
+    precio_salida = elegir(sl_tocado, nivel_sl, nivel_tp)
+    variacion_raw = (precio_salida - entrada) / entrada
+    if lado == SHORT:
+        variacion_raw = -variacion_raw
+    return variacion_raw * 100 * apalancamiento
+
+
+def _cerrar(cuentas: tuple, variacion_pct, velas, mayor=np.maximum, menor=np.minimum) -> tuple:
+    """
+    Aplica una operación cerrada a las cuentas de una o varias combinaciones
+    (saldo, pico, max_drawdown, ganancia_bruta, perdida_bruta, suma_pnl,
+    suma_pnl2, ganadoras, perdedoras, velas_expuestas) y retorna las nuevas.
+    Con escalares se pasa mayor=max, menor=min.
+    """
+    saldo, pico, max_drawdown, ganancia_bruta, perdida_bruta, suma_pnl, suma_pnl2, \
+        ganadoras, perdedoras, velas_expuestas = cuentas
+    ganancia = saldo * (variacion_pct / 100)
+    saldo = saldo + ganancia
+    pico = mayor(pico, saldo)
+    return (
+        saldo, pico, mayor(max_drawdown, 1 - saldo / pico),
+        ganancia_bruta + mayor(ganancia, 0.0), perdida_bruta - menor(ganancia, 0.0),
+        suma_pnl + variacion_pct, suma_pnl2 + variacion_pct * variacion_pct,
+        ganadoras + (variacion_pct > 0), perdedoras + (variacion_pct <= 0), velas_expuestas + velas,
+    )
+
+
+def simular_tp_sl(eventos: dict, apertura: np.ndarray, maximos: np.ndarray,
+                  minimos: np.ndarray, confirmacion: int, tp, sl, apalancamiento,
+                  saldo_inicial: float, desde: int = 1, saldo_minimo: float = None) -> dict:
+    """
+    Simula el backtest intrabar de runBacktest para muchos niveles a la vez.
+
+    Cada combinación k usa tp[k], sl[k] y apalancamiento[k] (se aceptan
+    escalares, que se expanden). Las combinaciones que comparten vela de
+    búsqueda se resuelven juntas: misma entrada y un único primeros_toques
+    para todo el grupo. Si TP y SL se tocan en la misma vela gana el SL.
+
+    Con `saldo_minimo`, una combinación deja de simularse en cuanto su saldo
+    cae por debajo de ese valor (aborto temprano): sus métricas quedan como
+    estaban al momento del corte.
+
+    Parámetros:
+        eventos        (dict)      : Señales ya desplazadas (preparar_eventos).
+        apertura       (np.ndarray): Columna Open (precio de entrada).
+        maximos        (np.ndarray): Columna High.
+        minimos        (np.ndarray): Columna Low.
+        confirmacion   (int)       : CONFIRMACION_AVISO.
+        tp, sl         (array-like): Niveles en % sobre la posición (SL negativo).
+        apalancamiento (array-like): Apalancamiento de cada combinación.
+        saldo_inicial  (float)     : Capital inicial.
+        desde          (int)       : Primera vela a evaluar.
+        saldo_minimo   (float)     : Opcional, saldo bajo el cual se aborta.
+
+    Retorna:
+        dict con arreglos de largo K: "Operaciones", "Longs", "Shorts",
+        "Ganadoras", "Perdedoras", "Saldo Final", "Abortada" y los acumulados
+        de backtest/libro.indicadores_rendimiento ("Ganancia Bruta",
+        "Perdida Bruta", "Suma PnL", "Suma PnL2", "Max Drawdown",
+        "Velas Expuestas").
+    """
+    tp, sl, apalancamiento = (
+        a.ravel().astype(float) for a in
+        np.broadcast_arrays(np.asarray(tp), np.asarray(sl), np.asarray(apalancamiento))
+    )
+    k = tp.size
+    saldo = np.full(k, float(saldo_inicial))
+    operaciones = np.zeros(k, dtype=np.int64)
+    longs = np.zeros(k, dtype=np.int64)
+    shorts = np.zeros(k, dtype=np.int64)
+    ganadoras = np.zeros(k, dtype=np.int64)
+    perdedoras = np.zeros(k, dtype=np.int64)
+
+    posicion = np.full(k, desde, dtype=np.int64)
+    activos = np.ones(k, dtype=bool)
+    abortadas = np.zeros(k, dtype=bool)
+    ganancia_bruta = np.zeros(k)
+    perdida_bruta = np.zeros(k)
+    suma_pnl = np.zeros(k)
+    suma_pnl2 = np.zeros(k)
+    pico = saldo.copy()
+    max_drawdown = np.zeros(k)
+    velas_expuestas = np.zeros(k, dtype=np.int64)
+
+    n = len(maximos)
+
+    # Cuentas que actualiza _cerrar, en su orden
+    cuentas = (saldo, pico, max_drawdown, ganancia_bruta, perdida_bruta, suma_pnl, suma_pnl2,
+               ganadoras, perdedoras, velas_expuestas)
+
+    def continuar_sola(c: int):
+        """
+        Termina la combinación c con escalares, con las mismas reglas
+        (_niveles, _limites, _variacion, _cerrar) que el camino vectorial.
+        Cuando una combinación ya no comparte vela de búsqueda con otras, esto
+        evita el costo fijo de indexar arreglos en cada operación.
+        """
+        tp_c, sl_c, lev_c = float(tp[c]), float(sl[c]), float(apalancamiento[c])
+        propias = tuple(a[c].item() for a in cuentas)
+        lg = sh = 0
+        abortada = False
+        i = int(posicion[c])
+
+        while True:
+            pos = buscar_entrada(eventos, i, confirmacion)
+            if pos is None:
+                break
+            barra_entrada = int(eventos["idx"][pos])
+            lado = int(eventos["lado"][pos])
+            entrada = float(apertura[barra_entrada])
+            nivel_tp, nivel_sl = _niveles(entrada, tp_c, sl_c, lev_c, lado)
+            alto, bajo = _limites(nivel_tp, nivel_sl, lado)
+            barra_salida = primer_indice(lambda a, b: (maximos[a:b] >= alto) | (minimos[a:b] <= bajo),
+                                         barra_entrada + 1, n)
+            if barra_salida < 0:
+                break
+
+            variacion_pct = _variacion(entrada, nivel_tp, nivel_sl, float(maximos[barra_salida]),
+                                       float(minimos[barra_salida]), lev_c, lado, _elegir)
+            propias = _cerrar(propias, variacion_pct, barra_salida - barra_entrada + 1, max, min)
+            if lado == LONG:
+                lg += 1
+            else:
+                sh += 1
+            i = barra_salida + 1
+
+            if saldo_minimo is not None and propias[0] < saldo_minimo:
+                abortada = True
+                break
+
+        for arreglo, valor in zip(cuentas, propias):
+            arreglo[c] = valor
+        operaciones[c] += lg + sh
+        longs[c] += lg
+        shorts[c] += sh
+        abortadas[c] = abortada
+        activos[c] = False
+
+    while activos.any():
+        i = posicion[activos].min()
+        grupo = np.flatnonzero(activos & (posicion == i))
+        if grupo.size == 1:
+            continuar_sola(int(grupo[0]))
+            continue
+
+        pos = buscar_entrada(eventos, int(i), confirmacion)
+        if pos is None:
+            activos[grupo] = False
+            continue
+
+        barra_entrada = int(eventos["idx"][pos])
+        lado = eventos["lado"][pos]
+        entrada = apertura[barra_entrada]
+        nivel_tp, nivel_sl = _niveles(entrada, tp[grupo], sl[grupo], apalancamiento[grupo], lado)
+        salida = primeros_toques(maximos, minimos, barra_entrada + 1, *_limites(nivel_tp, nivel_sl, lado))
+
+        # Las que nunca tocan quedan abiertas al final y no se contabilizan
+        cerradas = salida >= 0
+        activos[grupo[~cerradas]] = False
+        grupo = grupo[cerradas]
+        barra_salida = salida[cerradas]
+        nivel_tp = nivel_tp[cerradas]
+        nivel_sl = nivel_sl[cerradas]
+
+        variacion_pct = _variacion(entrada, nivel_tp, nivel_sl, maximos[barra_salida],
+                                   minimos[barra_salida], apalancamiento[grupo], lado)
+        nuevas = _cerrar(tuple(a[grupo] for a in cuentas), variacion_pct, barra_salida - barra_entrada + 1)
+        for arreglo, valores in zip(cuentas, nuevas):
+            arreglo[grupo] = valores
+
+        operaciones[grupo] += 1
+        if lado == LONG:
+            longs[grupo] += 1
+        else:
+            shorts[grupo] += 1
+
+        posicion[grupo] = barra_salida + 1
+
+        if saldo_minimo is not None:
+            quiebra = grupo[saldo[grupo] < saldo_minimo]
+            abortadas[quiebra] = True
+            activos[quiebra] = False
+
+    return {
+        "Operaciones": operaciones,
+        "Longs": longs,
+        "Shorts": shorts,
+        "Ganadoras": ganadoras,
+        "Perdedoras": perdedoras,
+        "Saldo Final": saldo,
+        "Abortada": abortadas,
+        "Ganancia Bruta": ganancia_bruta,
+        "Perdida Bruta": perdida_bruta,
+        "Suma PnL": suma_pnl,
+        "Suma PnL2": suma_pnl2,
+        "Max Drawdown": max_drawdown,
+        "Velas Expuestas": velas_expuestas,
+    }
@@ -0,0 +1,159 @@
+# backtest/paralelo.py
+
+"""
+Módulo: backtest/paralelo.py
+
+Ejecución de la grilla de mass_test.py en varios núcleos.
+
+  - Las velas preparadas (OHLCV + indicadores, ya recortadas a DIAS_TEST) se
+    publican una sola vez en memoria compartida (multiprocessing.shared_memory);
+    cada proceso de trabajo se adjunta a ese bloque sin copiarlo ni volver a
+    leer el CSV.
+  - Cada tarea recibe un `Parametros` inmutable (utils/parametros.py), así que
+    ningún proceso toca las variables globales de config.py.
+  - Una tarea evalúa un lote de combinaciones de umbrales con toda la grilla
+    TP × SL (runBacktest.backtest_lote), igual que el modo serial.
+  - Si la medición por etapas (utils/tiempos.py) está activa, cada tarea
+    devuelve también sus tiempos y se suman en el proceso principal.
+
+Los resultados se devuelven en el mismo orden en que se enviaron las tareas,
+por lo que coinciden fila por fila con la ejecución serial.
+"""
+
+import os
+from multiprocessing import Pool, resource_tracker, shared_memory
+
+import numpy as np
+
+from runBacktest import backtest_lote, TAM_LOTE_SENALES
+from utils import tiempos
+
+# Bloque de memoria compartida al que está adjunto este proceso de trabajo
+_adjunto = {"nombre": None, "shm": None, "datos": None}
+
+
+def procesos_disponibles() -> int:
+    """Número de procesos por defecto: uno por núcleo de la máquina."""
+    return os.cpu_count() or 1
+
+
+def publicar_velas(df):
+    """
+    Copia las columnas numéricas de df a un bloque de memoria compartida.
+
+    Parámetros:
+        df (pd.DataFrame): Velas con indicadores (índice DatetimeIndex).
+
+    Retorna:
+        tuple: (shm, descriptor). `shm` debe cerrarse y liberarse con
+               liberar_velas cuando termine la grilla; `descriptor` es el
+               dict liviano que viaja a los procesos de trabajo.
+    """
+    columnas = [c for c in df.columns if np.issubdtype(df[c].dtype, np.number)]
+    n = len(df)
+    tam = max(8 * n * (len(columnas) + 1), 1)
+    shm = shared_memory.SharedMemory(create=True, size=tam)
+
+    valores = np.ndarray((len(columnas), n), dtype=np.float64, buffer=shm.buf)
+    for fila, columna in enumerate(columnas):
+        valores[fila] = df[columna].to_numpy(dtype=float)
+    marcas = np.ndarray(n, dtype=np.int64, buffer=shm.buf, offset=8 * n * len(columnas))
+    marcas[:] = df.index.asi8
+
+    descriptor = {"nombre": shm.name, "n": n, "columnas": columnas}
+    return shm, descriptor
+
+
+def liberar_velas(shm):
+    """Cierra y elimina el bloque creado por publicar_velas."""
+    shm.close()
+    shm.unlink()
+
+
+def adjuntar_velas(descriptor: dict) -> dict:
+    """
+    Devuelve {columna: np.ndarray} (vistas de solo lectura sobre la memoria
+    compartida) más "timestamp" con las marcas de tiempo en ns UTC.
+    Cada proceso mantiene adjunto solo el último bloque usado.
+    """
+    if _adjunto["nombre"] == descriptor["nombre"]:
+        return _adjunto["datos"]
+
+    if _adjunto["shm"] is not None:
+        _adjunto["datos"] = None
+        _adjunto["shm"].close()
+
+    shm = shared_memory.SharedMemory(name=descriptor["nombre"])
+    n = descriptor["n"]
+    columnas = descriptor["columnas"]
+    valores = np.ndarray((len(columnas), n), dtype=np.float64, buffer=shm.buf)
+    valores.flags.writeable = False
+    datos = {columna: valores[fila] for fila, columna in enumerate(columnas)}
+    marcas = np.ndarray(n, dtype=np.int64, buffer=shm.buf, offset=8 * n * len(columnas))
+    marcas.flags.writeable = False
+    datos["timestamp"] = marcas
+
+    _adjunto.update(nombre=descriptor["nombre"], shm=shm, datos=datos)
+    return datos
+
+
+def _ejecutar_tarea(tarea):
+    descriptor, lote, tp_list, sl_list, medir = tarea
+    datos = adjuntar_velas(descriptor)
+    if medir is None:
+        return backtest_lote(datos, lote, tp_list, sl_list), None
+    # medir = combinación actual del proceso principal (utils/tiempos.py)
+    tiempos.activar()
+    with tiempos.combinacion(*medir):
+        resultados = backtest_lote(datos, lote, tp_list, sl_list)
+    return resultados, tiempos.extraer()
+
+
+def ejecutar_grilla(pool, df, lista_parametros, tp_list, sl_list):
+    """
+    Evalúa en paralelo cada Parametros de `lista_parametros` sobre las mismas
+    velas, con la grilla TP × SL completa.
+
+    Parámetros:
+        pool             (multiprocessing.Pool): Pool creado con crear_pool.
+        df               (pd.DataFrame)        : Velas preparadas con indicadores.
+        lista_parametros (list[Parametros])    : Una entrada por combinación de umbrales.
+        tp_list, sl_list (list)                : Niveles (SL negativo).
+
+    Retorna:
+        list[list[dict]]: Para cada Parametros, las métricas de backtest_grilla.
+    """
+    if not lista_parametros:
+        return []
+
+    # Lotes pequeños para repartir bien la carga, sin superar TAM_LOTE_SENALES
+    tam = max(1, min(TAM_LOTE_SENALES, len(lista_parametros) // (4 * procesos_disponibles())))
+    lotes = [lista_parametros[i:i + tam] for i in range(0, len(lista_parametros), tam)]
+
+    shm, descriptor = publicar_velas(df)
+    try:
+        medir = tiempos.contexto() if tiempos.activo() else None
+        tareas = [(descriptor, lote, tp_list, sl_list, medir) for lote in lotes]
+        resultados = []
+        for parcial, medido in pool.map(_ejecutar_tarea, tareas):
+            resultados.extend(parcial)
+            if medido is not None:
+                tiempos.combinar(medido)
+        return resultados
+    finally:
+        liberar_velas(shm)
+
+
+def crear_pool(procesos: int = None):
+    """
+    Crea el pool de procesos (por defecto, uno por núcleo).
+
+    El resource_tracker del proceso principal se inicia antes de crear el
+    pool para que los procesos de trabajo lo hereden. Si no, con fork cada
+    uno inicia el suyo, registra ahí los bloques a los que se adjunta y al
+    terminar intenta eliminarlos de nuevo (avisos de "leaked shared_memory
+    objects" y "No such file or directory"). Así, el único que elimina los
+    bloques es el proceso principal (liberar_velas).
+    """
+    resource_tracker.ensure_running()
+    return Pool(processes=procesos or procesos_disponibles())
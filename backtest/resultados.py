@@ -0,0 +1,198 @@
+# backtest/resultados.py
+
+"""
+Módulo: backtest/resultados.py
+
+Registro incremental y reanudable de los resultados de mass_test.py.
+
+  - Cada fila (métricas + parámetros) se acumula en un búfer pequeño que se
+    agrega al CSV por bloques; cada bloque se escribe con flush + fsync, así
+    que un corte o Ctrl-C solo pierde el bloque en curso y la memoria no crece
+    con el tamaño de la grilla.
+  - En modo reanudar se repara una posible última línea incompleta y se leen
+    (por partes) las claves ya guardadas; las combinaciones presentes se
+    saltan. La clave es la tupla completa de parámetros más el límite de
+    drawdown (COLUMNAS_CLAVE).
+    Si el encabezado del CSV no es exactamente COLUMNAS (un archivo de otra
+    versión), no se le agregan filas: se aparta con otro nombre y se empieza
+    uno nuevo.
+
+Las claves se guardan como hashes de 64 bits en un arreglo ordenado de NumPy
+(8 bytes por fila ya hecha) en lugar de un set de tuplas.
+"""
+
+import csv
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+COLUMNAS_METRICAS = [
+    "Operaciones", "Longs", "Shorts", "Ganadoras", "Perdedoras",
+    "Saldo Final", "Rentabilidad (%)", "Profit Factor", "Sharpe",
+    "Max Drawdown (%)", "Exposicion (%)", "Abortada",
+]
+# Dimensiones de la grilla (grid_config.py)
+COLUMNAS_PARAMETROS = [
+    "Symbol", "Interval", "Total_Candles", "RSI_CORTE", "ADX_THRESHOLD",
+    "DIFERENCIA_DI", "TP (%)", "SL (%)",
+]
+# El límite de drawdown cambia los resultados: forma parte de la clave
+COLUMNAS_CLAVE = COLUMNAS_PARAMETROS + ["LIMITE_DRAWDOWN"]
+COLUMNAS = COLUMNAS_METRICAS + COLUMNAS_CLAVE
+
+# Filas a acumular antes de escribir un bloque
+TAM_BLOQUE = 5000
+
+
+def _hash_clave(valores) -> int:
+    # Un valor ausente (None al calcular, NaN al leer el CSV) cuenta como None
+    return hash(tuple(None if v is None or v != v else v for v in valores))
+
+
+def _reparar_cola(ruta: str):
+    """Recorta una última línea incompleta (sin salto de línea final)."""
+    with open(ruta, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        tam = f.tell()
+        if tam == 0:
+            return
+        f.seek(tam - 1)
+        if f.read(1) == b"\n":
+            return
+        # Retroceder hasta el último salto de línea
+        pos = tam - 1
+        bloque = 4096
+        while pos > 0:
+            inicio = max(0, pos - bloque)
+            f.seek(inicio)
+            trozo = f.read(pos - inicio)
+            corte = trozo.rfind(b"\n")
+            if corte >= 0:
+                f.truncate(inicio + corte + 1)
+                print(f"🩹 Última línea incompleta descartada en {ruta}")
+                return
+            pos = inicio
+        f.truncate(0)
+
+
+def _leer_encabezado(ruta: str) -> list:
+    """Primera fila del CSV (lista vacía si el archivo está vacío)."""
+    with open(ruta, newline="", encoding="utf-8") as f:
+        return next(csv.reader(f), [])
+
+
+def _apartar(ruta: str) -> str:
+    """Renombra `ruta` agregando la fecha y hora antes de la extensión; retorna el nombre nuevo."""
+    base, extension = os.path.splitext(ruta)
+    destino = f"{base}.{time.strftime('%Y%m%d-%H%M%S')}{extension}"
+    os.replace(ruta, destino)
+    return destino
+
+
+class RegistroResultados:
+    """
+    Sumidero de resultados en CSV con escritura por bloques y reanudación.
+
+    Uso:
+        with RegistroResultados("resumen_pruebas_masivas.csv", reanudar=True) as registro:
+            if not registro.ya_hecho(clave):
+                registro.agregar(fila)
+    """
+
+    def __init__(self, ruta: str, reanudar: bool = False, tam_bloque: int = TAM_BLOQUE):
+        self.ruta = ruta
+        self.tam_bloque = tam_bloque
+        self.bufer = []
+        self.filas_nuevas = 0
+        self.hechas = np.zeros(0, dtype=np.int64)
+
+        existe = os.path.isfile(ruta) and os.path.getsize(ruta) > 0
+        if reanudar and existe:
+            _reparar_cola(ruta)
+            encabezado = _leer_encabezado(ruta)
+            if encabezado and encabezado != COLUMNAS:
+                # Otro formato: agregarle filas de COLUMNAS lo dejaría ilegible
+                anterior = _apartar(ruta)
+                print(f"⚠️ {ruta} tiene otras columnas ({len(encabezado)} en lugar de {len(COLUMNAS)}): "
+                      f"no se puede reanudar. Se movió a {anterior} y se empieza de cero.")
+            elif encabezado:
+                self.hechas = self._leer_claves()
+                print(f"⏩ Reanudando: {len(self.hechas)} combinaciones ya guardadas en {ruta}")
+            existe = os.path.isfile(ruta) and os.path.getsize(ruta) > 0
+        elif existe:
+            os.remove(ruta)
+            existe = False
+
+        self._archivo = open(ruta, "a", newline="", encoding="utf-8")
+        self._escritor = csv.writer(self._archivo)
+        if not existe:
+            self._escritor.writerow(COLUMNAS)
+            self._archivo.flush()
+
+    def _leer_claves(self) -> np.ndarray:
+        # El encabezado ya se verificó: un error aquí es un CSV dañado, no "nada hecho"
+        hashes = []
+        for parte in pd.read_csv(self.ruta, usecols=COLUMNAS_CLAVE, chunksize=200_000):
+            columnas = [parte[c].tolist() for c in COLUMNAS_CLAVE]
+            hashes.append(np.fromiter(
+                (_hash_clave(fila) for fila in zip(*columnas)),
+                dtype=np.int64, count=len(parte)
+            ))
+        if not hashes:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(hashes))
+
+    def ya_hecho(self, clave) -> bool:
+        """True si la tupla de parámetros (orden de COLUMNAS_CLAVE) ya está guardada."""
+        if not len(self.hechas):
+            return False
+        h = _hash_clave(clave)
+        pos = np.searchsorted(self.hechas, h)
+        return pos < len(self.hechas) and self.hechas[pos] == h
+
+    def agregar(self, fila: dict):
+        """Acumula una fila (dict con COLUMNAS) y escribe si el búfer está lleno."""
+        self.bufer.append([fila[c] for c in COLUMNAS])
+        if len(self.bufer) >= self.tam_bloque:
+            self.vaciar()
+
+    def vaciar(self):
+        """Escribe el búfer en disco de forma durable (flush + fsync)."""
+        if not self.bufer:
+            return
+        self._escritor.writerows(self.bufer)
+        self._archivo.flush()
+        os.fsync(self._archivo.fileno())
+        self.filas_nuevas += len(self.bufer)
+        self.bufer = []
+
+    def cerrar(self):
+        self.vaciar()
+        self._archivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+        return False
+
+
+def mejores_resultados(ruta: str, n: int = 10, columna: str = "Rentabilidad (%)",
+                       incluir_abortadas: bool = False) -> pd.DataFrame:
+    """
+    Las `n` filas con mayor `columna` del CSV, leyendo por partes
+    (memoria constante aunque el archivo sea muy grande).
+
+    Los backtests abortados por LIMITE_DRAWDOWN tienen métricas truncadas y
+    se excluyen salvo con incluir_abortadas=True.
+    """
+    mejores = None
+    for parte in pd.read_csv(ruta, chunksize=200_000):
+        if not incluir_abortadas and "Abortada" in parte:
+            parte = parte[~parte["Abortada"].astype(bool)]
+        candidatas = parte if mejores is None else pd.concat([mejores, parte])
+        mejores = candidatas.nlargest(n, columna)
+    return mejores if mejores is not None else pd.DataFrame(columns=COLUMNAS)
@@ -1,118 +1,195 @@
 # backtest/simulador.py
 
 from config import SALDO_INICIAL, APALANCAMIENTO, SL, TP
-from utils.estrategia import evaluar_senal
+from utils.estrategia import evaluar_senales
+from backtest.motor import preparar_eventos, buscar_entrada, primer_indice, nombre_lado
+from backtest.eventos import SumideroConsola, OPERACIONES, VELAS
+from backtest.libro import LibroOperaciones, CAUSA_TP, CAUSA_SL
 import pandas as pd
 
-def ejecutar_backtest(df):
-    operacion_activa = False
+
+# Formatos de consola de ejecutar_backtest (backtest/eventos.py)
+FORMATOS_EJECUTAR = {
+    "entrada": lambda r: f"🟢 {r['fecha'].strftime('%Y-%m-%d %H:%M:%S')} | Entrada {r['lado'].upper()} en {r['precio']:.2f}",
+    "activa": lambda r: f"🕒 {r['fecha'].strftime('%Y-%m-%d %H:%M:%S')} | Operación activa: {r['lado'].upper()} | Entrada: {r['entrada']:.2f}",
+    "cierre": lambda r: (
+        f"🔴 {r['fecha'].strftime('%Y-%m-%d %H:%M:%S')} | Cierre {r['lado'].upper()} en {r['precio']:.2f} "
+        f"| Variación: {r['variacion']:.2f}% | Ganancia: {r['ganancia']:.2f} | Saldo: {r['saldo']:.2f}"
+    ),
+    "resumen": lambda r: "\n📋 RESUMEN DE OPERACIONES:\n" + pd.DataFrame(r["operaciones"]).to_string(index=False),
+}
+
+# Formatos de consola de simular_operaciones
+FORMATOS_SIMULAR = {
+    "entrada": lambda r: f"📥 Entrada {r['lado'].upper()} en {r['precio']:.2f} ({r['fecha'].strftime('%Y-%m-%d %H:%M')})",
+    "cierre": lambda r: (
+        f"✅ Cierre {r['lado'].upper()} | Entrada: {r['entrada']:.2f} → Salida: {r['precio']:.2f} "
+        f"| {r['variacion']:.2f}% | Saldo: {r['saldo']:.2f}"
+    ),
+    "resumen": lambda r: (
+        "\n📊 RESULTADOS BACKTEST:\n"
+        f"\n🔁 Operaciones ejecutadas: {r['Operaciones']}\n"
+        f"🟢 Longs: {r['Longs']}     🔴 Shorts: {r['Shorts']}\n"
+        f"✅ Ganadoras: {r['Ganadoras']} ❌ Perdedoras: {r['Perdedoras']}\n"
+        f"\n💰 Saldo inicial: {r['saldo_inicial']:.2f} USDT\n"
+        f"💵 Saldo final  : {r['saldo']:.2f} USDT\n"
+        f"📈 Rentabilidad : {r['rentabilidad']:.2f}%"
+    ),
+}
+
+
+def ejecutar_backtest(df, sumidero=None, libro=None):
+    if libro is None:
+        libro = LibroOperaciones(SALDO_INICIAL)
+    libro.saldo_inicial = float(SALDO_INICIAL)
+    libro.total_velas = max(len(df) - 1, 1)
+    if sumidero is None:
+        sumidero = SumideroConsola(FORMATOS_EJECUTAR)
+    por_vela = sumidero.nivel >= VELAS
+    por_operacion = sumidero.nivel >= OPERACIONES
     saldo = SALDO_INICIAL
-    entrada = 0
-    fecha_entrada = None
-    tipo_operacion = None  # "long" o "short"
     resultado_dias = []
 
     df = df.copy()
 
-    for i in range(1, len(df)):
-        fila = df.iloc[i]
-        fecha = fila.name.strftime('%Y-%m-%d %H:%M:%S')
-
-        # Abrir operación si no hay ninguna activa
-        if not operacion_activa:
-            señal = evaluar_senal(df.iloc[:i+1], solo_tipo=True)
-            if señal in ("long", "short"):
-                operacion_activa = True
-                entrada = fila["Close"]
-                fecha_entrada = fecha
-                tipo_operacion = señal
-                print(f"🟢 {fecha} | Entrada {tipo_operacion.upper()} en {entrada:.2f}")
-                continue
-
-        # Si hay una operación activa, verificar SL / TP
-        if operacion_activa:
-            precio_actual = fila["Close"]
-            variacion = (precio_actual - entrada) / entrada if tipo_operacion == "long" else (entrada - precio_actual) / entrada
-            variacion_pct = variacion * 100
-
-            if variacion_pct >= TP or variacion_pct <= SL:
-                ganancia = saldo * (variacion * APALANCAMIENTO)
-                saldo += ganancia
-                resultado_dias.append({
-                    "fecha": fecha_entrada,
-                    "tipo": tipo_operacion,
-                    "entrada": round(entrada, 2),
-                    "salida": round(precio_actual, 2),
-                    "variacion%": round(variacion_pct, 2),
-                    "ganancia": round(ganancia, 2),
-                    "saldo": round(saldo, 2)
-                })
-                print(f"🔴 {fecha} | Cierre {tipo_operacion.upper()} en {precio_actual:.2f} | Variación: {variacion_pct:.2f}% | Ganancia: {ganancia:.2f} | Saldo: {saldo:.2f}")
-                operacion_activa = False
-                tipo_operacion = None
+    # Señales de todas las velas en una sola pasada (sin confirmación)
+    senal_long, senal_short = evaluar_senales(df)
+    eventos = preparar_eventos(senal_long, senal_short)
+    cierres = df["Close"].to_numpy(dtype=float)
+    fechas = df.index
+    n = len(df)
+
+    i = 1
+    while i < n:
+        # Abrir operación en la primera vela con señal
+        pos = buscar_entrada(eventos, i, 1)
+        if pos is None:
+            break
+        barra_entrada = int(eventos["idx"][pos])
+        tipo_operacion = nombre_lado(eventos["lado"][pos])
+        entrada = cierres[barra_entrada]
+        fecha_entrada = fechas[barra_entrada].strftime('%Y-%m-%d %H:%M:%S')
+        if por_operacion:
+            sumidero.emitir("entrada", fecha=fechas[barra_entrada], lado=tipo_operacion, precio=entrada)
+
+        # Verificar SL / TP al cierre de cada vela
+        def variaciones(a, b):
+            if tipo_operacion == "long":
+                variacion = (cierres[a:b] - entrada) / entrada
+            else:
+                variacion = (entrada - cierres[a:b]) / entrada
+            return variacion * 100
+
+        toca = lambda a, b: (variaciones(a, b) >= TP) | (variaciones(a, b) <= SL)
+        barra_salida = primer_indice(toca, barra_entrada + 1, n)
+        fin_activa = barra_salida if barra_salida >= 0 else n
 
         # Seguimiento de operación activa
-        if operacion_activa:
-            print(f"🕒 {fecha} | Operación activa: {tipo_operacion.upper()} | Entrada: {entrada:.2f}")
-
-    # Mostrar resumen por consola si hubo operaciones
-    if resultado_dias:
-        df_resumen = pd.DataFrame(resultado_dias)
-        print("\n📋 RESUMEN DE OPERACIONES:")
-        print(df_resumen.to_string(index=False))
+        if por_vela:
+            for k in range(barra_entrada + 1, fin_activa):
+                sumidero.emitir("activa", fecha=fechas[k], lado=tipo_operacion, entrada=entrada)
+
+        if barra_salida < 0:
+            break
+
+        precio_actual = cierres[barra_salida]
+        variacion = (precio_actual - entrada) / entrada if tipo_operacion == "long" else (entrada - precio_actual) / entrada
+        variacion_pct = variacion * 100
+        ganancia = saldo * (variacion * APALANCAMIENTO)
+        saldo += ganancia
+        libro.agregar(barra_entrada, barra_salida, fechas[barra_entrada].value, fechas[barra_salida].value,
+                      eventos["lado"][pos], entrada, precio_actual, variacion_pct * APALANCAMIENTO,
+                      CAUSA_TP if variacion_pct >= TP else CAUSA_SL, saldo)
+        resultado_dias.append({
+            "fecha": fecha_entrada,
+            "tipo": tipo_operacion,
+            "entrada": round(entrada, 2),
+            "salida": round(precio_actual, 2),
+            "variacion%": round(variacion_pct, 2),
+            "ganancia": round(ganancia, 2),
+            "saldo": round(saldo, 2)
+        })
+        if por_operacion:
+            sumidero.emitir("cierre", fecha=fechas[barra_salida], lado=tipo_operacion,
+                            precio=precio_actual, variacion=variacion_pct,
+                            ganancia=ganancia, saldo=saldo)
+
+        # La vela de cierre ya no evalúa señal; se busca desde la siguiente
+        i = barra_salida + 1
+
+    # Resumen de operaciones (solo si hubo alguna)
+    if resultado_dias and por_operacion:
+        sumidero.emitir("resumen", operaciones=resultado_dias, saldo=saldo)
 
     return resultado_dias, saldo
 
 
-def simular_operaciones(df):
+def simular_operaciones(df, sumidero=None, libro=None):
+    if libro is None:
+        libro = LibroOperaciones(SALDO_INICIAL)
+    libro.saldo_inicial = float(SALDO_INICIAL)
+    libro.total_velas = max(len(df), 1)
+    if sumidero is None:
+        sumidero = SumideroConsola(FORMATOS_SIMULAR)
+    por_operacion = sumidero.nivel >= OPERACIONES
     saldo = SALDO_INICIAL
-    operacion = None
     operaciones_realizadas = []
 
-    for i in range(len(df)):
-        fila = df.iloc[i]
-        timestamp = fila.name
-        close = fila["Close"]
-
-        if operacion:
-            entrada = operacion["precio_entrada"]
-            tipo = operacion["tipo"]
-            variacion_pct = ((close - entrada) / entrada * 100) * (1 if tipo == "long" else -1)
-
-            if variacion_pct >= TP or variacion_pct <= SL:
-                resultado_pct = variacion_pct
-                resultado_dinero = saldo * (resultado_pct / 100) * APALANCAMIENTO
-                saldo += resultado_dinero
-                operaciones_realizadas.append({
-                    "fecha": timestamp.strftime("%Y-%m-%d %H:%M"),
-                    "tipo": tipo,
-                    "entrada": entrada,
-                    "salida": close,
-                    "resultado_pct": round(resultado_pct, 2),
-                    "saldo": round(saldo, 2)
-                })
-                print(f"✅ Cierre {tipo.upper()} | Entrada: {entrada:.2f} → Salida: {close:.2f} | {resultado_pct:.2f}% | Saldo: {saldo:.2f}")
-                operacion = None
-
-        if not operacion:
-            señal = evaluar_senal(df.iloc[:i+1], solo_tipo=True)
-            if señal:
-                operacion = {
-                    "tipo": señal,
-                    "precio_entrada": close
-                }
-                print(f"📥 Entrada {señal.upper()} en {close:.2f} ({timestamp.strftime('%Y-%m-%d %H:%M')})")
+    senal_long, senal_short = evaluar_senales(df)
+    eventos = preparar_eventos(senal_long, senal_short)
+    cierres = df["Close"].to_numpy(dtype=float)
+    fechas = df.index
+    n = len(df)
+
+    i = 0
+    while i < n:
+        pos = buscar_entrada(eventos, i, 1)
+        if pos is None:
+            break
+        barra_entrada = int(eventos["idx"][pos])
+        tipo = nombre_lado(eventos["lado"][pos])
+        entrada = cierres[barra_entrada]
+        if por_operacion:
+            sumidero.emitir("entrada", fecha=fechas[barra_entrada], lado=tipo, precio=entrada)
+
+        signo = 1 if tipo == "long" else -1
+        variaciones = lambda a, b: ((cierres[a:b] - entrada) / entrada * 100) * signo
+        toca = lambda a, b: (variaciones(a, b) >= TP) | (variaciones(a, b) <= SL)
+        barra_salida = primer_indice(toca, barra_entrada + 1, n)
+        if barra_salida < 0:
+            break
+
+        close = cierres[barra_salida]
+        resultado_pct = ((close - entrada) / entrada * 100) * signo
+        resultado_dinero = saldo * (resultado_pct / 100) * APALANCAMIENTO
+        saldo += resultado_dinero
+        libro.agregar(barra_entrada, barra_salida, fechas[barra_entrada].value, fechas[barra_salida].value,
+                      eventos["lado"][pos], entrada, close, resultado_pct * APALANCAMIENTO,
+                      CAUSA_TP if resultado_pct >= TP else CAUSA_SL, saldo)
+        operaciones_realizadas.append({
+            "fecha": fechas[barra_salida].strftime("%Y-%m-%d %H:%M"),
+            "tipo": tipo,
+            "entrada": entrada,
+            "salida": close,
+            "resultado_pct": round(resultado_pct, 2),
+            "saldo": round(saldo, 2)
+        })
+        if por_operacion:
+            sumidero.emitir("cierre", fecha=fechas[barra_salida], lado=tipo, entrada=entrada,
+                            precio=close, variacion=resultado_pct, saldo=saldo)
+
+        # En la misma vela del cierre se puede volver a entrar
+        i = barra_salida
 
     # 📊 Resumen final
-    print("\n📊 RESULTADOS BACKTEST:")
-    print(f"\n🔁 Operaciones ejecutadas: {len(operaciones_realizadas)}")
-    longs = sum(1 for o in operaciones_realizadas if o["tipo"] == "long")
-    shorts = sum(1 for o in operaciones_realizadas if o["tipo"] == "short")
-    ganadoras = sum(1 for o in operaciones_realizadas if o["resultado_pct"] > 0)
-    perdedoras = sum(1 for o in operaciones_realizadas if o["resultado_pct"] < 0)
-    print(f"🟢 Longs: {longs}     🔴 Shorts: {shorts}")
-    print(f"✅ Ganadoras: {ganadoras} ❌ Perdedoras: {perdedoras}")
-    rentabilidad = (saldo - SALDO_INICIAL) / SALDO_INICIAL * 100
-    print(f"\n💰 Saldo inicial: {SALDO_INICIAL:.2f} USDT")
-    print(f"💵 Saldo final  : {saldo:.2f} USDT")
-    print(f"📈 Rentabilidad : {rentabilidad:.2f}%")
+    if por_operacion:
+        rentabilidad = (saldo - SALDO_INICIAL) / SALDO_INICIAL * 100
+        sumidero.emitir(
+            "resumen",
+            Operaciones=len(operaciones_realizadas),
+            Longs=sum(1 for o in operaciones_realizadas if o["tipo"] == "long"),
+            Shorts=sum(1 for o in operaciones_realizadas if o["tipo"] == "short"),
+            Ganadoras=sum(1 for o in operaciones_realizadas if o["resultado_pct"] > 0),
+            Perdedoras=sum(1 for o in operaciones_realizadas if o["resultado_pct"] < 0),
+            saldo_inicial=SALDO_INICIAL, saldo=saldo, rentabilidad=rentabilidad
+        )
@@ -0,0 +1,317 @@
+# benchmark.py
+
+"""
+Benchmark de las rutas críticas sobre velas sintéticas (utils/sinteticos.py),
+sin conexión a Binance:
+
+  - resamplear      : 1m → 5m.
+  - indicadores     : calcular_indicadores.
+  - senales         : evaluar_senales (todas las velas en una pasada).
+  - evaluar_senal   : versión por vela (200 llamadas sobre df.iloc[:i]).
+  - run_backtest    : backtest completo sobre velas ya preparadas (sin salida).
+  - mass_test       : backtest_lote sobre una grilla de umbrales × TP × SL
+                      (combinaciones por segundo).
+  - importar        : tiempo de importar cada punto de entrada de backtest
+                      (ENTRADAS_BACKTEST) en un intérprete nuevo. Debe quedar
+                      bajo PRESUPUESTO_IMPORTACION_S y sin cargar pygame,
+                      python-binance, ta ni requests (MODULOS_DIFERIDOS); si
+                      no, también cuenta como regresión.
+
+Para cada tamaño (por defecto 1k, 100k y 1M velas, semilla fija) mide el
+tiempo (mejor de N repeticiones; una sola desde 1M velas) y el pico de
+memoria (tracemalloc, en una pasada aparte). Los resultados se comparan con un archivo de línea base y se
+informa cada regresión; el código de salida es 1 si hubo alguna.
+
+Uso:
+    python benchmark.py --guardar-base          # crea/actualiza la línea base
+    python benchmark.py                         # compara contra la línea base
+    python benchmark.py --tamanos 1000 100000 --tolerancia 0.15
+    python benchmark.py --solo-importacion      # solo el presupuesto de importación
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from utils.sinteticos import generar_velas
+from utils.resample import resamplear
+from utils.indicadores import calcular_indicadores
+from utils.estrategia import evaluar_senal, evaluar_senales
+from utils.parametros import parametros_actuales
+from utils import cache_indicadores
+from runBacktest import run_backtest, backtest_lote
+from backtest import eventos, huellas
+
+BASE_POR_DEFECTO = "benchmark_base.json"
+TAMANOS = [1_000, 100_000, 1_000_000]
+SEMILLA = 42
+LLAMADAS_SENAL = 200
+
+# Grilla de mass_test usada para medir combinaciones por segundo
+# (pequeña para que 1M de velas siga siendo razonable)
+GRILLA_RSI = [50]
+GRILLA_ADX = [20, 25]
+GRILLA_DI = [1]
+GRILLA_TP = [2, 4, 6, 8, 10]
+GRILLA_SL = [-1, -3, -5]
+
+# Desde este tamaño cada etapa se mide una sola vez
+VELAS_UNA_REPETICION = 1_000_000
+
+# Arranque de los backtests: cada módulo debe importarse en menos de
+# PRESUPUESTO_IMPORTACION_S (pandas y numpy incluidos) y sin cargar los
+# módulos que solo se usan en vivo (se importan al primer uso)
+ENTRADAS_BACKTEST = ["runBacktest", "mass_test", "backtest.busqueda"]
+MODULOS_DIFERIDOS = ["pygame", "binance", "ta", "requests"]
+PRESUPUESTO_IMPORTACION_S = 1.0
+REPETICIONES_IMPORTACION = 5
+
+_SCRIPT_IMPORTACION = """
+import json, sys, time
+t0 = time.perf_counter()
+import {modulo}
+segundos = time.perf_counter() - t0
+print(json.dumps({{"segundos": segundos, "cargados": [m for m in {diferidos!r} if m in sys.modules]}}))
+"""
+
+
+def _medir(funcion, repeticiones: int, memoria: bool):
+    """Mejor tiempo de `repeticiones` llamadas y pico de memoria (MB) de una llamada extra."""
+    mejor = math.inf
+    pico_mb = None
+    # Con 1M de velas el saldo compuesto puede desbordar: no es un error del benchmark
+    with np.errstate(over="ignore", invalid="ignore"):
+        for _ in range(repeticiones):
+            t0 = time.perf_counter()
+            funcion()
+            mejor = min(mejor, time.perf_counter() - t0)
+
+        if memoria:
+            tracemalloc.start()
+            funcion()
+            pico_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            tracemalloc.stop()
+    return mejor, pico_mb
+
+
+def etapas(n: int):
+    """
+    Prepara las velas sintéticas de tamaño n y devuelve
+    [(etapa, función, filas procesadas, combinaciones)].
+    """
+    velas = generar_velas(n, semilla=SEMILLA)
+    preparadas = calcular_indicadores(velas.copy())
+
+    base = parametros_actuales()
+    # DIAS_TEST que cubre todas las velas (1 vela por minuto)
+    base = base._replace(DIAS_TEST=n // 1440 + 2)
+
+    # run_backtest lee las velas desde la caché de indicadores: sin CSV ni red
+    symbol, interval = "SINTETICO", "1m"
+    cache_indicadores.guardar(cache_indicadores.clave_cache(symbol, interval, n), preparadas)
+
+    ultimas = range(max(1, n - LLAMADAS_SENAL), n)
+    lista_parametros = [
+        base._replace(RSI_CORTE=r, ADX_THRESHOLD=a, DIFERENCIA_DI=d)
+        for r in GRILLA_RSI for a in GRILLA_ADX for d in GRILLA_DI
+    ]
+    combinaciones = len(lista_parametros) * len(GRILLA_TP) * len(GRILLA_SL)
+
+    def correr_backtest():
+        run_backtest(symbol, interval, n, base, sumidero=eventos.SILENCIOSO)
+
+    def correr_grilla():
+        huellas.limpiar()   # medir simulaciones reales, no reutilizadas
+        backtest_lote(preparadas, lista_parametros, GRILLA_TP, GRILLA_SL)
+
+    return [
+        ("resamplear", lambda: resamplear(velas, "5min"), n, None),
+        ("indicadores", lambda: calcular_indicadores(velas.copy()), n, None),
+        ("senales", lambda: evaluar_senales(preparadas, base), n, None),
+        ("evaluar_senal", lambda: [evaluar_senal(preparadas.iloc[:i], solo_tipo=True) for i in ultimas],
+         len(ultimas), None),
+        ("run_backtest", correr_backtest, n, None),
+        ("mass_test", correr_grilla, n * len(lista_parametros), combinaciones),
+    ]
+
+
+def ejecutar(tamanos, repeticiones: int, memoria: bool) -> dict:
+    """Corre todas las etapas para cada tamaño. Retorna {"etapa@n": métricas}."""
+    resultados = {}
+    for n in tamanos:
+        print(f"\n⏱️ {n:,} velas (semilla {SEMILLA})")
+        veces = 1 if n >= VELAS_UNA_REPETICION else repeticiones
+        for etapa, funcion, filas, combinaciones in etapas(n):
+            segundos, pico_mb = _medir(funcion, veces, memoria)
+            fila = {
+                "segundos": segundos,
+                "filas_por_seg": filas / segundos if segundos > 0 else None,
+                "pico_mb": pico_mb,
+            }
+            if combinaciones:
+                fila["combinaciones_por_seg"] = combinaciones / segundos if segundos > 0 else None
+            resultados[f"{etapa}@{n}"] = fila
+            extra = f" | {fila['combinaciones_por_seg']:,.0f} comb/s" if combinaciones else ""
+            memoria_txt = f" | pico {pico_mb:.1f} MB" if pico_mb is not None else ""
+            print(f"   {etapa:<14} {segundos * 1000:10.2f} ms{memoria_txt}{extra}")
+        cache_indicadores.limpiar()
+    return resultados
+
+
+def medir_importacion(modulo: str, repeticiones: int = REPETICIONES_IMPORTACION) -> dict:
+    """
+    Importa `modulo` en intérpretes nuevos (sin caché de módulos en memoria)
+    y devuelve el mejor tiempo y los MODULOS_DIFERIDOS que quedaron cargados.
+    """
+    script = _SCRIPT_IMPORTACION.format(modulo=modulo, diferidos=MODULOS_DIFERIDOS)
+    mejor, cargados = math.inf, []
+    for _ in range(repeticiones):
+        salida = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        if salida.returncode != 0:
+            raise RuntimeError(f"No se pudo importar {modulo}:\n{salida.stderr.strip()}")
+        # La última línea es la medición (el módulo puede imprimir al importarse)
+        medicion = json.loads(salida.stdout.strip().splitlines()[-1])
+        mejor = min(mejor, medicion["segundos"])
+        cargados = medicion["cargados"]
+    return {"segundos": mejor, "cargados": cargados}
+
+
+def presupuesto_importacion(presupuesto: float = PRESUPUESTO_IMPORTACION_S) -> tuple:
+    """
+    Mide la importación de cada ENTRADAS_BACKTEST y la compara con el presupuesto.
+
+    Retorna:
+        tuple[dict, int]: ({"importar:<módulo>": métricas}, cantidad de fallas).
+    """
+    print(f"\n⏱️ Importación de los puntos de entrada (presupuesto {presupuesto * 1000:.0f} ms)")
+    resultados, fallas = {}, 0
+    for modulo in ENTRADAS_BACKTEST:
+        medicion = medir_importacion(modulo)
+        estado = "✅"
+        if medicion["segundos"] > presupuesto:
+            estado = "🐢 fuera de presupuesto"
+            fallas += 1
+        if medicion["cargados"]:
+            estado += f" 📦 carga {', '.join(medicion['cargados'])}"
+            fallas += 1
+        print(f"   {modulo:<20} {medicion['segundos'] * 1000:10.2f} ms  {estado}")
+        resultados[f"importar:{modulo}"] = {"segundos": medicion["segundos"], "pico_mb": None}
+    return resultados, fallas
+
+
+def entorno() -> dict:
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "maquina": platform.machine(),
+        "procesador": platform.processor(),
+        "nucleos": os.cpu_count(),
+    }
+
+
+def comparar(actual: dict, base: dict, tolerancia: float) -> int:
+    """
+    Imprime la tabla de comparación contra la línea base.
+
+    Retorna:
+        int: Cantidad de regresiones (tiempo o memoria por encima de la tolerancia).
+    """
+    filas = []
+    regresiones = 0
+    for clave, fila in actual.items():
+        previa = base.get(clave)
+        if previa is None:
+            filas.append((clave, fila["segundos"], None, None, "🆕 sin base"))
+            continue
+        razon = fila["segundos"] / previa["segundos"] if previa["segundos"] else math.inf
+        estado = "✅ ok"
+        if razon > 1 + tolerancia:
+            estado = "🐢 REGRESIÓN (tiempo)"
+            regresiones += 1
+        elif razon < 1 - tolerancia:
+            estado = "🚀 mejora"
+        if fila.get("pico_mb") is not None and previa.get("pico_mb") is not None:
+            if fila["pico_mb"] > previa["pico_mb"] * (1 + tolerancia) and fila["pico_mb"] - previa["pico_mb"] > 1:
+                estado += " 🐘 REGRESIÓN (memoria)"
+                regresiones += 1
+        filas.append((clave, fila["segundos"], previa["segundos"], razon, estado))
+
+    print("\n" + "*"*70)
+    print(f"Comparación con la línea base (tolerancia ±{tolerancia:.0%}):\n")
+    print(f"{'etapa@velas':<24}{'actual ms':>12}{'base ms':>12}{'x':>8}  estado")
+    for clave, seg, seg_base, razon, estado in filas:
+        base_txt = f"{seg_base * 1000:12.2f}" if seg_base is not None else f"{'-':>12}"
+        razon_txt = f"{razon:8.2f}" if razon is not None else f"{'-':>8}"
+        print(f"{clave:<24}{seg * 1000:12.2f}{base_txt}{razon_txt}  {estado}")
+    print("*"*70 + "\n")
+    return regresiones
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark offline de indicadores, señales y backtest")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=TAMANOS,
+                        help="Cantidades de velas a generar (por defecto 1000 100000 1000000)")
+    parser.add_argument("--repeticiones", type=int, default=3,
+                        help="Repeticiones por etapa; se informa el mejor tiempo")
+    parser.add_argument("--sin-memoria", action="store_true",
+                        help="No mide el pico de memoria (evita la pasada con tracemalloc)")
+    parser.add_argument("--base", default=BASE_POR_DEFECTO,
+                        help=f"Archivo de línea base (por defecto {BASE_POR_DEFECTO})")
+    parser.add_argument("--guardar-base", action="store_true",
+                        help="Guarda los resultados como nueva línea base")
+    parser.add_argument("--tolerancia", type=float, default=0.20,
+                        help="Variación relativa aceptada antes de marcar regresión (0.20 = 20%%)")
+    parser.add_argument("--salida", default=None,
+                        help="Guarda también los resultados de esta corrida en JSON")
+    parser.add_argument("--presupuesto-importacion", type=float, default=PRESUPUESTO_IMPORTACION_S,
+                        help=f"Segundos máximos para importar cada punto de entrada "
+                             f"(por defecto {PRESUPUESTO_IMPORTACION_S})")
+    parser.add_argument("--solo-importacion", action="store_true",
+                        help="Mide solo el presupuesto de importación (sin velas sintéticas)")
+    args = parser.parse_args()
+
+    resultados, fallas_importacion = presupuesto_importacion(args.presupuesto_importacion)
+    if args.solo_importacion:
+        if fallas_importacion:
+            print(f"❌ {fallas_importacion} fallas del presupuesto de importación.")
+            raise SystemExit(1)
+        print("✅ Importación dentro del presupuesto.")
+        raise SystemExit(0)
+
+    resultados.update(ejecutar(args.tamanos, args.repeticiones, not args.sin_memoria))
+    documento = {"entorno": entorno(), "semilla": SEMILLA, "resultados": resultados}
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(documento, f, indent=2)
+
+    if args.guardar_base:
+        with open(args.base, "w", encoding="utf-8") as f:
+            json.dump(documento, f, indent=2)
+        print(f"💾 Línea base guardada en {args.base}")
+        raise SystemExit(0)
+
+    if not os.path.isfile(args.base):
+        print(f"⚠️ No existe la línea base {args.base}. Créala con --guardar-base.")
+        raise SystemExit(1 if fallas_importacion else 0)
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    if base.get("entorno") != documento["entorno"]:
+        print("⚠️ La línea base se midió en otro entorno; compara con cautela.")
+    regresiones = comparar(resultados, base["resultados"], args.tolerancia) + fallas_importacion
+    if regresiones:
+        print(f"❌ {regresiones} regresiones detectadas.")
+        raise SystemExit(1)
+    print("✅ Sin regresiones.")
@@ -1,13 +1,11 @@
 # config.py
-from binance.client import Client  # type: ignore
-
 # === Parámetros de trading ===
 SYMBOL = "BTCUSDT"
 # Puedes cambiar a:
 # SYMBOL = "ETHUSDT"
 # SYMBOL = "ADAUSDT"
 
-BASE_INTERVAL = Client.KLINE_INTERVAL_1MINUTE
+BASE_INTERVAL = "1m"             # = binance.client.Client.KLINE_INTERVAL_1MINUTE (sin importar python-binance)
 BASE_INTERVAL_STR = "1m"         # Para uso en strings y rutas
 ANALYSIS_INTERVAL = "1min"       # Para resampleo u otras funciones
 
@@ -19,6 +17,7 @@ LIMIT = 1000                    # Límite de velas por solicitud (máximo permit
 SALDO_INICIAL = 200             # Capital inicial para backtest
 APALANCAMIENTO = 15             # Leverage (apalancamiento)
 DIAS_TEST = 3                   # Cuántos días usar en backtest
+LIMITE_DRAWDOWN = None          # Pérdida máxima (%) sobre SALDO_INICIAL antes de abortar un backtest (None = sin límite)
 
 # === Archivo CSV por defecto (puede cambiarse si cambias SYMBOL) ===
 CSV_FILE = f"data/{SYMBOL}_{BASE_INTERVAL_STR}.csv"
@@ -49,4 +48,33 @@ DIFERENCIA_DI_LIST = [1, 2, 3]
 # (Si en el futuro quieres variar los periodos de SMA, podrías agregar:)
 # SMA_CORTA_LIST = [5, 9, 14]
 # SMA_LARGA_LIST = [20, 30, 50]
-# ---------------------------------------------------
\ No newline at end of file
+# ---------------------------------------------------
+
+# ---------------------------------------------------
+# Caché de indicadores para pruebas masivas (mass_test.py):
+# memoria máxima (MB) para velas con indicadores ya calculados.
+CACHE_INDICADORES_MB = 512
+# Memoria máxima (MB) para simulaciones ya hechas (backtest/huellas.py).
+# Cada proceso de --paralelo tiene su propia caché de este tamaño.
+CACHE_SIMULACIONES_MB = 128
+
+# ---------------------------------------------------
+# Límite de peso de la API de Binance (utils/cliente_binance.py):
+# con una ruta (p. ej. "data/peso_binance.bin") todos los procesos que la
+# compartan (mass_test, main.py, …) usan el mismo presupuesto por minuto.
+# Cada API usa su propio archivo (la ruta con un sufijo según la URL).
+PESO_COMPARTIDO_ARCHIVO = None
+
+# ---------------------------------------------------
+# Intervalos que runBacktest/mass_test construyen a partir de las velas de
+# 1m (utils/velas_derivadas.py) en lugar de descargarlos por separado.
+# Los intervalos de 2h en adelante se alinean a la hora local (TIMEZONE),
+# no a UTC como las velas de Binance.
+INTERVALOS_DESDE_1M = ["3m", "5m", "15m", "30m", "1h"]
+
+# ---------------------------------------------------
+# Velas cerradas que el bucle en vivo (main.py, scanner.py) guarda en memoria
+# (utils/buffer_velas.py). None = las que necesitan los indicadores
+# (indicadores.velas_necesarias() en velas de ANALYSIS_INTERVAL); las más
+# antiguas quedan solo en el almacén en disco.
+VELAS_EN_MEMORIA = None
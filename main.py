@@ -1,20 +1,47 @@
 # main.py
+# python main.py BTCUSDT          consulta REST cada 5 s
+# python main.py BTCUSDT --ws     stream de velas por WebSocket
 
 import time
 import sys
 from datetime import datetime
 from config import ANALYSIS_INTERVAL
-from utils.binance_data import actualizar_datos, obtener_klines, set_symbol
+from utils.binance_data import actualizar_datos, obtener_klines, serie_local, set_symbol
 from utils.resample import resamplear
 from utils.indicadores import calcular_indicadores
+from utils.indicadores_incrementales import IndicadoresIncrementales, indicadores_en_vivo
 from utils.consola import mostrar_ultimo
 from utils.estrategia import evaluar_senal
 from utils.patrones import determinar_patron_dominante
 from utils.binance_data import obtener_vela_en_formacion, actualizar_datos
 
 
+def analizar(df, symbol, motor=None):
+    """Con `motor` (IndicadoresIncrementales) solo se procesan las velas nuevas de df."""
+    if motor is None:
+        df_final = calcular_indicadores(resamplear(df, ANALYSIS_INTERVAL))
+    else:
+        df_final = indicadores_en_vivo(df, motor)
+    mostrar_ultimo(df_final, symbol)
+    evaluar_senal(df_final)
+    return df_final
 
-def esperar_nueva_vela(ultimo_timestamp):
+
+def mostrar_en_formacion(vela_anterior, vela, primera_iteracion, provisional=None):
+    patron = determinar_patron_dominante(vela_anterior, vela)
+    linea1 = f"⏱️   {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} — Analizando vela cerrada + en formación"
+    linea1 += f" | Posible: {patron}" if patron else "..."
+    if provisional is not None and not provisional.empty:
+        fila = provisional.iloc[-1]
+        linea1 += f" | RSI≈{fila['RSI']:.2f} ADX≈{fila['ADX']:.2f} +DI/-DI≈{fila['+DI']:.2f}/{fila['-DI']:.2f}"
+    linea2 = f"📍 Vela en formación: Open={vela['Open']} | High={vela['High']} | Low={vela['Low']} | Close={vela['Close']} | Volume={vela['Volume']}"
+    if not primera_iteracion:
+        sys.stdout.write("\033[F\033[K" * 2)
+    print(linea1)
+    print(linea2)
+
+
+def esperar_nueva_vela(ultimo_timestamp, motor=None):
     print("⏳ Esperando nueva vela...")
     primera_iteracion = True
     while True:
@@ -25,22 +52,46 @@ def esperar_nueva_vela(ultimo_timestamp):
             print("\n")
             return df
         vela = obtener_vela_en_formacion()
-        vela_anterior = df.iloc[-1]
-        patron = determinar_patron_dominante(vela_anterior, vela)
-        linea1 = f"⏱️   {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} — Analizando vela cerrada + en formación"
-        linea1 += f" | Posible: {patron}" if patron else "..."
-        linea2 = f"📍 Vela en formación: Open={vela['Open']} | High={vela['High']} | Low={vela['Low']} | Close={vela['Close']} | Volume={vela['Volume']}"
-        if not primera_iteracion:
-            sys.stdout.write("\033[F\033[K" * 2)
-        print(linea1)
-        print(linea2)
+        provisional = indicadores_en_vivo(df, motor) if motor is not None else None
+        mostrar_en_formacion(df.iloc[-1], vela, primera_iteracion, provisional)
         primera_iteracion = False
         time.sleep(5)
 
 
+def monitorear_stream(symbol, motor):
+    """
+    Analiza cada vela en cuanto llega su evento de cierre por WebSocket
+    (utils/flujo_velas.py); la vela en formación se muestra como máximo una
+    vez por segundo, con sus indicadores provisionales.
+    """
+    from utils.flujo_velas import FlujoVelas
+
+    estado = {"primera": True, "mostrada": 0.0}
+
+    def al_cerrar(_, serie):
+        print("\n")
+        analizar(serie, symbol, motor)
+        print("⏳ Esperando nueva vela...")
+        estado["primera"] = True
+
+    def al_actualizar(_, vela):
+        ahora = time.monotonic()
+        if ahora - estado["mostrada"] < 1:
+            return
+        cerradas = serie_local()
+        if cerradas.empty:
+            return
+        provisional = indicadores_en_vivo(cerradas, motor, vela)
+        mostrar_en_formacion(cerradas.iloc[-1], vela, estado["primera"], provisional)
+        estado.update(primera=False, mostrada=ahora)
+
+    print("⏳ Esperando nueva vela...")
+    FlujoVelas().ejecutar(al_cerrar, al_actualizar)
+
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("⚠️ Debes indicar un símbolo. Ejemplo: python main.py BTCUSDT")
+        print("⚠️ Debes indicar un símbolo. Ejemplo: python main.py BTCUSDT [--ws]")
         sys.exit(1)
 
     symbol = sys.argv[1].upper()
@@ -48,12 +99,15 @@ if __name__ == "__main__":
 
     print(f"📈 Iniciando monitoreo para {symbol}...\n")
 
+    # Indicadores incrementales: cada ciclo procesa solo las velas nuevas
+    motor = IndicadoresIncrementales()
+
+    if "--ws" in sys.argv[2:]:
+        analizar(actualizar_datos(), symbol, motor)
+        monitorear_stream(symbol, motor)
+
     while True:
         df_actual = actualizar_datos()
-        df_resampled = resamplear(df_actual, ANALYSIS_INTERVAL)
-        df_final = calcular_indicadores(df_resampled)
-        mostrar_ultimo(df_final,symbol)
-        evaluar_senal(df_final)
+        df_final = analizar(df_actual, symbol, motor)
         ultima_ts = df_final.index[-1]
-        df_espera = esperar_nueva_vela(ultima_ts)
-        
\ No newline at end of file
+        df_espera = esperar_nueva_vela(ultima_ts, motor)
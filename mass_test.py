@@ -4,15 +4,52 @@
 Script para pruebas masivas usando grid_config.py:
 - Itera sobre todos los valores de RSI_CORTE, ADX_THRESHOLD, DIFERENCIA_DI,
   TP, SL, así como sobre intervalos, total_candles y (opcionalmente) SMAs.
-- Para cada combinación, modifica config.py en tiempo de ejecución,
-  ejecuta run_backtest(...) y almacena los resultados en una lista.
-- Al final muestra un resumen por pantalla y guarda un CSV con todo.
+- Cada combinación de umbrales se ejecuta con un conjunto explícito e
+  inmutable de parámetros (utils/parametros.py), sin modificar config.py.
+- Las velas se preparan una vez por (símbolo, intervalo, total); las señales
+  de todas las combinaciones se evalúan por lotes con broadcasting y cada
+  una recorre toda la grilla TP × SL de una sola pasada (backtest_lote).
+- Con --paralelo los lotes se reparten entre varios procesos que comparten
+  las velas en memoria. El resultado es idéntico al modo serial.
+- Los resultados se agregan por bloques a resumen_pruebas_masivas.csv a medida
+  que se calculan (memoria constante); con --reanudar se conservan los ya
+  guardados y se saltan esas combinaciones. Al final muestra las mejores.
+- Con --modo aleatoria / halving / coordenadas no se recorre la grilla
+  completa sino una búsqueda adaptativa limitada por --evaluaciones y/o
+  --segundos (backtest/busqueda.py). --limite-drawdown corta cada backtest
+  en cuanto el saldo cae bajo ese % de pérdida; esas filas quedan con
+  Abortada=True y no entran en el ranking final. El límite forma parte de la
+  clave, así que al reanudar con otro límite las combinaciones se recalculan.
+- Las combinaciones con la misma ventana de velas y las mismas señales
+  reutilizan la simulación ya hecha (backtest/huellas.py). --plan solo
+  cuenta cuántas simulaciones distintas necesita la grilla.
+- Con --tiempos (o TIEMPOS_ETAPAS=1) mide cada etapa (datos, indicadores,
+  señales, simulación, …) por combinación y en total, imprime la tabla al
+  final y la guarda en JSON (utils/tiempos.py).
+
+Uso:
+    python mass_test.py                 # serial
+    python mass_test.py --paralelo      # un proceso por núcleo
+    python mass_test.py --paralelo --procesos 4
+    python mass_test.py --reanudar      # continúa una ejecución interrumpida
+    python mass_test.py --modo aleatoria --evaluaciones 5000
+    python mass_test.py --modo halving --segundos 300 --limite-drawdown 50
+    python mass_test.py --modo coordenadas --segundos 300
+    python mass_test.py --plan          # ensayo: cuenta simulaciones únicas
+    python mass_test.py --tiempos       # tiempo por etapa (tabla + tiempos_etapas.json)
 """
 
-import pandas as pd
+import argparse
+import time
+from itertools import product
+
 import config
 import grid_config   # Importa las listas definidas en grid_config.py
-from runBacktest import run_backtest
+from runBacktest import backtest_lote, preparar_df, TAM_LOTE_SENALES
+from utils.parametros import parametros_actuales
+from utils import cache_indicadores, tiempos
+from backtest import huellas
+from backtest.resultados import RegistroResultados, mejores_resultados, COLUMNAS_CLAVE
 
 # Listas principales a iterar
 SYMBOL_LIST        = grid_config.SYMBOL_LIST
@@ -26,81 +63,243 @@ DI_list            = grid_config.DIFERENCIA_DI_LIST
 TP_list = grid_config.TP_LIST
 SL_list = grid_config.SL_LIST
 
+# SL_LIST viene en % positivo; el motor usa la convención de config.py (SL negativo)
+SL_niveles = [-abs(sl) for sl in SL_list]
+
 # (Opcional) Si quieres variar SMAs:
 # SMA_fast_list = grid_config.SMA_CORTA_LIST
 # SMA_slow_list = grid_config.SMA_LARGA_LIST
 
-resultados = []
+CSV_RESULTADOS = "resumen_pruebas_masivas.csv"
+JSON_TIEMPOS = "tiempos_etapas.json"
 
-if __name__ == "__main__":
+# Muestra el encabezado de cada (símbolo, intervalo, total); --silencioso lo apaga
+VERBOSO = True
+
+
+def combinaciones_umbral(base):
+    """
+    Devuelve [(rsi, adx, dif, Parametros)] en el orden de los bucles
+    originales. (Opcional) si iteras SMAs, agrégalas aquí con
+    base._replace(SMA_CORTA=..., SMA_LARGA=...).
+    """
+    return [
+        (rsi_val, adx_val, dif_val,
+         base._replace(RSI_CORTE=rsi_val, ADX_THRESHOLD=adx_val, DIFERENCIA_DI=dif_val))
+        for rsi_val in RSI_list
+        for adx_val in ADX_list
+        for dif_val in DI_list
+    ]
+
+
+def claves_combinacion(symbol, interval, total, rsi_val, adx_val, dif_val, limite=None):
+    """Tuplas completas de parámetros (orden COLUMNAS_CLAVE) para toda la grilla TP × SL."""
+    return [
+        (symbol, interval, total, rsi_val, adx_val, dif_val, tp_val, sl_val, limite)
+        for tp_val, sl_val in product(TP_list, SL_list)
+    ]
+
+
+def anotar_resultados(registro, lista_metricas, symbol, interval, total, rsi_val, adx_val, dif_val,
+                      limite=None):
+    """
+    Agrega los parámetros (y el límite de drawdown usado) a cada dict de
+    métricas y los envía al registro (omitiendo los TP/SL que ya estaban
+    guardados al reanudar).
+    """
+    for (tp_val, sl_val), metrics in zip(product(TP_list, SL_list), lista_metricas):
+        if registro.ya_hecho((symbol, interval, total, rsi_val, adx_val, dif_val, tp_val, sl_val, limite)):
+            continue
+        metrics["Symbol"]        = symbol
+        metrics["Interval"]      = interval
+        metrics["Total_Candles"] = total
+        metrics["RSI_CORTE"]     = rsi_val
+        metrics["ADX_THRESHOLD"] = adx_val
+        metrics["DIFERENCIA_DI"]  = dif_val
+        metrics["TP (%)"]        = tp_val
+        metrics["SL (%)"]        = sl_val
+        metrics["LIMITE_DRAWDOWN"] = limite
+        registro.agregar(metrics)
+
+
+def ejecutar(base, registro, pool=None):
+    """
+    Recorre la grilla y envía cada resultado al registro. Con `pool`, los
+    lotes de combinaciones se evalúan en paralelo (backtest/paralelo.py).
+    """
+    combinaciones = combinaciones_umbral(base)
     for symbol in SYMBOL_LIST:
         # Asignar símbolo en config para los prints
         config.SYMBOL = symbol
 
         for interval in INTERVAL_LIST:
             for total in TOTAL_CANDLES_LIST:
-                for rsi_val in RSI_list:
-                    for adx_val in ADX_list:
-                        for dif_val in DI_list:
-                            for tp_val in TP_list:
-                                for sl_val in SL_list:
-                                    # (Opcional) si iteras SMAs, anida aquí:
-                                    # for sma_fast in SMA_fast_list:
-                                    #     for sma_slow in SMA_slow_list:
-                                    #         config.SMA_CORTA = sma_fast
-                                    #         config.SMA_LARGA = sma_slow
-
-                                    # Sobrescribir valores en config
-                                    config.RSI_CORTE     = rsi_val
-                                    config.ADX_THRESHOLD = adx_val
-                                    config.DIFERENCIA_DI = dif_val
-                                    config.TP            = tp_val
-                                    config.SL            = sl_val
-
-                                    etiqueta = (
-                                        f"SYMBOL={symbol}, "
-                                        f"INTERVAL={interval}, "
-                                        f"TOTAL={total}, "
-                                        f"RSI={rsi_val}, "
-                                        f"ADX={adx_val}, "
-                                        f"DIF_DI={dif_val}, "
-                                        f"TP={tp_val}%, "
-                                        f"SL={sl_val}%"
-                                    )
-                                    print("\n" + "="*70)
-                                    print(f">>> Iniciando prueba: {etiqueta}")
-                                    print("="*70 + "\n")
-
-                                    # Ejecutar backtest y capturar métricas
-                                    metrics = run_backtest(symbol, interval, total)
-
-                                    if metrics:
-                                        # Agregar parámetros al diccionario de métricas
-                                        metrics["Symbol"]        = symbol
-                                        metrics["Interval"]      = interval
-                                        metrics["Total_Candles"] = total
-                                        metrics["RSI_CORTE"]     = rsi_val
-                                        metrics["ADX_THRESHOLD"] = adx_val
-                                        metrics["DIFERENCIA_DI"]  = dif_val
-                                        metrics["TP (%)"]        = tp_val
-                                        metrics["SL (%)"]        = sl_val
-                                        resultados.append(metrics)
-                                    else:
-                                        print(f"⚠️ No se obtuvieron métricas para: {etiqueta}")
-
-    # Construir DataFrame si hay resultados
-    if resultados:
-        df_summary = pd.DataFrame(resultados)
-
-        # Mostrar por pantalla (sin índices para legibilidad)
+                pendientes = [
+                    c for c in combinaciones
+                    if not all(registro.ya_hecho(k) for k in
+                               claves_combinacion(symbol, interval, total, *c[:3], base.LIMITE_DRAWDOWN))
+                ]
+                if not pendientes:
+                    continue
+
+                if VERBOSO:
+                    print("\n" + "="*70)
+                    print(f">>> Iniciando prueba: SYMBOL={symbol}, INTERVAL={interval}, TOTAL={total} "
+                          f"({len(pendientes)} combinaciones de umbrales × TP={TP_list}% × SL={SL_list}%)")
+                    print("="*70 + "\n")
+
+                with tiempos.combinacion(symbol, interval, total):
+                    df = preparar_df(symbol, interval, total, base.DIAS_TEST)
+                    if df.empty:
+                        print(f"⚠️ No se obtuvieron métricas para: {symbol} {interval} TOTAL={total}")
+                        continue
+
+                    # Señales por lotes de combinaciones y todas las TP/SL en una pasada
+                    lista_parametros = [c[3] for c in pendientes]
+                    if pool is None:
+                        lotes = backtest_lote(df, lista_parametros, TP_list, SL_niveles)
+                    else:
+                        lotes = ejecutar_grilla(pool, df, lista_parametros, TP_list, SL_niveles)
+
+                for (rsi_val, adx_val, dif_val, _), lista_metricas in zip(pendientes, lotes):
+                    anotar_resultados(registro, lista_metricas, symbol, interval, total,
+                                      rsi_val, adx_val, dif_val, base.LIMITE_DRAWDOWN)
+                # Cada (símbolo, intervalo, total) terminado queda en disco
+                registro.vaciar()
+
+
+def planificar(base):
+    """
+    Ensayo sin simular: prepara cada conjunto de velas y evalúa las señales
+    de todas las combinaciones para contar cuántas simulaciones distintas
+    necesita realmente la grilla (huella de ventana + huella de señales).
+    """
+    combinaciones = combinaciones_umbral(base)
+    lista_parametros = [c[3] for c in combinaciones]
+    por_simulacion = len(TP_list) * len(SL_list)
+    ventanas = set()
+    unicas = set()
+    total_combinaciones = 0
+
+    for symbol in SYMBOL_LIST:
+        config.SYMBOL = symbol
+        for interval in INTERVAL_LIST:
+            for total in TOTAL_CANDLES_LIST:
+                df = preparar_df(symbol, interval, total, base.DIAS_TEST)
+                if df.empty:
+                    continue
+                ventana = huellas.huella_velas(df)
+                ventanas.add(ventana)
+                nuevas = {(ventana,) + h for h in huellas.huellas_lote(df, lista_parametros, TAM_LOTE_SENALES)}
+                if VERBOSO:
+                    print(f"🧮 {symbol} {interval} TOTAL={total}: {len(nuevas)} señales distintas "
+                          f"de {len(lista_parametros)} combinaciones")
+                unicas |= nuevas
+                total_combinaciones += len(lista_parametros)
+
+    print("\n" + "*"*70)
+    print("Plan de la grilla (sin simular):\n")
+    print(f"  Conjuntos de velas distintos : {len(ventanas)}")
+    print(f"  Combinaciones de umbrales    : {total_combinaciones}")
+    print(f"  Simulaciones necesarias      : {len(unicas)}")
+    print(f"  Backtests (× TP × SL)        : {total_combinaciones * por_simulacion} "
+          f"→ {len(unicas) * por_simulacion} únicos")
+    print("*"*70 + "\n")
+
+
+def ejecutar_busqueda(base, registro, modo, presupuesto, semilla=None):
+    """
+    Búsqueda adaptativa (backtest/busqueda.py) en lugar de la grilla completa.
+    Guarda en el registro los resultados evaluados con la ventana completa.
+    """
+    from backtest.busqueda import ESTRATEGIAS
+    argumentos = {} if modo == "coordenadas" else {"semilla": semilla}
+    resultados = ESTRATEGIAS[modo](base, presupuesto, **argumentos)
+    completos = [fila for fila in resultados if fila.get("Ventana", 1) == 1]
+    if not completos:
+        print(f"⚠️ La búsqueda '{modo}' no produjo resultados con la ventana completa: no se guardó nada.")
+    for fila in completos:
+        clave = tuple(fila[c] for c in COLUMNAS_CLAVE)
+        if not registro.ya_hecho(clave):
+            registro.agregar(fila)
+    print(f"🔎 Búsqueda '{modo}': {presupuesto.usadas} evaluaciones en "
+          f"{time.perf_counter() - presupuesto.inicio:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pruebas masivas sobre grid_config.py")
+    parser.add_argument("--modo", default="grilla",
+                        choices=["grilla", "aleatoria", "halving", "coordenadas"],
+                        help="grilla completa (por defecto) o una búsqueda adaptativa")
+    parser.add_argument("--evaluaciones", type=int, default=None,
+                        help="Presupuesto de evaluaciones para las búsquedas adaptativas")
+    parser.add_argument("--segundos", type=float, default=None,
+                        help="Presupuesto de tiempo (segundos) para las búsquedas adaptativas")
+    parser.add_argument("--semilla", type=int, default=None,
+                        help="Semilla del muestreo aleatorio (aleatoria / halving)")
+    parser.add_argument("--limite-drawdown", type=float, default=None,
+                        help="Aborta cada backtest cuando la pérdida supera este %% del saldo inicial")
+    parser.add_argument("--plan", action="store_true",
+                        help="Solo informa cuántas simulaciones distintas necesita la grilla")
+    parser.add_argument("--silencioso", action="store_true",
+                        help="No imprime el encabezado de cada conjunto de velas")
+    parser.add_argument("--paralelo", action="store_true",
+                        help="Reparte las combinaciones entre varios procesos")
+    parser.add_argument("--procesos", type=int, default=None,
+                        help="Cantidad de procesos (por defecto, uno por núcleo)")
+    parser.add_argument("--reanudar", action="store_true",
+                        help="Conserva el CSV existente y salta las combinaciones ya guardadas")
+    parser.add_argument("--salida", default=CSV_RESULTADOS,
+                        help=f"CSV de resultados (por defecto {CSV_RESULTADOS})")
+    parser.add_argument("--tiempos", action="store_true",
+                        help="Mide el tiempo de cada etapa (también con TIEMPOS_ETAPAS=1)")
+    parser.add_argument("--tiempos-json", default=JSON_TIEMPOS,
+                        help=f"JSON con los tiempos por etapa (por defecto {JSON_TIEMPOS})")
+    args = parser.parse_args()
+    VERBOSO = not args.silencioso
+    if args.tiempos:
+        tiempos.activar()
+
+    # Parámetros base: los valores de config.py al iniciar
+    base = parametros_actuales()
+    if args.limite_drawdown is not None:
+        base = base._replace(LIMITE_DRAWDOWN=args.limite_drawdown)
+
+    if args.plan:
+        planificar(base)
+        raise SystemExit(0)
+
+    with RegistroResultados(args.salida, reanudar=args.reanudar) as registro:
+        try:
+            if args.modo != "grilla":
+                from backtest.busqueda import Presupuesto
+                presupuesto = Presupuesto(args.evaluaciones, args.segundos)
+                if presupuesto.evaluaciones is None and presupuesto.segundos is None:
+                    presupuesto.segundos = 600
+                    print("⚠️ Sin presupuesto indicado: se usarán 600 segundos.")
+                ejecutar_busqueda(base, registro, args.modo, presupuesto, args.semilla)
+            elif args.paralelo:
+                from backtest.paralelo import crear_pool, ejecutar_grilla
+                with crear_pool(args.procesos) as pool:
+                    ejecutar(base, registro, pool)
+            else:
+                ejecutar(base, registro)
+        except KeyboardInterrupt:
+            print("\n🛑 Interrumpido: los resultados ya escritos se conservan (usa --reanudar).")
+        filas_nuevas = registro.filas_nuevas + len(registro.bufer)
+
+    print(f"🗃️ Caché de indicadores: {cache_indicadores.estadisticas()}")
+    print(f"♻️ Simulaciones: {huellas.estadisticas()}")
+    if tiempos.activo():
+        tiempos.resumen()
+        tiempos.volcar(args.tiempos_json)
+
+    if filas_nuevas:
+        # Mostrar por pantalla las mejores combinaciones (sin cargar todo el CSV)
         print("\n" + "*"*70)
-        print("Resumen de todas las combinaciones probadas:\n")
-        print(df_summary.to_string(index=False))
+        print("Mejores combinaciones probadas (sin backtests abortados):\n")
+        print(mejores_resultados(args.salida).to_string(index=False))
         print("*"*70 + "\n")
-
-        # Guardar a CSV
-        csv_path = "resumen_pruebas_masivas.csv"
-        df_summary.to_csv(csv_path, index=False)
-        print(f"✅ Resumen completo guardado en: {csv_path}")
+        print(f"✅ {filas_nuevas} resultados nuevos guardados en: {args.salida}")
     else:
-        print("⚠️ No se recolectaron resultados (quizá hubo errores o data vacía).")
+        print("⚠️ No se recolectaron resultados nuevos (quizá hubo errores, data vacía o ya estaban todos).")
@@ -3,7 +3,7 @@ import time
 from config import ANALYSIS_INTERVAL
 from utils.binance_data import actualizar_datos, obtener_klines
 from utils.resample import resamplear
-from utils.indicadores import calcular_indicadores
+from utils.indicadores_incrementales import IndicadoresIncrementales, indicadores_en_vivo
 from utils.consola import mostrar_ultimo
 from utils.estrategia import evaluar_senal
 
@@ -19,10 +19,10 @@ def esperar_nueva_vela(ultimo_timestamp):
         time.sleep(1)
 
 if __name__ == "__main__":
+    motor = IndicadoresIncrementales()
     while True:
         df_actual = actualizar_datos()
-        df_resampled = resamplear(df_actual, ANALYSIS_INTERVAL)
-        df_final = calcular_indicadores(df_resampled)
+        df_final = indicadores_en_vivo(df_actual, motor)
         mostrar_ultimo(df_final)
         evaluar_senal(df_final)
         ultima_ts = df_final.index[-1]
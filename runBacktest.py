@@ -5,19 +5,36 @@ import sys
 import os
 from datetime import timedelta
 
+import numpy as np
 import pandas as pd
 import pytz
 
-from config import DIAS_TEST, SALDO_INICIAL, APALANCAMIENTO, TP, SL, CONFIRMACION_AVISO, TIMEZONE
+from config import TIMEZONE, INTERVALOS_DESDE_1M
 from utils.getCandles import obtener_klines_pandas
+from utils.descarga_klines import MAX_LIMIT, actualizar_delta
 from utils.binance_data import cargar_datos_csv
 from utils.resample import resamplear
 from utils.indicadores import calcular_indicadores
-from utils.estrategia import evaluar_senal
-from backtest.simulador import simular_operaciones
+from utils import almacen_velas, cache_indicadores, tiempos, velas_derivadas
+from utils.estrategia import evaluar_senales, evaluar_senales_lote
+from utils.parametros import Parametros, parametros_actuales
+from backtest import huellas
+from backtest.libro import LibroOperaciones, indicadores_rendimiento, CAUSA_TP, CAUSA_SL
+from backtest.eventos import (
+    Sumidero, SumideroConsola, OPERACIONES, VELAS, FORMATO_FECHA,
+    NIVELES, nivel_desde_texto
+)
+from backtest.motor import (
+    preparar_eventos, buscar_entrada, detalle_confirmacion,
+    primer_indice, desplazar, nombre_lado, simular_tp_sl
+)
 
 tz_local = pytz.timezone(TIMEZONE)
 
+# Combinaciones de umbrales evaluadas juntas en backtest_lote (limita la memoria
+# de la matriz de señales: combinaciones × velas booleanos)
+TAM_LOTE_SENALES = 128
+
 _VALID_INTERVALS = {
     "1m", "3m", "5m", "15m", "30m",
     "1h", "2h", "4h", "6h", "8h", "12h",
@@ -36,20 +53,11 @@ def _interval_to_pandas_offset(interval: str) -> str:
     raise ValueError(f"Intervalo no soportado: {interval}")
 
 
-def _csv_necesita_actualizar(filepath: str, interval: str, total_candles: int) -> bool:
-    try:
-        df_old = pd.read_csv(
-            filepath,
-            parse_dates=["Datetime"],
-            infer_datetime_format=True
-        ).set_index("Datetime")
-    except Exception:
-        return True
-
-    if len(df_old) < total_candles:
+def _velas_necesitan_actualizar(almacen, interval: str, total_candles: int) -> bool:
+    if almacen is None or len(almacen) < total_candles:
         return True
 
-    last_ts = df_old.index[-1]
+    last_ts = almacen.ultima_marca()
     pandas_offset = _interval_to_pandas_offset(interval)
     now_local = pd.Timestamp.now(tz_local)
     floor_ts = now_local.floor(pandas_offset)
@@ -58,21 +66,38 @@ def _csv_necesita_actualizar(filepath: str, interval: str, total_candles: int) -
 
 
 def _asegurar_datos(symbol: str, interval: str, total_candles: int) -> pd.DataFrame:
+    """
+    Velas de data/{SYMBOL}_{interval}.velas (utils/almacen_velas.py, mapeadas
+    en memoria). Solo se descargan los rangos que el almacén no tiene
+    (principio, final o huecos; utils/descarga_klines.actualizar_delta) y se
+    agregan en su lugar. Un CSV antiguo sin almacén se importa la primera vez.
+    Los intervalos de config.INTERVALOS_DESDE_1M se construyen a partir de
+    las velas de 1m (utils/velas_derivadas.py).
+    """
     if interval not in _VALID_INTERVALS:
         print(f"❌ Intervalo '{interval}' no válido. Usa uno de: {sorted(_VALID_INTERVALS)}")
         return pd.DataFrame()
 
     carpeta = "data"
     os.makedirs(carpeta, exist_ok=True)
-    filename = f"{symbol.upper()}_{interval}.csv"
-    filepath = os.path.join(carpeta, filename)
+    ruta = almacen_velas.ruta_almacen(symbol, interval, carpeta)
+    if interval in INTERVALOS_DESDE_1M:
+        # Una sola serie de 1m (redondeada a páginas completas) sirve a todos los intervalos
+        factor = almacen_velas.PASO_MS[interval] // almacen_velas.PASO_MS["1m"]
+        velas_1m = -(-(total_candles + 1) * factor // MAX_LIMIT) * MAX_LIMIT
+        if actualizar_delta(symbol, "1m", velas_1m, carpeta) is None:
+            return pd.DataFrame()
+        return velas_derivadas.cargar_derivadas(symbol, interval, ultimas=total_candles,
+                                                columnas=almacen_velas.COLUMNAS_OHLCV, carpeta=carpeta)
 
-    necesita = True
-    if os.path.isfile(filepath):
-        if not _csv_necesita_actualizar(filepath, interval, total_candles):
-            necesita = False
+    if interval in almacen_velas.PASO_MS:
+        if actualizar_delta(symbol, interval, total_candles, carpeta) is None:
+            return pd.DataFrame()
+        return almacen_velas.cargar(ruta, ultimas=total_candles, columnas=almacen_velas.COLUMNAS_OHLCV)
 
-    if necesita:
+    # "1M" no tiene duración fija: se descarga la ventana completa
+    almacen = almacen_velas.abrir(ruta)
+    if _velas_necesitan_actualizar(almacen, interval, total_candles):
         print(f"🌐 Descargando {total_candles} velas de {symbol.upper()} [{interval}] …")
         df_new = obtener_klines_pandas(symbol, interval, total_candles)
         if df_new.empty:
@@ -82,79 +107,342 @@ def _asegurar_datos(symbol: str, interval: str, total_candles: int) -> pd.DataFr
         df_new = df_new.set_index("Datetime")
         if len(df_new) > total_candles:
             df_new = df_new.sort_index(ascending=False).head(total_candles).sort_index()
-        df_new.to_csv(filepath, index=True)
-        print(f"✅ Archivo actualizado: {filepath}")
+        almacen_velas.guardar(ruta, df_new)
+        print(f"✅ Archivo actualizado: {ruta}")
         return df_new
 
-    df_old = pd.read_csv(
-        filepath,
-        parse_dates=["Datetime"],
-        infer_datetime_format=True
-    ).set_index("Datetime")
-    if len(df_old) > total_candles:
-        df_old = df_old.sort_index(ascending=False).head(total_candles).sort_index()
-    return df_old
+    return almacen_velas.cargar(ruta, ultimas=total_candles, columnas=almacen_velas.COLUMNAS_OHLCV)
+
+
+def preparar_df(symbol: str, interval: str, total_candles: int, dias_test: int) -> pd.DataFrame:
+    """
+    Carga (o descarga) las velas, calcula indicadores y recorta a los últimos
+    `dias_test` días. Devuelve un DataFrame vacío si no hay datos.
+
+    Las velas con indicadores se guardan en utils/cache_indicadores, así que
+    las llamadas repetidas con el mismo símbolo/intervalo/total (p. ej. en
+    mass_test.py) no vuelven a leer el CSV ni a recalcular indicadores.
+    """
+    clave = cache_indicadores.clave_cache(symbol, interval, total_candles)
+    df = cache_indicadores.obtener(clave)
+    if df is None:
+        with tiempos.etapa("datos", total_candles):
+            df = _asegurar_datos(symbol, interval, total_candles)
+        if df.empty:
+            return df
+
+        with tiempos.etapa("indicadores", len(df)):
+            df = df.sort_index(ascending=True)
+            df = calcular_indicadores(df)
+        cache_indicadores.guardar(clave, df)
+
+    with tiempos.etapa("recorte", len(df)):
+        df = df.last(f"{dias_test}D")
+    if df.empty:
+        print(f"❌ No hay datos en los últimos {dias_test} días para {symbol.upper()}-{interval}.")
+    return df
+
 
+def saldo_minimo(parametros: Parametros):
+    """
+    Saldo bajo el cual se aborta un backtest según LIMITE_DRAWDOWN
+    (% de pérdida sobre SALDO_INICIAL), o None si no hay límite.
+    """
+    if parametros.LIMITE_DRAWDOWN is None:
+        return None
+    return parametros.SALDO_INICIAL * (1 - abs(parametros.LIMITE_DRAWDOWN) / 100)
 
-def run_backtest(symbol: str, interval: str, total_candles: int) -> dict:
-    df = _asegurar_datos(symbol, interval, total_candles)
+
+def _metricas_rendimiento(valores: dict) -> dict:
+    """Redondea Profit Factor / Sharpe / Max Drawdown / Exposición de un backtest."""
+    return {
+        "Profit Factor": round(float(valores["Profit Factor"]), 4),
+        "Sharpe": round(float(valores["Sharpe"]), 4),
+        "Max Drawdown (%)": round(float(valores["Max Drawdown (%)"]), 2),
+        "Exposicion (%)": round(float(valores["Exposicion (%)"]), 2),
+    }
+
+
+def backtest_grilla(datos, parametros: Parametros, tp_list, sl_list,
+                    apalancamiento_list=None, senales=None, huella=None) -> list:
+    """
+    Núcleo de run_backtest_grilla sobre velas ya preparadas (indicadores
+    calculados y recortadas a DIAS_TEST). No lee config.py ni imprime nada.
+
+    Parámetros:
+        datos               (pd.DataFrame|dict): Columnas Open/High/Low e indicadores.
+        parametros          (Parametros)       : Umbrales de señal y capital inicial.
+        tp_list, sl_list    (list)             : Niveles a combinar (SL negativo).
+        apalancamiento_list (list)             : Opcional, por defecto el de parametros.
+        senales             (tuple)            : Opcional, (long, short) ya evaluadas
+                                                 para `parametros`.
+        huella              (bytes)            : Opcional, huellas.huella_velas(datos).
+
+    Si la misma ventana de velas con las mismas señales y niveles ya se
+    simuló (backtest/huellas.py), se reutiliza ese resultado.
+
+    Retorna:
+        list[dict]: Métricas en el orden de itertools.product(tp_list, sl_list,
+                    apalancamiento_list).
+    """
+    if apalancamiento_list is None:
+        apalancamiento_list = [parametros.APALANCAMIENTO]
+    tp, sl, lev = np.meshgrid(tp_list, sl_list, apalancamiento_list, indexing="ij")
+    saldo_inicial = parametros.SALDO_INICIAL
+
+    minimo = saldo_minimo(parametros)
+    n = len(datos["Open"])
+
+    if senales is None:
+        with tiempos.etapa("senales", n):
+            senales = evaluar_senales(datos, parametros)
+    senal_long, senal_short = senales
+    with tiempos.etapa("huellas", n):
+        if huella is None:
+            huella = huellas.huella_velas(datos)
+        clave = huellas.clave_simulacion(
+            huella, senal_long, senal_short, parametros.CONFIRMACION_AVISO,
+            tp, sl, lev, saldo_inicial, minimo
+        )
+        resultado = huellas.obtener(clave)
+    if resultado is None:
+        with tiempos.etapa("simulacion", n):
+            eventos = preparar_eventos(desplazar(senal_long), desplazar(senal_short))
+            resultado = simular_tp_sl(
+                eventos,
+                np.asarray(datos["Open"], dtype=float),
+                np.asarray(datos["High"], dtype=float),
+                np.asarray(datos["Low"], dtype=float),
+                parametros.CONFIRMACION_AVISO, tp, sl, lev, saldo_inicial,
+                saldo_minimo=minimo
+            )
+        huellas.guardar(clave, resultado)
+
+    with tiempos.etapa("metricas", tp.size):
+        return _metricas_grilla(resultado, tp.size, saldo_inicial, n)
+
+
+def _metricas_grilla(resultado: dict, total: int, saldo_inicial: float, n: int) -> list:
+    """Métricas de cada posición de la grilla a partir del resultado de simular_tp_sl."""
+    rendimiento = indicadores_rendimiento(
+        resultado["Ganancia Bruta"], resultado["Perdida Bruta"],
+        resultado["Suma PnL"], resultado["Suma PnL2"], resultado["Operaciones"],
+        resultado["Max Drawdown"], resultado["Velas Expuestas"], max(n - 1, 1)
+    )
+
+    metricas = []
+    for k in range(total):
+        saldo = resultado["Saldo Final"][k]
+        rentabilidad = ((saldo / saldo_inicial) - 1) * 100
+        metricas.append({
+            "Operaciones": int(resultado["Operaciones"][k]),
+            "Longs": int(resultado["Longs"][k]),
+            "Shorts": int(resultado["Shorts"][k]),
+            "Ganadoras": int(resultado["Ganadoras"][k]),
+            "Perdedoras": int(resultado["Perdedoras"][k]),
+            "Saldo Final": round(saldo, 2),
+            "Rentabilidad (%)": round(rentabilidad, 2),
+            **_metricas_rendimiento({c: v[k] for c, v in rendimiento.items()}),
+            "Abortada": bool(resultado["Abortada"][k]),
+        })
+    return metricas
+
+
+def backtest_lote(datos, lista_parametros, tp_list, sl_list,
+                  apalancamiento_list=None, tam_lote: int = TAM_LOTE_SENALES) -> list:
+    """
+    backtest_grilla para muchas combinaciones de umbrales sobre las mismas
+    velas. Las señales se evalúan por lotes de `tam_lote` combinaciones con
+    evaluar_senales_lote (una matriz por lote) y luego cada fila alimenta al
+    simulador TP/SL. La huella de la ventana se calcula una sola vez.
+
+    Retorna:
+        list[list[dict]]: Una lista de métricas por cada Parametros.
+    """
+    resultados = []
+    n = len(datos["Open"])
+    with tiempos.etapa("huellas", n):
+        huella = huellas.huella_velas(datos)
+    for inicio in range(0, len(lista_parametros), tam_lote):
+        lote = lista_parametros[inicio:inicio + tam_lote]
+        with tiempos.etapa("senales", n * len(lote)):
+            senal_long, senal_short = evaluar_senales_lote(datos, lote)
+        for k, parametros in enumerate(lote):
+            with tiempos.combinacion(f"RSI={parametros.RSI_CORTE} ADX={parametros.ADX_THRESHOLD} "
+                                     f"DI={parametros.DIFERENCIA_DI}"):
+                resultados.append(backtest_grilla(
+                    datos, parametros, tp_list, sl_list, apalancamiento_list,
+                    senales=(senal_long[k], senal_short[k]), huella=huella
+                ))
+    return resultados
+
+
+def run_backtest_grilla(symbol: str, interval: str, total_candles: int,
+                        tp_list, sl_list, apalancamiento_list=None,
+                        parametros: Parametros = None) -> list:
+    """
+    Ejecuta el backtest de run_backtest para todas las combinaciones
+    TP × SL × apalancamiento en una sola pasada sobre las mismas señales.
+
+    Los niveles siguen la convención de config.py (SL negativo). Las
+    métricas de cada combinación coinciden con las de run_backtest.
+    Si no se entregan `parametros`, se toman los valores actuales de config.py.
+
+    Retorna:
+        list[dict]: Métricas en el orden de itertools.product(tp_list, sl_list,
+                    apalancamiento_list); lista vacía si no hay datos.
+    """
+    p = parametros if parametros is not None else parametros_actuales()
+    df = preparar_df(symbol, interval, total_candles, p.DIAS_TEST)
     if df.empty:
-        return {}
+        return []
+    return backtest_grilla(df, p, tp_list, sl_list, apalancamiento_list)
+
+
+def _fecha(registro) -> str:
+    return registro["fecha"].strftime(FORMATO_FECHA)
+
+
+# Formatos de consola de run_backtest (backtest/eventos.py)
+FORMATOS_CONSOLA = {
+    "confirmacion": lambda r: (
+        f"👀 {_fecha(r)} | Señal {r['lado'].upper()} ({r['cuenta']}/{r['requeridas']}) "
+        f"→ faltan {r['requeridas'] - r['cuenta']}"
+    ),
+    "entrada": lambda r: (
+        f"📈 ENTRADA CONFIRMADA {r['lado'].upper()} | {_fecha(r)} | Open={r['precio']:.2f} "
+        f"| TP={r['nivel_tp']:.2f} | SL={r['nivel_sl']:.2f}"
+    ),
+    "activa": lambda r: (
+        f"🕒 {_fecha(r)} | {r['lado'].upper()} activa sin tocar TP/SL | P/L actual: {r['pl']:.2f}%"
+    ),
+    "cierre": lambda r: (
+        f"✅ CIERRE {r['lado'].upper()} por {r['razon']} a {r['precio']:.2f} | {_fecha(r)} "
+        f"| P/L={r['pl']:.2f}% | Saldo={r['saldo']:.2f} USDT"
+    ),
+    "aborto": lambda r: (
+        f"🛑 Backtest abortado: saldo {r['saldo']:.2f} USDT bajo el límite de drawdown ({r['piso']:.2f} USDT)"
+    ),
+    "resumen": lambda r: (
+        "\n📊 RESULTADOS BACKTEST:\n\n"
+        f"🔁 Operaciones ejecutadas: {r['Operaciones']}\n"
+        f"🟢 Longs: {r['Longs']}     🔴 Shorts: {r['Shorts']}\n"
+        f"✅ Ganadoras: {r['Ganadoras']} ❌ Perdedoras: {r['Perdedoras']}\n\n"
+        f"💰 Saldo inicial: {r['saldo_inicial']:.2f} USDT\n"
+        f"💵 Saldo final  : {r['saldo']:.2f} USDT\n"
+        f"📈 Rentabilidad : {r['rentabilidad']:.2f}%"
+    ),
+}
+
 
-    df = df.sort_index(ascending=True)
-    df = calcular_indicadores(df)
-    df = df.last(f"{DIAS_TEST}D")
+def run_backtest(symbol: str, interval: str, total_candles: int,
+                 parametros: Parametros = None, sumidero: Sumidero = None,
+                 libro: LibroOperaciones = None) -> dict:
+    """
+    Backtest intrabar con TP/SL para un símbolo e intervalo.
+
+    Las entradas, cierres, confirmaciones y velas con operación abierta se
+    emiten a `sumidero` (backtest/eventos.py). Por defecto se imprimen en
+    consola con todo el detalle; con eventos.SILENCIOSO no se arma ni se
+    imprime nada.
+
+    Cada operación cerrada se registra en `libro` (backtest/libro.py); si no
+    se entrega uno, se usa uno interno para calcular las métricas.
+
+    Retorna:
+        dict: Métricas (Operaciones, Longs, Shorts, Ganadoras, Perdedoras,
+              Saldo Final, Rentabilidad (%), Profit Factor, Sharpe,
+              Max Drawdown (%), Exposicion (%)); vacío si no hay datos.
+    """
+    p = parametros if parametros is not None else parametros_actuales()
+    if sumidero is None:
+        sumidero = SumideroConsola(FORMATOS_CONSOLA)
+    TP, SL, APALANCAMIENTO = p.TP, p.SL, p.APALANCAMIENTO
+    CONFIRMACION_AVISO, SALDO_INICIAL = p.CONFIRMACION_AVISO, p.SALDO_INICIAL
+
+    df = preparar_df(symbol, interval, total_candles, p.DIAS_TEST)
     if df.empty:
-        print(f"❌ No hay datos en los últimos {DIAS_TEST} días para {symbol.upper()}-{interval}.")
         return {}
 
+    piso = saldo_minimo(p)
     saldo = SALDO_INICIAL
-    operacion_activa = False
-    tipo_operacion = None
-    entrada = 0.0
-
     longs = shorts = ganadoras = perdedoras = operaciones = 0
-    senal_contador = {"long": 0, "short": 0}
-
-    # Variables para TP/SL intrabar
-    NivelTP = None
-    NivelSL = None
-
-    for i in range(1, len(df)):
-        fila = df.iloc[i]
-        fecha = df.index[i]
-        precio_open = fila["Open"]
-        high = fila["High"]
-        low = fila["Low"]
-        precio_close = fila["Close"]
-        fecha_str = fecha.strftime("%Y-%m-%d %H:%M:%S")
-
-        # 1) Si hay operación activa, verificar intrabar TP/SL
-        if operacion_activa:
+    por_vela = sumidero.nivel >= VELAS
+    por_operacion = sumidero.nivel >= OPERACIONES
+
+    # Señales de todas las velas en una pasada. La señal de la vela i se evalúa
+    # con la vela anterior (equivale a evaluar_senal(df.iloc[:i])).
+    with tiempos.etapa("senales", len(df)):
+        senal_long, senal_short = evaluar_senales(df, p)
+    with tiempos.etapa("simulacion", len(df)):
+        eventos = preparar_eventos(desplazar(senal_long), desplazar(senal_short))
+
+        fechas = df.index
+        marcas = fechas.asi8
+        apertura = df["Open"].to_numpy(dtype=float)
+        maximos = df["High"].to_numpy(dtype=float)
+        minimos = df["Low"].to_numpy(dtype=float)
+        cierres = df["Close"].to_numpy(dtype=float)
+        n = len(df)
+
+        if libro is None:
+            libro = LibroOperaciones(SALDO_INICIAL)
+        libro.saldo_inicial = float(SALDO_INICIAL)
+        libro.total_velas = max(n - 1, 1)
+
+        i = 1
+        while i < n:
+            # 1) Sin operación activa: buscar la vela donde se confirma la señal
+            pos = buscar_entrada(eventos, i, CONFIRMACION_AVISO)
+            barra_entrada = int(eventos["idx"][pos]) if pos is not None else n
+
+            if por_vela:
+                velas, lados, cuentas = detalle_confirmacion(eventos, i, barra_entrada)
+                for barra, lado, cuenta in zip(velas, lados, cuentas):
+                    sumidero.emitir("confirmacion", fecha=fechas[barra], lado=nombre_lado(lado),
+                                    cuenta=int(cuenta), requeridas=CONFIRMACION_AVISO)
+
+            if pos is None:
+                break
+
+            tipo_operacion = nombre_lado(eventos["lado"][pos])
+            entrada = apertura[barra_entrada]
             if tipo_operacion == "long":
-                if low <= NivelSL:
-                    precio_salida = NivelSL
-                    razon = "SL"
-                elif high >= NivelTP:
-                    precio_salida = NivelTP
-                    razon = "TP"
-                else:
-                    variacion_raw = (precio_close - entrada) / entrada
-                    variacion_pct = variacion_raw * 100 * APALANCAMIENTO
-                    print(f"🕒 {fecha_str} | LONG activa sin tocar TP/SL | P/L actual: {variacion_pct:.2f}%")
-                    continue
+                NivelTP = entrada * (1 + (TP/100) / APALANCAMIENTO)
+                NivelSL = entrada * (1 + (SL/100) / APALANCAMIENTO)
+                toca = lambda a, b: (minimos[a:b] <= NivelSL) | (maximos[a:b] >= NivelTP)
             else:  # short
-                if high >= NivelSL:
-                    precio_salida = NivelSL
-                    razon = "SL"
-                elif low <= NivelTP:
-                    precio_salida = NivelTP
-                    razon = "TP"
+                NivelTP = entrada * (1 - (TP/100) / APALANCAMIENTO)
+                NivelSL = entrada * (1 - (SL/100) / APALANCAMIENTO)
+                toca = lambda a, b: (maximos[a:b] >= NivelSL) | (minimos[a:b] <= NivelTP)
+
+            if por_operacion:
+                sumidero.emitir("entrada", fecha=fechas[barra_entrada], lado=tipo_operacion,
+                                precio=entrada, nivel_tp=NivelTP, nivel_sl=NivelSL)
+
+            # 2) Operación activa: primera vela que toca TP/SL intrabar
+            barra_salida = primer_indice(toca, barra_entrada + 1, n)
+            fin_activa = barra_salida if barra_salida >= 0 else n
+
+            if por_vela:
+                activas = cierres[barra_entrada + 1:fin_activa]
+                if tipo_operacion == "long":
+                    variacion_raw = (activas - entrada) / entrada
                 else:
-                    variacion_raw = (entrada - precio_close) / entrada
-                    variacion_pct = variacion_raw * 100 * APALANCAMIENTO
-                    print(f"🕒 {fecha_str} | SHORT activa sin tocar TP/SL | P/L actual: {variacion_pct:.2f}%")
-                    continue
+                    variacion_raw = (entrada - activas) / entrada
+                pl = variacion_raw * 100 * APALANCAMIENTO
+                for k, variacion_pct in zip(range(barra_entrada + 1, fin_activa), pl):
+                    sumidero.emitir("activa", fecha=fechas[k], lado=tipo_operacion, pl=variacion_pct)
+
+            if barra_salida < 0:
+                break
+
+            # SL tiene prioridad si ambos niveles se tocan en la misma vela
+            if tipo_operacion == "long":
+                sl_tocado = minimos[barra_salida] <= NivelSL
+            else:
+                sl_tocado = maximos[barra_salida] >= NivelSL
+            precio_salida = NivelSL if sl_tocado else NivelTP
 
             variacion_raw = (precio_salida - entrada) / entrada
             if tipo_operacion == "short":
@@ -172,71 +460,59 @@ def run_backtest(symbol: str, interval: str, total_candles: int) -> dict:
                 longs += 1
             else:
                 shorts += 1
+            libro.agregar(barra_entrada, barra_salida, marcas[barra_entrada], marcas[barra_salida],
+                          eventos["lado"][pos], entrada, precio_salida, variacion_pct,
+                          CAUSA_SL if sl_tocado else CAUSA_TP, saldo)
 
-            print(f"✅ CIERRE {tipo_operacion.upper()} por {razon} a {precio_salida:.2f} | {fecha_str} | P/L={variacion_pct:.2f}% | Saldo={saldo:.2f} USDT")
-
-            operacion_activa = False
-            tipo_operacion = None
-            senal_contador = {"long": 0, "short": 0}
-            continue
+            if por_operacion:
+                sumidero.emitir("cierre", fecha=fechas[barra_salida], lado=tipo_operacion,
+                                razon="SL" if sl_tocado else "TP", precio=precio_salida,
+                                pl=variacion_pct, saldo=saldo)
 
-        # 2) Si NO hay operación activa, evaluar señal en vela anterior
-        ventana = df.iloc[:i]
-        senal = evaluar_senal(ventana, solo_tipo=True)
+            # Los contadores de confirmación se reinician tras el cierre
+            i = barra_salida + 1
 
-        if senal:
-            senal_contador[senal] += 1
-            faltan = CONFIRMACION_AVISO - senal_contador[senal]
-
-            if senal_contador[senal] >= CONFIRMACION_AVISO:
-                entrada = precio_open
-                tipo_operacion = senal
-                operacion_activa = True
-                senal_contador = {"long": 0, "short": 0}
-
-                if tipo_operacion == "long":
-                    NivelTP = entrada * (1 + (TP/100) / APALANCAMIENTO)
-                    NivelSL = entrada * (1 + (SL/100) / APALANCAMIENTO)
-                else:  # short
-                    NivelTP = entrada * (1 - (TP/100) / APALANCAMIENTO)
-                    NivelSL = entrada * (1 - (SL/100) / APALANCAMIENTO)
-
-                print(f"📈 ENTRADA CONFIRMADA {tipo_operacion.upper()} | {fecha_str} | Open={entrada:.2f} | TP={NivelTP:.2f} | SL={NivelSL:.2f}")
-            else:
-                print(f"👀 {fecha_str} | Señal {senal.upper()} ({senal_contador[senal]}/{CONFIRMACION_AVISO}) → faltan {faltan}")
-                otro = "short" if senal == "long" else "long"
-                senal_contador[otro] = 0
+            if piso is not None and saldo < piso:
+                if por_operacion:
+                    sumidero.emitir("aborto", fecha=fechas[barra_salida], saldo=saldo, piso=piso)
+                break
 
     # 3) Resumen final
     rentabilidad = ((saldo / SALDO_INICIAL) - 1) * 100
-    print("\n📊 RESULTADOS BACKTEST:\n")
-    print(f"🔁 Operaciones ejecutadas: {operaciones}")
-    print(f"🟢 Longs: {longs}     🔴 Shorts: {shorts}")
-    print(f"✅ Ganadoras: {ganadoras} ❌ Perdedoras: {perdedoras}\n")
-    print(f"💰 Saldo inicial: {SALDO_INICIAL:.2f} USDT")
-    print(f"💵 Saldo final  : {saldo:.2f} USDT")
-    print(f"📈 Rentabilidad : {rentabilidad:.2f}%")
-
-    # Retornar diccionario con métricas
-    return {
+    with tiempos.etapa("metricas", len(libro)):
+        rendimiento = _metricas_rendimiento(libro.metricas())
+    metricas = {
         "Operaciones": operaciones,
         "Longs": longs,
         "Shorts": shorts,
         "Ganadoras": ganadoras,
         "Perdedoras": perdedoras,
         "Saldo Final": round(saldo, 2),
-        "Rentabilidad (%)": round(rentabilidad, 2)
+        "Rentabilidad (%)": round(rentabilidad, 2),
+        **rendimiento
     }
+    if por_operacion:
+        sumidero.emitir("resumen", saldo_inicial=SALDO_INICIAL, saldo=saldo,
+                        rentabilidad=rentabilidad, **metricas)
+
+    return metricas
 
 
 if __name__ == "__main__":
     if len(sys.argv) < 4:
-        print("Uso: python runBacktest.py <SYMBOL> <INTERVAL> <TOTAL_CANDLES>")
+        print("Uso: python runBacktest.py <SYMBOL> <INTERVAL> <TOTAL_CANDLES> [NIVEL]")
         print("Ejemplo: python runBacktest.py BTCUSDT 15m 2000")
+        print(f"NIVEL (opcional): {' | '.join(NIVELES)} (por defecto velas)")
         sys.exit(1)
 
     symbol_arg = sys.argv[1]
     interval_arg = sys.argv[2]
     total_candles_arg = int(sys.argv[3])
+    nivel_arg = nivel_desde_texto(sys.argv[4]) if len(sys.argv) > 4 else VELAS
+
+    _ = run_backtest(symbol_arg, interval_arg, total_candles_arg,
+                     sumidero=SumideroConsola(FORMATOS_CONSOLA, nivel_arg))
 
-    _ = run_backtest(symbol_arg, interval_arg, total_candles_arg)
+    # Con TIEMPOS_ETAPAS=1 se muestra el tiempo de cada etapa (utils/tiempos.py)
+    if tiempos.activo():
+        tiempos.resumen()
@@ -5,9 +5,37 @@ from config import DIAS_TEST, SALDO_INICIAL, APALANCAMIENTO, TP, SL, CONFIRMACIO
 from utils.binance_data import cargar_datos_locales
 from utils.resample import resamplear
 from utils.indicadores import calcular_indicadores
-from utils.estrategia import evaluar_senal
-from backtest.simulador import simular_operaciones
+from utils.estrategia import evaluar_senales
+from backtest.simulador import simular_operaciones, FORMATOS_SIMULAR
+from backtest.motor import (
+    LONG, SHORT, preparar_eventos, buscar_entrada, detalle_confirmacion,
+    primer_indice, nombre_lado
+)
+from backtest.libro import LibroOperaciones, CAUSA_TP, CAUSA_SL
+from backtest.eventos import SumideroConsola, OPERACIONES, VELAS, FORMATO_FECHA, nivel_desde_texto
 from datetime import timedelta
+import sys
+import numpy as np
+
+
+# Formatos de consola del backtest (backtest/eventos.py)
+FORMATOS_CONSOLA = {
+    "ignorada": lambda r: f"⛔ {r['fecha'].strftime(FORMATO_FECHA)} | Ignorada señal {r['lado'].upper()} (esperando {r['espera_min']} min)",
+    "confirmacion": lambda r: (
+        f"👀 {r['fecha'].strftime(FORMATO_FECHA)} | Señal {r['lado'].upper()} detectada ({r['cuenta']}/{r['requeridas']}). "
+        f"Faltan {r['requeridas'] - r['cuenta']} confirmaciones..."
+    ),
+    "entrada": lambda r: f"📈 ENTRADA CONFIRMADA {r['lado'].upper()} | {r['fecha'].strftime(FORMATO_FECHA)} | Precio: {r['precio']:.2f}",
+    "activa": lambda r: (
+        f"🕒 {r['fecha'].strftime(FORMATO_FECHA)} | ACTIVA: {r['lado'].upper()} | Entrada: {r['entrada']:.2f} | P/L: {r['pl']:.2f}%"
+    ),
+    "cierre": lambda r: f"✅ CIERRE {r['lado'].upper()} | Saldo: {r['saldo']:.2f} USDT | P/L: {r['pl']:.2f}%",
+}
+
+# Nivel de detalle opcional: python run_backtest.py [silencio|operaciones|velas]
+sumidero = SumideroConsola(FORMATOS_CONSOLA, nivel_desde_texto(sys.argv[1]) if len(sys.argv) > 1 else VELAS)
+por_vela = sumidero.nivel >= VELAS
+por_operacion = sumidero.nivel >= OPERACIONES
 
 
 saldo = SALDO_INICIAL
@@ -44,75 +72,99 @@ ultima_entrada = {
 }
 cooldown = timedelta(minutes=10)
 
-print("🔁 Ejecutando backtest...\n")
-simular_operaciones(df)
-
-senal_contador = {
-    "long": 0,
-    "short": 0
-}
-
-
-for i in range(1, len(df)):
-    fila = df.iloc[i]
-    fecha = df.index[i]
-    precio = fila["Close"]
-    fecha_str = fecha.strftime('%Y-%m-%d %H:%M:%S')
-
-    # Si hay una operación abierta, revisar si debe cerrarse
-    if operacion_activa:
-        variacion_pct = ((precio - entrada) / entrada) * 100
+if por_operacion:
+    print("🔁 Ejecutando backtest...\n")
+simular_operaciones(df, SumideroConsola(FORMATOS_SIMULAR, sumidero.nivel))
+
+# Señales de todas las velas en una sola pasada
+senal_long, senal_short = evaluar_senales(df)
+eventos = preparar_eventos(senal_long, senal_short)
+fechas = df.index
+fechas_ns = fechas.asi8
+cierres = df["Close"].to_numpy(dtype=float)
+n = len(df)
+
+# Libro de operaciones cerradas (backtest/libro.py)
+libro = LibroOperaciones(SALDO_INICIAL, max(n - 1, 1))
+
+
+def bloqueos_cooldown():
+    """Velas hasta las que cada tipo de señal queda ignorado por cooldown."""
+    bloqueos = {}
+    for lado, tipo in ((LONG, "long"), (SHORT, "short")):
+        ultima = ultima_entrada[tipo]
+        if ultima is not None:
+            limite = (ultima + cooldown).value
+            bloqueos[lado] = int(np.searchsorted(fechas_ns, limite, side="left"))
+    return bloqueos
+
+
+i = 1
+while i < n:
+    bloqueos = bloqueos_cooldown()
+    pos = buscar_entrada(eventos, i, CONFIRMACION_AVISO, bloqueos)
+    barra_entrada = int(eventos["idx"][pos]) if pos is not None else n
+
+    if por_vela:
+        velas, lados, cuentas = detalle_confirmacion(eventos, i, barra_entrada, bloqueos)
+        for barra, lado, cuenta in zip(velas, lados, cuentas):
+            senal = nombre_lado(lado)
+            fecha = fechas[barra]
+            if cuenta == 0:
+                tiempo_restante = (cooldown - (fecha - ultima_entrada[senal])).seconds // 60
+                sumidero.emitir("ignorada", fecha=fecha, lado=senal, espera_min=tiempo_restante)
+                continue
+            sumidero.emitir("confirmacion", fecha=fecha, lado=senal, cuenta=int(cuenta),
+                            requeridas=CONFIRMACION_AVISO)
+
+    if pos is None:
+        break
+
+    tipo_operacion = nombre_lado(eventos["lado"][pos])
+    entrada = cierres[barra_entrada]
+    ultima_entrada[tipo_operacion] = fechas[barra_entrada]
+    if por_operacion:
+        sumidero.emitir("entrada", fecha=fechas[barra_entrada], lado=tipo_operacion, precio=entrada)
+
+    # Variación apalancada al cierre de cada vela mientras la operación sigue abierta
+    def variaciones(a, b):
+        variacion_pct = ((cierres[a:b] - entrada) / entrada) * 100
         variacion_pct *= APALANCAMIENTO
         if tipo_operacion == "short":
             variacion_pct *= -1  # Inverso para short
+        return variacion_pct
+
+    toca = lambda a, b: (variaciones(a, b) >= TP) | (variaciones(a, b) <= SL)
+    barra_salida = primer_indice(toca, barra_entrada + 1, n)
+    fin_activa = barra_salida + 1 if barra_salida >= 0 else n
+
+    if por_vela:
+        pl = variaciones(barra_entrada + 1, fin_activa)
+        for k, variacion_pct in zip(range(barra_entrada + 1, fin_activa), pl):
+            sumidero.emitir("activa", fecha=fechas[k], lado=tipo_operacion, entrada=entrada, pl=variacion_pct)
+
+    if barra_salida < 0:
+        break
+
+    variacion_pct = variaciones(barra_salida, barra_salida + 1)[0]
+    ganancia = saldo * (variacion_pct / 100)
+    saldo += ganancia
+    libro.agregar(barra_entrada, barra_salida, fechas_ns[barra_entrada], fechas_ns[barra_salida],
+                  eventos["lado"][pos], entrada, cierres[barra_salida], variacion_pct,
+                  CAUSA_TP if variacion_pct >= TP else CAUSA_SL, saldo)
+    operaciones += 1
+    if variacion_pct > 0:
+        ganadoras += 1
+    else:
+        perdedoras += 1
+    if tipo_operacion == "long":
+        longs += 1
+    else:
+        shorts += 1
+    if por_operacion:
+        sumidero.emitir("cierre", fecha=fechas[barra_salida], lado=tipo_operacion, saldo=saldo, pl=variacion_pct)
+    i = barra_salida + 1
 
-        print(f"🕒 {fecha_str} | ACTIVA: {tipo_operacion.upper()} | Entrada: {entrada:.2f} | P/L: {variacion_pct:.2f}%")
-
-        if variacion_pct >= TP or variacion_pct <= SL:
-            ganancia = saldo * (variacion_pct / 100)
-            saldo += ganancia
-            operaciones += 1
-            if variacion_pct > 0:
-                ganadoras += 1
-            else:
-                perdedoras += 1
-            if tipo_operacion == "long":
-                longs += 1
-            else:
-                shorts += 1
-            print(f"✅ CIERRE {tipo_operacion.upper()} | Saldo: {saldo:.2f} USDT | P/L: {variacion_pct:.2f}%")
-            operacion_activa = False
-        continue
-
-    # Evaluar señal solo si no hay operación activa
-    fila_df = df.iloc[:i+1]
-    senal = evaluar_senal(fila_df, solo_tipo=True)
-
-    if senal:
-        ultima = ultima_entrada.get(senal)
-        if ultima is not None and (fecha - ultima) < cooldown:
-            tiempo_restante = (cooldown - (fecha - ultima)).seconds // 60
-            print(f"⛔ {fecha_str} | Ignorada señal {senal.upper()} (esperando {tiempo_restante} min)")
-            continue
-
-        # Incrementar confirmación para la señal detectada
-        senal_contador[senal] += 1
-        restantes = CONFIRMACION_AVISO - senal_contador[senal]
-
-        if senal_contador[senal] >= CONFIRMACION_AVISO:
-            tipo_operacion = senal
-            entrada = precio
-            operacion_activa = True
-            ultima_entrada[senal] = fecha
-            senal_contador[senal] = 0  # Reset al confirmar
-            print(f"📈 ENTRADA CONFIRMADA {tipo_operacion.upper()} | {fecha_str} | Precio: {entrada:.2f}")
-        else:
-            print(f"👀 {fecha_str} | Señal {senal.upper()} detectada ({senal_contador[senal]}/{CONFIRMACION_AVISO}). Faltan {restantes} confirmaciones...")
-
-        # Reiniciar el contador de la otra señal (opuesta)
-        otro_tipo = "short" if senal == "long" else "long"
-        senal_contador[otro_tipo] = 0
-            
 # Resultado final
 rentabilidad = ((saldo / SALDO_INICIAL) - 1) * 100
 print("\n📊 RESULTADOS BACKTEST:\n")
@@ -122,3 +174,6 @@ print(f"✅ Ganadoras: {ganadoras} ❌ Perdedoras: {perdedoras}\n")
 print(f"💰 Saldo inicial: {SALDO_INICIAL:.2f} USDT")
 print(f"💵 Saldo final  : {saldo:.2f} USDT")
 print(f"📈 Rentabilidad : {rentabilidad:.2f}%")
+rendimiento = libro.metricas()
+print(f"📐 Profit Factor: {rendimiento['Profit Factor']:.2f} | Sharpe: {rendimiento['Sharpe']:.2f} "
+      f"| Max DD: {rendimiento['Max Drawdown (%)']:.2f}% | Exposición: {rendimiento['Exposicion (%)']:.2f}%")
@@ -0,0 +1,128 @@
+# scanner.py
+
+"""
+Escáner de señales para muchos símbolos en un solo proceso.
+
+main.py vigila un símbolo por proceso (set_symbol cambia variables globales
+de utils/binance_data.py). Aquí todos los símbolos comparten un bucle
+asyncio y una sola conexión WebSocket (stream combinado de
+utils/flujo_velas.py), cada uno con su propio estado (SerieVelas):
+
+  - Al cerrar cada vela de un símbolo se actualizan sus indicadores (de
+    forma incremental, utils/indicadores_incrementales.py) y se evalúa
+    evaluar_senal(..., solo_tipo=True) con las velas de ese símbolo.
+  - Poco después del cierre (ESPERA_RANKING_S, para juntar los cierres del
+    mismo minuto) se imprime el ranking de las señales vigentes, ordenadas
+    por ADX (fuerza de la tendencia) y luego por la diferencia entre +DI y -DI.
+  - En memoria se guardan solo las últimas --ventana velas por símbolo, en
+    un buffer de tamaño fijo (por defecto, las que necesitan los indicadores,
+    utils/buffer_velas.py); la historia queda en el almacén de cada uno
+    (data/{SYMBOL}_{intervalo}.velas).
+  - Las peticiones REST (solo para rellenar huecos) pasan por el cliente
+    compartido y su presupuesto de peso (utils/cliente_binance.py).
+
+Uso:
+    python scanner.py BTCUSDT ETHUSDT ADAUSDT SOLUSDT
+    python scanner.py BTCUSDT ETHUSDT --top 5 --ventana 500
+"""
+
+import argparse
+import asyncio
+
+from config import BASE_INTERVAL_STR
+from utils.flujo_velas import FlujoVelas, SerieVelas, URL_WS
+from utils.cliente_binance import URL_FUTUROS
+from utils.buffer_velas import capacidad_en_vivo
+from utils.indicadores_incrementales import IndicadoresIncrementales, indicadores_en_vivo
+from utils.estrategia import evaluar_senal
+
+VENTANA = None                  # velas cerradas en memoria por símbolo (None = capacidad_en_vivo())
+ESPERA_RANKING_S = 2.0
+TOP = 10
+
+
+def analizar(serie, motor: IndicadoresIncrementales):
+    """
+    Indicadores y señal de la última vela cerrada de un símbolo.
+
+    Parámetros:
+        serie (pd.DataFrame)            : Velas cerradas del símbolo.
+        motor (IndicadoresIncrementales): Estado de los indicadores del símbolo.
+
+    Retorna:
+        dict: {"senal", "adx", "di", "rsi", "close", "vela"} o None si no hay datos.
+    """
+    df_final = indicadores_en_vivo(serie, motor)
+    if df_final.empty:
+        return None
+    fila = df_final.iloc[-1]
+    return {
+        "senal": evaluar_senal(df_final, solo_tipo=True),
+        "adx": float(fila["ADX"]),
+        "di": float(fila["+DI"] - fila["-DI"]),
+        "rsi": float(fila["RSI"]),
+        "close": float(fila["Close"]),
+        "vela": fila.name,
+    }
+
+
+def ranking(estado: dict, top: int = TOP) -> list:
+    """Señales vigentes (long/short) ordenadas por ADX y |+DI - -DI|: [(symbol, datos)]."""
+    vigentes = [(s, d) for s, d in estado.items() if d and d["senal"]]
+    return sorted(vigentes, key=lambda e: (-e[1]["adx"], -abs(e[1]["di"])))[:top]
+
+
+def imprimir_ranking(estado: dict, top: int = TOP):
+    filas = ranking(estado, top)
+    print("\n" + "*"*70)
+    print(f"Señales vigentes ({len(filas)} de {len(estado)} símbolos):\n")
+    if not filas:
+        print("⚪ Sin señales claras.")
+    for symbol, d in filas:
+        icono = "🟢" if d["senal"] == "long" else "🔴"
+        print(f"{icono} {symbol:<12}{d['senal'].upper():<7}ADX={d['adx']:6.2f}  DI={d['di']:+7.2f}  "
+              f"RSI={d['rsi']:6.2f}  Close={d['close']:<12g} {d['vela']}")
+    print("*"*70)
+
+
+def escanear(symbols, interval: str = BASE_INTERVAL_STR, ventana: int = VENTANA, top: int = TOP,
+             url_ws: str = URL_WS, url_rest: str = URL_FUTUROS, cierres: int = None) -> dict:
+    """
+    Vigila `symbols` hasta `cierres` velas cerradas en total (None = sin fin).
+
+    Retorna:
+        dict: {symbol: último análisis} (ver analizar()).
+    """
+    estado = {s.upper(): None for s in symbols}
+    motores = {s: IndicadoresIncrementales() for s in estado}
+    pendiente = {"handle": None}
+
+    def publicar():
+        pendiente["handle"] = None
+        imprimir_ranking(estado, top)
+
+    def al_cerrar(symbol, serie):
+        estado[symbol] = analizar(serie, motores[symbol])
+        if pendiente["handle"] is None:
+            pendiente["handle"] = asyncio.get_running_loop().call_later(ESPERA_RANKING_S, publicar)
+
+    flujo = FlujoVelas([SerieVelas(s, interval, ventana=ventana) for s in estado], url_ws, url_rest)
+    print(f"📡 Escaneando {len(estado)} símbolos [{interval}] en {len(flujo.urls)} conexión(es)...")
+    flujo.ejecutar(al_cerrar, cierres=cierres)
+    return estado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Escáner de señales de varios símbolos en un solo proceso")
+    parser.add_argument("symbols", nargs="+", help="Símbolos a vigilar (ej. BTCUSDT ETHUSDT)")
+    parser.add_argument("--intervalo", default=BASE_INTERVAL_STR,
+                        help=f"Intervalo de las velas (por defecto {BASE_INTERVAL_STR})")
+    parser.add_argument("--ventana", type=int, default=VENTANA,
+                        help="Velas cerradas en memoria por símbolo "
+                             f"(por defecto las que piden los indicadores: {capacidad_en_vivo()})")
+    parser.add_argument("--top", type=int, default=TOP, help=f"Señales a mostrar (por defecto {TOP})")
+    parser.add_argument("--url-ws", default=URL_WS, help="Servidor del WebSocket (para pruebas locales)")
+    parser.add_argument("--url-rest", default=URL_FUTUROS, help="Servidor REST (para pruebas locales)")
+    args = parser.parse_args()
+
+    escanear(args.symbols, args.intervalo, args.ventana, args.top, args.url_ws, args.url_rest)
@@ -0,0 +1,566 @@
+# utils/almacen_velas.py
+# python -m utils.almacen_velas                    importa/migra todo data/
+# python -m utils.almacen_velas data/BTCUSDT_1m.csv
+
+"""
+Módulo: utils/almacen_velas.py
+
+Almacén binario en columnas para las velas de data/, con un esquema único
+en disco, en reemplazo de los CSV por intervalo. Los CSV tenían dos formatos
+incompatibles: índice "timestamp" con las 12 columnas de Binance (casi
+vacías), o "Datetime" con una columna "index" sobrante y orden de la más
+nueva a la más antigua. Además se volvían a parsear en cada ejecución.
+
+Cada conjunto de velas es una carpeta data/{SYMBOL}_{intervalo}.velas/ con:
+  - meta.json    : {"version", "indice", "intervalo", "paso_ms", "columnas",
+                    "filas", "validacion", "cobertura"}.
+  - indice.i64   : marcas de tiempo (ns desde epoch, UTC) en int64,
+                   ascendentes y sin duplicados.
+  - {columna}.f64 / {columna}.i64: una columna con el tipo de ESQUEMA.
+
+Solo se guardan las columnas de ESQUEMA: OHLCV siempre y los campos extra de
+Binance si traen datos. Close_time, Ignore e "index" se descartan. En las
+columnas enteras, SIN_DATO_ENTERO marca un valor ausente.
+
+Los archivos son arreglos de ancho fijo sin encabezado: abrirlos es un
+np.memmap (sin leer ni copiar los precios). El DataFrame devuelto por
+a_dataframe() usa esas mismas páginas; solo el índice de fechas se
+materializa (int64 → DatetimeIndex con zona horaria).
+
+Agregar velas es barato: se escriben al final de cada columna y luego se
+reemplaza meta.json de forma atómica. "filas" en meta.json es la única
+fuente de verdad, así que una escritura interrumpida a medias se ignora
+al leer y se descarta en el siguiente agregado.
+
+El orden y los huecos (velas faltantes según el intervalo) se validan una
+sola vez y el resultado queda en meta.json ("validacion"). Cada agregado
+valida solo las filas nuevas y el empalme con las anteriores.
+
+"cobertura" registra los tramos [inicio, fin) (ns) ya pedidos a Binance,
+tengan o no velas (un hueco dentro de un tramo cubierto es real, p. ej. un
+mantenimiento). faltantes() indica qué partes de un rango hay que descargar
+(utils/descarga_klines.py, actualizar_delta). Sin registro, la cobertura se
+deduce de las velas guardadas: cada tramo continuo, sin incluir la última
+vela (pudo guardarse aún en formación).
+
+Los CSV existentes y los almacenes de la versión 1 se convierten con
+migrar() (python -m utils.almacen_velas). abrir() también lo hace la
+primera vez que se pide un conjunto que solo existe como CSV o en el
+formato antiguo.
+"""
+
+import glob
+import json
+import os
+import re
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+import pytz
+
+from config import TIMEZONE
+
+tz_local = pytz.timezone(TIMEZONE)
+
+EXTENSION = ".velas"
+VERSION = 2
+COLUMNAS_OHLCV = ["Open", "High", "Low", "Close", "Volume"]
+
+# Esquema canónico: columna -> tipo en disco (en este orden)
+ESQUEMA = {
+    "Open": "f8",
+    "High": "f8",
+    "Low": "f8",
+    "Close": "f8",
+    "Volume": "f8",
+    "Quote_asset_volume": "f8",
+    "Number_of_trades": "i8",
+    "Taker_buy_base": "f8",
+    "Taker_buy_quote": "f8",
+}
+SIN_DATO_ENTERO = -1
+_SUFIJO = {"f8": "f64", "i8": "i64"}
+
+# Duración de cada intervalo en ms ("1M" no tiene duración fija: sin control de huecos)
+PASO_MS = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "6h": 21_600_000,
+    "8h": 28_800_000, "12h": 43_200_000, "1d": 86_400_000, "3d": 259_200_000,
+    "1w": 604_800_000,
+}
+
+_INTERVALO_EN_NOMBRE = re.compile(r"_(\d+[mhdwM])(?:\.velas|\.csv)?$")
+
+
+def ruta_almacen(symbol: str, interval: str, carpeta: str = "data") -> str:
+    """Carpeta del almacén para un símbolo e intervalo."""
+    return os.path.join(carpeta, f"{symbol.upper()}_{interval}{EXTENSION}")
+
+
+def ruta_desde_csv(ruta_csv: str) -> str:
+    """data/BTCUSDT_1m.csv → data/BTCUSDT_1m.velas"""
+    return os.path.splitext(ruta_csv)[0] + EXTENSION
+
+
+def intervalo_de_ruta(ruta: str):
+    """"data/BTCUSDT_15m.velas" → "15m" (None si el nombre no lo indica)."""
+    coincidencia = _INTERVALO_EN_NOMBRE.search(os.path.basename(ruta.rstrip("/\\")))
+    return coincidencia.group(1) if coincidencia else None
+
+
+def existe(ruta: str) -> bool:
+    return os.path.isfile(os.path.join(ruta, "meta.json"))
+
+
+def _leer_meta(ruta: str) -> dict:
+    with open(os.path.join(ruta, "meta.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _fsync(ruta: str):
+    with open(ruta, "rb+") as f:
+        os.fsync(f.fileno())
+
+
+def _validar(marcas: np.ndarray, paso_ms, previa: dict = None) -> dict:
+    """
+    Suma a `previa` el orden y los huecos de `marcas` (que deben empezar en
+    la última fila ya validada, para revisar el empalme).
+    """
+    resultado = dict(previa or {"desordenadas": 0, "huecos": 0, "faltantes": 0})
+    if len(marcas) > 1:
+        saltos = np.diff(marcas)
+        resultado["desordenadas"] += int((saltos <= 0).sum())
+        if paso_ms:
+            paso = paso_ms * 1_000_000
+            grandes = saltos[saltos > paso]
+            resultado["huecos"] += int(len(grandes))
+            resultado["faltantes"] += int((grandes // paso - 1).sum())
+    return resultado
+
+
+class AlmacenVelas:
+    """
+    Un conjunto de velas en disco (ver el docstring del módulo).
+
+    Uso:
+        almacen = AlmacenVelas("data/BTCUSDT_1m.velas")
+        df = almacen.a_dataframe(ultimas=5000)
+        almacen.agregar(df_nuevas)
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        meta = _leer_meta(ruta)
+        if meta.get("version") != VERSION:
+            raise ValueError(f"Versión de almacén {meta.get('version')} en {ruta}: "
+                             f"conviértelo con python -m utils.almacen_velas")
+        self.indice = meta["indice"]
+        self.intervalo = meta.get("intervalo")
+        self.paso_ms = meta.get("paso_ms")
+        self.tipos = dict(meta["columnas"])
+        self.columnas = list(self.tipos)
+        self.filas = int(meta["filas"])
+        self.validacion = meta.get("validacion")
+        self.cobertura = meta.get("cobertura")
+
+    def __len__(self):
+        return self.filas
+
+    def _archivo(self, columna: str = None) -> str:
+        if columna is None:
+            return os.path.join(self.ruta, "indice.i64")
+        return os.path.join(self.ruta, f"{columna}.{_SUFIJO[self.tipos[columna]]}")
+
+    def _mapear(self, columna: str = None) -> np.ndarray:
+        tipo = np.dtype("i8") if columna is None else np.dtype(self.tipos[columna])
+        if self.filas == 0:
+            return np.empty(0, dtype=tipo)
+        # mode="c": copia al escribir, nunca modifica el archivo
+        return np.memmap(self._archivo(columna), dtype=tipo, mode="c", shape=(self.filas,))
+
+    def marcas(self) -> np.ndarray:
+        """Marcas de tiempo (ns UTC, int64) mapeadas en memoria."""
+        return self._mapear()
+
+    def columna(self, nombre: str) -> np.ndarray:
+        """Columna mapeada en memoria (tipo de ESQUEMA)."""
+        if nombre not in self.tipos:
+            raise KeyError(f"Columna {nombre} no existe en {self.ruta}")
+        return self._mapear(nombre)
+
+    def ultima_marca(self):
+        """Última marca de tiempo (pd.Timestamp en tz local) o None si está vacío."""
+        if self.filas == 0:
+            return None
+        return pd.Timestamp(int(self.marcas()[-1]), tz="UTC").tz_convert(tz_local)
+
+    def validar(self) -> dict:
+        """
+        Orden y huecos de todas las filas: {"filas", "desordenadas", "huecos",
+        "faltantes"}. Solo se revisan las filas aún no validadas; el
+        resultado se guarda en meta.json.
+        """
+        previa = self.validacion or {"filas": 0}
+        if previa["filas"] == self.filas:
+            return self.validacion
+        desde = max(previa["filas"] - 1, 0)
+        resultado = _validar(self.marcas()[desde:], self.paso_ms,
+                             {k: v for k, v in previa.items() if k != "filas"} if previa["filas"] else None)
+        nuevos = resultado["huecos"] - (self.validacion or {}).get("huecos", 0)
+        if nuevos or resultado["desordenadas"]:
+            print(f"⚠️ {self.ruta}: {resultado['huecos']} huecos ({resultado['faltantes']} velas faltantes)"
+                  + (f", {resultado['desordenadas']} filas fuera de orden" if resultado["desordenadas"] else ""))
+        resultado["filas"] = self.filas
+        self.validacion = resultado
+        self._guardar_meta()
+        return resultado
+
+    def tramos_cubiertos(self) -> list:
+        """Tramos [inicio, fin) en ns ya descargados (registrados o deducidos de las velas)."""
+        if self.cobertura is not None:
+            return self.cobertura
+        if self.filas == 0:
+            return []
+        marcas = self.marcas()
+        if not self.paso_ms:
+            return [[int(marcas[0]), int(marcas[-1])]]
+        paso = self.paso_ms * 1_000_000
+        cortes = np.flatnonzero(np.diff(marcas) > paso)
+        inicios = np.concatenate([[0], cortes + 1])
+        fines = np.concatenate([cortes, [self.filas - 1]])
+        tramos = [[int(marcas[i]), int(marcas[f]) + paso] for i, f in zip(inicios, fines)]
+        tramos[-1][1] -= paso
+        return [t for t in tramos if t[1] > t[0]]
+
+    def faltantes(self, inicio: int, fin: int) -> list:
+        """Partes de [inicio, fin) (ns) que no están cubiertas, como [[inicio, fin), …]."""
+        salida = []
+        cursor = inicio
+        for a, b in self.tramos_cubiertos():
+            if b <= cursor:
+                continue
+            if a >= fin:
+                break
+            if a > cursor:
+                salida.append([cursor, a])
+            cursor = max(cursor, b)
+        if cursor < fin:
+            salida.append([cursor, fin])
+        return salida
+
+    def cubrir(self, inicio: int, fin: int):
+        """Registra [inicio, fin) (ns) como descargado."""
+        self.cobertura = _unir_tramos(self.tramos_cubiertos() + [[int(inicio), int(fin)]])
+        self._guardar_meta()
+
+    def a_dataframe(self, ultimas: int = None, columnas=None) -> pd.DataFrame:
+        """
+        DataFrame con las velas (todas o las `ultimas`), índice en tz local.
+
+        Las columnas comparten memoria con los archivos (copia al escribir:
+        modificarlas no altera el almacén).
+        """
+        inicio = 0 if ultimas is None else max(self.filas - int(ultimas), 0)
+        columnas = self.columnas if columnas is None else list(columnas)
+        marcas = self.marcas()[inicio:]
+        indice = pd.DatetimeIndex(marcas.view("M8[ns]")).tz_localize("UTC").tz_convert(tz_local)
+        indice.name = self.indice
+        return pd.DataFrame({c: self.columna(c)[inicio:] for c in columnas},
+                            index=indice, copy=False)
+
+    def _guardar_meta(self):
+        _escribir_meta(self.ruta, self.indice, self.intervalo, self.paso_ms,
+                       self.tipos, self.filas, self.validacion, self.cobertura)
+
+    def reemplazar_cola(self, df: pd.DataFrame) -> int:
+        """
+        Descarta las velas guardadas desde la primera de df y agrega df en su
+        lugar (p. ej. para reemplazar una vela guardada aún en formación).
+
+        Retorna:
+            int: Cantidad de velas agregadas.
+        """
+        marcas, _ = _columnas_de(df, {})
+        if len(marcas) == 0:
+            return 0
+        desde = int(np.searchsorted(self.marcas(), marcas[0]))
+        if desde < self.filas:
+            # Se confirma el recorte antes de sobrescribir esas filas
+            self.filas = desde
+            if self.validacion and self.validacion["filas"] > desde:
+                self.validacion = None
+            self._guardar_meta()
+        return self.agregar(df)
+
+    def agregar(self, df: pd.DataFrame) -> int:
+        """
+        Agrega al final las velas de df posteriores a la última guardada.
+        Las columnas que falten en df se guardan como NaN (o SIN_DATO_ENTERO).
+
+        Retorna:
+            int: Cantidad de velas agregadas.
+        """
+        marcas, valores = _columnas_de(df, self.tipos)
+        if self.filas:
+            nuevas = marcas > self.marcas()[-1]
+            marcas, valores = marcas[nuevas], {c: v[nuevas] for c, v in valores.items()}
+        if len(marcas) == 0:
+            return 0
+
+        tam = 8 * self.filas
+        for columna in [None] + self.columnas:
+            datos = marcas if columna is None else valores[columna]
+            with open(self._archivo(columna), "ab") as f:
+                # Descarta restos de un agregado interrumpido antes del commit
+                f.truncate(tam)
+                f.write(np.ascontiguousarray(datos).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+        # Validación incremental: filas nuevas + empalme con la última guardada
+        if self.validacion and self.validacion["filas"] == self.filas:
+            empalme = self.marcas()[-1:] if self.filas else marcas[:0]
+            previa = {k: v for k, v in self.validacion.items() if k != "filas"}
+            self.validacion = _validar(np.concatenate([empalme, marcas]), self.paso_ms, previa)
+            if self.validacion["huecos"] > previa["huecos"]:
+                print(f"⚠️ {self.ruta}: hueco antes de {pd.Timestamp(int(marcas[0]), tz='UTC').tz_convert(tz_local)}")
+            self.validacion["filas"] = self.filas + len(marcas)
+
+        self.filas += len(marcas)
+        self._guardar_meta()
+        return len(marcas)
+
+
+def _unir_tramos(tramos: list) -> list:
+    """Ordena y fusiona tramos [inicio, fin) que se tocan o se solapan."""
+    salida = []
+    for a, b in sorted(tramos):
+        if salida and a <= salida[-1][1]:
+            salida[-1][1] = max(salida[-1][1], b)
+        else:
+            salida.append([a, b])
+    return salida
+
+
+def _escribir_meta(ruta, indice, intervalo, paso_ms, tipos, filas, validacion, cobertura=None):
+    meta = {"version": VERSION, "indice": indice, "intervalo": intervalo, "paso_ms": paso_ms,
+            "columnas": tipos, "filas": int(filas), "validacion": validacion, "cobertura": cobertura}
+    temporal = os.path.join(ruta, "meta.json.tmp")
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, os.path.join(ruta, "meta.json"))
+
+
+def _columnas_de(df: pd.DataFrame, tipos: dict) -> tuple:
+    """(marcas ns UTC ordenadas y sin duplicados, {columna: arreglo tipado}) de un DataFrame."""
+    indice = pd.DatetimeIndex(df.index)
+    if indice.tz is None:
+        indice = indice.tz_localize(tz_local)
+    marcas = indice.tz_convert("UTC").asi8
+    orden = np.argsort(marcas, kind="stable")
+    marcas = marcas[orden]
+    # Con marcas repetidas se conserva la última fila
+    unicas = np.append(marcas[1:] != marcas[:-1], True) if len(marcas) else np.empty(0, dtype=bool)
+    orden, marcas = orden[unicas], marcas[unicas]
+    valores = {}
+    for c, tipo in tipos.items():
+        if c in df.columns:
+            numeros = pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=np.float64)[orden]
+        else:
+            numeros = np.full(len(marcas), np.nan)
+        if tipo == "i8":
+            numeros = np.where(np.isnan(numeros), SIN_DATO_ENTERO, numeros).astype(np.int64)
+        valores[c] = numeros
+    return marcas, valores
+
+
+def esquema_de(df: pd.DataFrame) -> dict:
+    """Columnas de ESQUEMA presentes en df: OHLCV siempre, las extra solo si traen datos."""
+    return {
+        c: tipo for c, tipo in ESQUEMA.items()
+        if c in COLUMNAS_OHLCV or (c in df.columns and pd.to_numeric(df[c], errors="coerce").notna().any())
+    }
+
+
+def crear(ruta: str, df: pd.DataFrame, tipos: dict = None, intervalo: str = None,
+          cobertura: list = None) -> AlmacenVelas:
+    """
+    Escribe df como un almacén nuevo en `ruta`, reemplazando el anterior
+    (se escribe aparte y luego se cambia de nombre).
+
+    Parámetros:
+        ruta      (str)         : Carpeta .velas destino.
+        df        (pd.DataFrame): Velas con DatetimeIndex.
+        tipos     (dict)        : {columna: tipo}; por defecto esquema_de(df).
+        intervalo (str)         : "1m", "15m", …; por defecto el del nombre de `ruta`.
+        cobertura (list)        : Opcional, tramos descargados (ver AlmacenVelas.cubrir).
+    """
+    tipos = tipos or esquema_de(df)
+    intervalo = intervalo or intervalo_de_ruta(ruta)
+    paso_ms = PASO_MS.get(intervalo)
+    marcas, valores = _columnas_de(df, tipos)
+
+    temporal = ruta + ".tmp"
+    shutil.rmtree(temporal, ignore_errors=True)
+    os.makedirs(temporal)
+    marcas.tofile(os.path.join(temporal, "indice.i64"))
+    _fsync(os.path.join(temporal, "indice.i64"))
+    for c, tipo in tipos.items():
+        archivo = os.path.join(temporal, f"{c}.{_SUFIJO[tipo]}")
+        valores[c].tofile(archivo)
+        _fsync(archivo)
+    validacion = _validar(marcas, paso_ms)
+    validacion["filas"] = int(len(marcas))
+    _escribir_meta(temporal, df.index.name or "Datetime", intervalo, paso_ms,
+                   tipos, len(marcas), validacion, cobertura)
+
+    anterior = ruta + ".old"
+    if os.path.isdir(ruta):
+        shutil.rmtree(anterior, ignore_errors=True)
+        os.replace(ruta, anterior)
+    os.replace(temporal, ruta)
+    shutil.rmtree(anterior, ignore_errors=True)
+    return AlmacenVelas(ruta)
+
+
+def guardar(ruta: str, df: pd.DataFrame) -> AlmacenVelas:
+    """
+    Guarda df en el almacén; en las marcas repetidas gana df.
+      - df continúa lo guardado: se agrega al final.
+      - df solapa el final (trae todas las velas guardadas desde su primera
+        marca): se reemplaza esa cola, sin reescribir la historia.
+      - df trae velas anteriores o intermedias que faltan, o columnas del
+        esquema que el almacén no tiene: se reescribe con la unión.
+    La cobertura registrada se conserva.
+    """
+    if not existe(ruta):
+        return crear(ruta, df)
+    almacen = abrir(ruta, importar=False)
+    if df.empty:
+        return almacen
+    marcas, _ = _columnas_de(df, {})
+    guardadas = almacen.marcas()
+    desde = int(np.searchsorted(guardadas, marcas[0]))
+    tipos = {**almacen.tipos, **esquema_de(df)}
+    if len(tipos) == len(almacen.tipos):
+        if desde == almacen.filas:
+            almacen.agregar(df)
+            return almacen
+        if np.isin(guardadas[desde:], marcas).all():
+            almacen.reemplazar_cola(df)
+            return almacen
+    previo = almacen.a_dataframe()
+    union = pd.concat([previo, df[[c for c in tipos if c in df.columns]]])
+    union = union[~union.index.duplicated(keep="last")].sort_index()
+    return crear(ruta, union, {c: tipos[c] for c in ESQUEMA if c in tipos}, almacen.intervalo,
+                 almacen.cobertura)
+
+
+def importar_csv(ruta_csv: str, ruta: str = None) -> AlmacenVelas:
+    """
+    Convierte un CSV de data/ (cualquiera de los dos formatos: índice
+    "Datetime" o "timestamp", en cualquier orden) al esquema canónico.
+
+    Retorna:
+        AlmacenVelas: El almacén creado (por defecto junto al CSV, .velas).
+    """
+    ruta = ruta or ruta_desde_csv(ruta_csv)
+    encabezado = pd.read_csv(ruta_csv, nrows=0).columns
+    indice = "timestamp" if "timestamp" in encabezado else "Datetime"
+    df = pd.read_csv(ruta_csv, index_col=indice)
+    df.index = pd.to_datetime(df.index, utc=True).tz_convert(tz_local)
+    # Un solo nombre de índice para todos los conjuntos
+    df.index.name = "Datetime"
+    return crear(ruta, df)
+
+
+def _migrar_v1(ruta: str, meta: dict) -> AlmacenVelas:
+    """Reescribe un almacén de la versión 1 (todo float64, columnas sin filtrar)."""
+    filas = int(meta["filas"])
+    marcas = np.fromfile(os.path.join(ruta, "indice.i64"), dtype=np.int64, count=filas)
+    indice = pd.DatetimeIndex(marcas.view("M8[ns]")).tz_localize("UTC").tz_convert(tz_local)
+    df = pd.DataFrame({c: np.fromfile(os.path.join(ruta, f"{c}.f64"), dtype=np.float64, count=filas)
+                       for c in meta["columnas"]}, index=indice.rename("Datetime"))
+    return crear(ruta, df)
+
+
+def abrir(ruta: str, importar: bool = True):
+    """
+    Abre el almacén de `ruta` (migrándolo si es de la versión 1). Si no
+    existe pero sí el CSV equivalente y `importar` es True, lo importa
+    primero. Retorna None si no hay datos.
+    """
+    if existe(ruta):
+        meta = _leer_meta(ruta)
+        if meta.get("version") == 1:
+            print(f"🔄 Migrando {ruta} al esquema v{VERSION}")
+            return _migrar_v1(ruta, meta)
+        return AlmacenVelas(ruta)
+    ruta_csv = os.path.splitext(ruta)[0] + ".csv"
+    if importar and os.path.isfile(ruta_csv):
+        return importar_csv(ruta_csv, ruta)
+    return None
+
+
+def cargar(ruta: str, ultimas: int = None, columnas=None) -> pd.DataFrame:
+    """
+    Cargador único de velas locales: ascendentes, sin duplicados, índice
+    "Datetime" en tz local. El orden y los huecos se validan una sola vez
+    por fila (resultado en meta.json).
+
+    Parámetros:
+        ruta     (str) : Carpeta .velas (o su CSV, que se importa la primera vez).
+        ultimas  (int) : Opcional, solo las últimas N velas.
+        columnas (list): Opcional, columnas a devolver (por defecto todas).
+
+    Retorna:
+        pd.DataFrame: Velas, o DataFrame vacío si no hay datos.
+    """
+    almacen = abrir(ruta)
+    if almacen is None:
+        return pd.DataFrame()
+    almacen.validar()
+    if columnas is not None:
+        columnas = [c for c in columnas if c in almacen.tipos]
+    df = almacen.a_dataframe(ultimas=ultimas, columnas=columnas)
+    df.index.name = "Datetime"
+    return df
+
+
+def cargar_velas(symbol: str, interval: str, ultimas: int = None, columnas=None,
+                 carpeta: str = "data") -> pd.DataFrame:
+    """cargar() del conjunto data/{SYMBOL}_{interval}."""
+    return cargar(ruta_almacen(symbol, interval, carpeta), ultimas, columnas)
+
+
+def migrar(carpeta: str = "data", archivos=None):
+    """
+    Lleva todo `carpeta` al esquema canónico: importa cada CSV sin almacén
+    y reescribe los almacenes de versiones anteriores. Los almacenes al día
+    no se tocan (pueden tener velas más nuevas que el CSV).
+    """
+    archivos = archivos or sorted(glob.glob(os.path.join(carpeta, "*.csv")))
+    rutas = {ruta_desde_csv(a): a for a in archivos}
+    if not archivos:
+        rutas.update({r: None for r in sorted(glob.glob(os.path.join(carpeta, f"*{EXTENSION}")))})
+    if not rutas:
+        print(f"⚠️ No hay CSV ni almacenes para convertir en {carpeta}/.")
+    for ruta, ruta_csv in rutas.items():
+        if existe(ruta):
+            almacen = abrir(ruta)
+            origen = ruta
+        else:
+            almacen = importar_csv(ruta_csv, ruta)
+            origen = ruta_csv
+        v = almacen.validar()
+        print(f"✅ {origen} → {almacen.ruta} ({almacen.filas} velas, {v['huecos']} huecos, "
+              f"columnas {almacen.columnas})")
+
+
+if __name__ == "__main__":
+    migrar(archivos=sys.argv[1:] or None)
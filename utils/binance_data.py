@@ -5,8 +5,11 @@ Módulo: utils/binance_data.py
 
 Este archivo contiene funciones para:
   - Descargar velas (klines) desde la API de Binance Futures.
-  - Guardar y actualizar datos localmente en archivos CSV.
-  - Cargar datos locales desde CSV.
+  - Guardar y actualizar datos localmente (almacén binario .velas de
+    utils/almacen_velas.py; los CSV antiguos se importan la primera vez).
+  - Cargar datos locales (mapeados en memoria, sin parsear CSV).
+  - Mantener en memoria solo las últimas velas del bucle en vivo (buffer
+    circular de utils/buffer_velas.py).
   - Obtener la vela en formación en tiempo real.
   - Configurar dinámicamente el símbolo de trading y la ruta de CSV asociada.
 
@@ -19,20 +22,25 @@ Requiere las siguientes variables en `config.py`:
 """
 
 import os
-import time
-import requests
 import pandas as pd
 import pytz
 from datetime import datetime
 
 # Importar variables de configuración (sirven como valores por defecto)
 from config import SYMBOL, BASE_INTERVAL_STR, LIMIT, CSV_FILE, TIMEZONE
+from utils import almacen_velas
+from utils.buffer_velas import BufferVelas, capacidad_en_vivo
+from utils.cliente_binance import ErrorBinance, cliente, peso_klines
 
 # Preparar la zona horaria local
 tz_local = pytz.timezone(TIMEZONE)
 
-# URL base de la API de velas de Binance Futures
-_API_URL = "https://fapi.binance.com/fapi/v1/klines"
+# Endpoint de velas de Binance Futures (cliente compartido de utils/cliente_binance.py)
+_RUTA_KLINES = "/fapi/v1/klines"
+
+# Serie en memoria del bucle en vivo (actualizar_datos): las últimas velas
+# cerradas ya guardadas en el almacén de `ruta`, en un buffer de tamaño fijo
+_serie = {"ruta": None, "buffer": None}
 
 
 def guardar_datos_si_existen(df: pd.DataFrame, ruta: str) -> bool:
@@ -76,12 +84,8 @@ def obtener_klines(symbol: str = SYMBOL, interval: str = BASE_INTERVAL_STR, limi
     params = {"symbol": symbol.upper(), "interval": interval, "limit": limit}
 
     try:
-        response = requests.get(_API_URL, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-
-        # Si Binance devuelve un diccionario con "code" => error
-        if not data or (isinstance(data, dict) and data.get("code")):
+        data = cliente().get(_RUTA_KLINES, params, peso=peso_klines(limit))
+        if not data:
             print(f"⚠️ Error en respuesta de Binance: {data}")
             return pd.DataFrame()
 
@@ -125,133 +129,184 @@ def obtener_klines(symbol: str = SYMBOL, interval: str = BASE_INTERVAL_STR, limi
 
 def cargar_datos_locales() -> pd.DataFrame:
     """
-    Carga el archivo CSV indicado por CSV_FILE (desde config) y lo devuelve
-    como DataFrame indexado por 'timestamp' (DatetimeIndex con tz local).
-    Si no existe, devuelve DataFrame vacío.
+    Carga las velas locales de CSV_FILE (desde config) y las devuelve como
+    DataFrame indexado por 'timestamp' (DatetimeIndex con tz local).
+    Se leen del almacén binario equivalente (data/..._<intervalo>.velas); si
+    solo existe el CSV, se importa al almacén la primera vez.
+    Si no hay datos, devuelve DataFrame vacío.
 
     Retorna:
-        pd.DataFrame: DataFrame con datos locales o vacío si no existe CSV.
+        pd.DataFrame: DataFrame con datos locales o vacío si no existen.
     """
-    if os.path.exists(CSV_FILE):
-        df = pd.read_csv(
-            CSV_FILE,
-            index_col="timestamp",
-            parse_dates=True,
-            infer_datetime_format=True
-        )
-        # Asegurar que el índice tenga la zona horaria local
-        if df.index.tz is None:
-            df.index = df.index.tz_localize("UTC").tz_convert(tz_local)
-        else:
-            df.index = df.index.tz_convert(tz_local)
-        return df
-
-    return pd.DataFrame()
+    df = almacen_velas.cargar(almacen_velas.ruta_desde_csv(CSV_FILE))
+    if not df.empty:
+        df.index.name = "timestamp"
+    return df
 
 
 def guardar_datos_locales(df: pd.DataFrame):
     """
-    Guarda el DataFrame en la ruta CSV_FILE indicada en config.py.
+    Guarda el DataFrame en el almacén de CSV_FILE (config.py): las velas
+    posteriores a las ya guardadas se agregan al final.
     Si df está vacío, no guarda nada.
 
     Parámetros:
         df (pd.DataFrame): DataFrame a guardar.
     """
+    ruta = almacen_velas.ruta_desde_csv(CSV_FILE)
     if df.empty:
-        print(f"⚠️ No se guardó archivo porque el DataFrame está vacío: {CSV_FILE}")
+        print(f"⚠️ No se guardó archivo porque el DataFrame está vacío: {ruta}")
         return
 
-    os.makedirs(os.path.dirname(CSV_FILE), exist_ok=True)
-    df.to_csv(CSV_FILE)
-    print(f"✅ Datos locales actualizados en {CSV_FILE}")
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    almacen_velas.guardar(ruta, df)
+    print(f"✅ Datos locales actualizados en {ruta}")
+
+
+def _duracion_intervalo(interval: str) -> pd.Timedelta:
+    """ "1m" → 1 minuto, "4h" → 4 horas, "1d" → 1 día, "1w" → 7 días."""
+    unidades = {"m": "min", "h": "h", "d": "D", "w": "W"}
+    return pd.Timedelta(f"{interval[:-1]}{unidades[interval[-1]]}")
+
+
+def _separar_en_formacion(df: pd.DataFrame) -> tuple:
+    """(velas cerradas, vela en formación) según la hora actual y BASE_INTERVAL_STR."""
+    cierre = df.index + _duracion_intervalo(BASE_INTERVAL_STR)
+    cerrada = cierre <= pd.Timestamp.now(tz=tz_local)
+    return df[cerrada], df[~cerrada]
+
+
+def _agregar_cerradas(df: pd.DataFrame):
+    """Agrega velas cerradas al final del almacén de CSV_FILE (solo escribe esas filas)."""
+    ruta = almacen_velas.ruta_desde_csv(CSV_FILE)
+    if almacen_velas.existe(ruta):
+        almacen_velas.AlmacenVelas(ruta).agregar(df)
+    else:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        almacen_velas.crear(ruta, df)
+
+
+def _buffer_local() -> BufferVelas:
+    """
+    Buffer de velas cerradas del bucle en vivo (utils/buffer_velas.py). La
+    primera llamada (o tras set_symbol) carga del almacén de CSV_FILE solo
+    las últimas capacidad_en_vivo() velas; las anteriores quedan en disco.
+    """
+    ruta = almacen_velas.ruta_desde_csv(CSV_FILE)
+    if _serie["ruta"] != ruta:
+        buffer = BufferVelas(capacidad_en_vivo())
+        buffer.agregar(almacen_velas.cargar(ruta, ultimas=buffer.capacidad))
+        _serie.update(ruta=ruta, buffer=buffer)
+    return _serie["buffer"]
+
+
+def serie_local() -> pd.DataFrame:
+    """
+    Velas cerradas del bucle en vivo, en memoria: las últimas
+    capacidad_en_vivo(), con índice 'timestamp' (tz local).
+    """
+    return _buffer_local().a_dataframe()
+
+
+def incorporar_cerradas(cerradas: pd.DataFrame) -> pd.DataFrame:
+    """
+    Agrega al final del almacén y al buffer en memoria las velas cerradas
+    posteriores a la última conocida (las demás se ignoran). Las más antiguas
+    salen del buffer, pero siguen en el almacén.
+
+    Retorna:
+        pd.DataFrame: Serie de velas cerradas actualizada.
+    """
+    buffer = _buffer_local()
+    ultima = buffer.ultima_marca()
+    if ultima is not None:
+        cerradas = cerradas[cerradas.index > ultima]
+    if not cerradas.empty:
+        _agregar_cerradas(cerradas)
+        buffer.agregar(cerradas)
+    return buffer.a_dataframe()
 
 
 def actualizar_datos() -> pd.DataFrame:
     """
-    Descarga nuevas velas desde Binance y las concatena con las locales.
-    - Si no hay CSV local, descarga 'LIMIT' velas y guarda.
-    - Si existe CSV local, agrega únicamente las velas más recientes.
+    Descarga las velas recientes desde Binance y las une a las locales.
+    - La primera llamada (o tras set_symbol) carga las últimas velas locales;
+      desde ahí la serie se mantiene en memoria en un buffer de tamaño fijo
+      (la historia completa queda en el almacén).
+    - Solo las velas cerradas nuevas se agregan al final del almacén (sin
+      reescribir la historia). El almacén confirma cada agregado de forma
+      atómica y descarta marcas repetidas, así que un corte no deja filas
+      a medias ni duplicadas al reiniciar.
+    - La vela en formación se devuelve al final, pero no se guarda.
 
     Retorna:
-        pd.DataFrame: DataFrame actualizado (concatenación de antiguos + nuevos).
+        pd.DataFrame: Velas cerradas (locales + nuevas) más la vela en formación.
     """
-    df_local = cargar_datos_locales()
+    df_local = serie_local()
     df_nuevo = obtener_klines()
 
     if df_nuevo.empty:
         print("⚠️ No se recibieron datos nuevos desde Binance.")
         return df_local
 
+    cerradas, en_formacion = _separar_en_formacion(df_nuevo)
+    df_local = incorporar_cerradas(cerradas)
+
+    if en_formacion.empty:
+        return df_local
     if df_local.empty:
-        df = df_nuevo
-    else:
-        ultimo = df_local.index[-1]
-        # Tomar solo velas posteriores al último índice local
-        df_nuevo = df_nuevo[df_nuevo.index > ultimo]
-        if df_nuevo.empty:
-            # No hay velas nuevas
-            return df_local
-        df = pd.concat([df_local, df_nuevo])
-
-    guardar_datos_locales(df)
-    return df
+        return en_formacion
+    return pd.concat([df_local, en_formacion])
 
 
 def obtener_vela_en_formacion() -> pd.Series or None:
     """
     Solicita la vela en formación (la última no cerrada completamente).
-    Realiza hasta 5 reintentos si hay error de conexión.
+    Los errores de conexión se reintentan en el cliente compartido (backoff
+    exponencial con jitter, sobre la misma conexión keep-alive).
 
     Retorna:
         pd.Series con datos de la vela en formación (índice en 'timestamp' con tz local),
         o None si no fue posible tras varios intentos.
     """
     params = {"symbol": SYMBOL.upper(), "interval": BASE_INTERVAL_STR, "limit": 2}
-    max_reintentos = 5
-
-    for intento in range(max_reintentos):
-        try:
-            response = requests.get(_API_URL, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-
-            # Validar respuesta
-            if not data or (isinstance(data, dict) and data.get("code")):
-                print(f"⚠️ Error en respuesta de Binance: {data}")
-                return None
-
-            # La vela en formación es el último elemento de la lista
-            vela_actual = data[-1]
-            columnas = [
-                "timestamp", "Open", "High", "Low", "Close", "Volume",
-                "Close_time", "Quote_asset_volume", "Number_of_trades",
-                "Taker_buy_base", "Taker_buy_quote", "Ignore"
-            ]
-            df = pd.DataFrame([vela_actual], columns=columnas)
-
-            # Convertir tipos numéricos
-            for col in ["Open", "High", "Low", "Close", "Volume",
-                        "Quote_asset_volume", "Taker_buy_base", "Taker_buy_quote"]:
-                df[col] = pd.to_numeric(df[col], errors="coerce")
-            df["Number_of_trades"] = df["Number_of_trades"].astype(int, errors="ignore")
-
-            # Convertir 'timestamp' a datetime con tz local
-            df["timestamp"] = (
-                pd.to_datetime(df["timestamp"], unit="ms", utc=True)
-                  .dt.tz_convert(tz_local)
-            )
-            df.set_index("timestamp", inplace=True)
-
-            # Devolver la Serie de la vela en formación
-            return df.iloc[0]
-
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Error de conexión: {e}")
-            print(f"🔁 Reintentando ({intento+1}/{max_reintentos}) en 10 segundos...")
-            time.sleep(10)
-
-    print("🛑 No fue posible obtener la vela tras varios intentos.")
-    return None
+
+    try:
+        data = cliente().get(_RUTA_KLINES, params, peso=peso_klines(2))
+    except ErrorBinance as e:
+        print(f"❌ {e}")
+        print("🛑 No fue posible obtener la vela tras varios intentos.")
+        return None
+
+    # Validar respuesta
+    if not data:
+        print(f"⚠️ Error en respuesta de Binance: {data}")
+        return None
+
+    # La vela en formación es el último elemento de la lista
+    vela_actual = data[-1]
+    columnas = [
+        "timestamp", "Open", "High", "Low", "Close", "Volume",
+        "Close_time", "Quote_asset_volume", "Number_of_trades",
+        "Taker_buy_base", "Taker_buy_quote", "Ignore"
+    ]
+    df = pd.DataFrame([vela_actual], columns=columnas)
+
+    # Convertir tipos numéricos
+    for col in ["Open", "High", "Low", "Close", "Volume",
+                "Quote_asset_volume", "Taker_buy_base", "Taker_buy_quote"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    df["Number_of_trades"] = df["Number_of_trades"].astype(int, errors="ignore")
+
+    # Convertir 'timestamp' a datetime con tz local
+    df["timestamp"] = (
+        pd.to_datetime(df["timestamp"], unit="ms", utc=True)
+          .dt.tz_convert(tz_local)
+    )
+    df.set_index("timestamp", inplace=True)
+
+    # Devolver la Serie de la vela en formación
+    return df.iloc[0]
 
 
 def set_symbol(new_symbol: str):
@@ -276,9 +331,10 @@ def set_symbol(new_symbol: str):
 
 def cargar_datos_csv(symbol: str, interval: str) -> pd.DataFrame:
     """
-    Carga el CSV generado por getCandles.py y lo devuelve como DataFrame indexado
-    por "Datetime". El archivo debe residir en data/{SYMBOL}_{interval}.csv.
-    Lanza FileNotFoundError si no existe.
+    Carga las velas de data/{SYMBOL}_{interval} (almacén .velas, o el CSV
+    generado por getCandles.py, que se importa la primera vez) y las devuelve
+    como DataFrame indexado por "Datetime".
+    Lanza FileNotFoundError si no existe ninguno de los dos.
 
     Parámetros:
         symbol   (str): Símbolo de trading en Binance (ej. "BTCUSDT").
@@ -288,25 +344,7 @@ def cargar_datos_csv(symbol: str, interval: str) -> pd.DataFrame:
         pd.DataFrame: DataFrame con índice 'Datetime' (DatetimeIndex con tz local),
                       y columnas ["Open", "High", "Low", "Close", "Volume"].
     """
-    ruta = f"data/{symbol.upper()}_{interval}.csv"
-    if not os.path.isfile(ruta):
-        raise FileNotFoundError(f"No existe el archivo: {ruta}")
-
-    # Leer CSV y parsear la columna "Datetime"
-    df = pd.read_csv(
-        ruta,
-        parse_dates=["Datetime"],
-        infer_datetime_format=True
-    )
-    # Asegurar que el índice tenga la zona horaria local
-    df.set_index("Datetime", inplace=True)
-    if df.index.tz is None:
-        df.index = df.index.tz_localize("UTC").tz_convert(tz_local)
-    else:
-        df.index = df.index.tz_convert(tz_local)
-
-    # Solo conservar columnas relevantes (pueden haber otras en CSV)
-    columnas_relevantes = ["Open", "High", "Low", "Close", "Volume"]
-    df = df.loc[:, df.columns.intersection(columnas_relevantes)]
-
+    df = almacen_velas.cargar_velas(symbol, interval, columnas=almacen_velas.COLUMNAS_OHLCV)
+    if df.empty:
+        raise FileNotFoundError(f"No existe el archivo: data/{symbol.upper()}_{interval}.csv")
     return df
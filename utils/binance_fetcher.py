@@ -1,17 +1,16 @@
 # utils/binance_fetcher.py
 
-import time
 import pandas as pd
-import requests
 from datetime import datetime, timedelta
 from config import SYMBOL, BASE_INTERVAL_STR, CSV_FILE, TIMEZONE
+from utils.cliente_binance import cliente, URL_SPOT
 import pytz
 
 tz_local = pytz.timezone(TIMEZONE)
 
 
 def get_binance_klines(symbol, interval, start_time, end_time=None, limit=1000):
-    url = "https://api.binance.com/api/v3/klines"
+    # Cliente compartido (keep-alive, reintentos y límite de peso de la API spot)
     params = {
         "symbol": symbol,
         "interval": interval,
@@ -20,9 +19,7 @@ def get_binance_klines(symbol, interval, start_time, end_time=None, limit=1000):
     }
     if end_time:
         params["endTime"] = int(end_time.timestamp() * 1000)
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-    return response.json()
+    return cliente(URL_SPOT).get("/api/v3/klines", params, peso=2)
 
 
 def descargar_velas(dias=5, ruta_salida=CSV_FILE):
@@ -40,7 +37,6 @@ def descargar_velas(dias=5, ruta_salida=CSV_FILE):
         todas_las_velas.extend(datos)
         ultima_vez = datetime.fromtimestamp(datos[-1][0] / 1000)
         inicio = ultima_vez + timedelta(milliseconds=1)
-        time.sleep(0.5)
 
     if not todas_las_velas:
         print("⚠️ No se descargaron datos. Revisa la conexión o los parámetros.")
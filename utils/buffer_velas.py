@@ -0,0 +1,141 @@
+# utils/buffer_velas.py
+
+"""
+Módulo: utils/buffer_velas.py
+
+Historia acotada de los procesos en vivo (main.py, realtime_binance.py,
+scanner.py). Antes, cada vela cerrada se concatenaba al DataFrame cargado del
+disco, así que un monitor que corre semanas guardaba y copiaba una serie cada
+vez más grande.
+
+BufferVelas es un buffer circular de capacidad fija con arreglos NumPy
+reservados al crearlo. Agregar una vela no reserva memoria: la vela más
+antigua sale del buffer (sigue en el almacén en disco, utils/almacen_velas.py)
+y la memoria del proceso se mantiene constante.
+
+La capacidad se deriva de la ventana más larga de los indicadores
+(indicadores.velas_necesarias(): SMA200 o el calentamiento de las RMA de 14)
+en velas de ANALYSIS_INTERVAL, convertida a velas del intervalo base. También
+se puede fijar con VELAS_EN_MEMORIA en config.py.
+
+Uso:
+    buffer = BufferVelas(capacidad_en_vivo())
+    buffer.agregar(df_cerradas)
+    df = buffer.a_dataframe()        # las últimas `capacidad` velas
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from config import ANALYSIS_INTERVAL, BASE_INTERVAL_STR, VELAS_EN_MEMORIA
+from utils.almacen_velas import ESQUEMA, PASO_MS, SIN_DATO_ENTERO
+from utils.indicadores import velas_necesarias
+
+
+def capacidad_en_vivo(interval: str = BASE_INTERVAL_STR, analisis: str = ANALYSIS_INTERVAL) -> int:
+    """
+    Velas de `interval` que hay que guardar en memoria para calcular los
+    indicadores sobre velas de `analisis` (más una, la que está en curso).
+
+    Retorna:
+        int: VELAS_EN_MEMORIA si está definido en config.py; si no, la derivada.
+    """
+    if VELAS_EN_MEMORIA:
+        return int(VELAS_EN_MEMORIA)
+    por_vela = max(1, math.ceil(pd.Timedelta(analisis).value / (PASO_MS[interval] * 1_000_000)))
+    return (velas_necesarias() + 1) * por_vela
+
+
+class BufferVelas:
+    """
+    Últimas `capacidad` velas cerradas en arreglos de tamaño fijo.
+
+    Cada vela se escribe dos veces (en la posición i y en i + capacidad), de
+    modo que las velas vigentes siempre quedan contiguas y se leen con una
+    sola rebanada, sin reordenar.
+
+    Parámetros:
+        capacidad (int) : Máximo de velas en memoria.
+        tipos     (dict): Opcional, {columna: dtype} (por defecto ESQUEMA del almacén).
+    """
+
+    def __init__(self, capacidad: int, tipos: dict = None):
+        if capacidad < 1:
+            raise ValueError(f"Capacidad inválida para el buffer de velas: {capacidad}")
+        self.capacidad = capacidad
+        self.tipos = dict(tipos or ESQUEMA)
+        self._marcas = np.zeros(2 * capacidad, dtype="i8")          # ns UTC
+        self._columnas = {c: np.zeros(2 * capacidad, dtype=t) for c, t in self.tipos.items()}
+        self._inicio = 0            # posición de la vela más antigua
+        self._filas = 0
+        self._tz = None
+        self._df = None             # caché de a_dataframe() hasta el próximo agregar()
+
+    def __len__(self):
+        return self._filas
+
+    def ultima_marca(self):
+        """Última marca de tiempo (pd.Timestamp en la tz de las velas) o None si está vacío."""
+        if self._filas == 0:
+            return None
+        return pd.Timestamp(int(self._marcas[self._inicio + self._filas - 1]), tz="UTC").tz_convert(self._tz)
+
+    def agregar(self, df: pd.DataFrame) -> int:
+        """
+        Agrega velas al final; deben ser posteriores a la última del buffer.
+        Si se supera la capacidad, las más antiguas se descartan.
+
+        Parámetros:
+            df (pd.DataFrame): Velas cerradas con DatetimeIndex (columnas
+                               ausentes quedan como NaN / SIN_DATO_ENTERO).
+
+        Retorna:
+            int: Velas agregadas.
+        """
+        if df.empty:
+            return 0
+        df = df.iloc[-self.capacidad:]
+        nuevas = len(df)
+        if self._tz is None:
+            self._tz = df.index.tz
+
+        # Posiciones físicas (módulo capacidad) y su copia en la segunda mitad
+        posiciones = (self._inicio + self._filas + np.arange(nuevas)) % self.capacidad
+        espejo = posiciones + self.capacidad
+        marcas = df.index.asi8
+        self._marcas[posiciones] = marcas
+        self._marcas[espejo] = marcas
+        for columna, destino in self._columnas.items():
+            if columna not in df:
+                valores = np.nan if destino.dtype.kind == "f" else SIN_DATO_ENTERO
+            elif destino.dtype.kind == "f":
+                valores = df[columna].to_numpy(dtype=destino.dtype)
+            else:
+                valores = df[columna].fillna(SIN_DATO_ENTERO).to_numpy(dtype=destino.dtype)
+            destino[posiciones] = valores
+            destino[espejo] = valores
+
+        total = self._filas + nuevas
+        if total > self.capacidad:
+            self._inicio = (self._inicio + total - self.capacidad) % self.capacidad
+            total = self.capacidad
+        self._filas = total
+        self._df = None
+        return nuevas
+
+    def a_dataframe(self) -> pd.DataFrame:
+        """
+        Velas del buffer, de la más antigua a la más reciente, con índice
+        "timestamp". Es una copia: el buffer puede seguir escribiendo sin
+        alterarla. Se reutiliza mientras no se agreguen velas.
+        """
+        if self._df is None:
+            tramo = slice(self._inicio, self._inicio + self._filas)
+            indice = pd.to_datetime(self._marcas[tramo].copy(), utc=True)
+            if self._tz is not None:
+                indice = indice.tz_convert(self._tz)
+            self._df = pd.DataFrame({c: a[tramo].copy() for c, a in self._columnas.items()},
+                                    index=indice.rename("timestamp"))
+        return self._df
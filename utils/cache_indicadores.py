@@ -0,0 +1,102 @@
+# utils/cache_indicadores.py
+
+"""
+Módulo: utils/cache_indicadores.py
+
+Caché en memoria (LRU) de velas con indicadores ya calculados.
+
+En mass_test.py cada combinación de umbrales/TP/SL vuelve a pedir las mismas
+velas: mismo símbolo, intervalo y cantidad de velas. Ninguno de esos umbrales
+afecta a los indicadores, así que basta con leer el CSV y ejecutar
+calcular_indicadores una sola vez por clave:
+
+    (SYMBOL, intervalo, total_candles, periodos_indicadores())
+
+Cuando la memoria usada supera CACHE_INDICADORES_MB (config.py) se descartan
+las entradas menos usadas recientemente.
+
+Los DataFrames guardados se comparten entre llamadas: quien los obtiene
+no debe modificarlos en el lugar.
+"""
+
+from collections import OrderedDict
+
+import pandas as pd
+
+from config import CACHE_INDICADORES_MB
+from utils.indicadores import periodos_indicadores
+
+_entradas = OrderedDict()   # clave -> (DataFrame, bytes)
+_estado = {
+    "limite": CACHE_INDICADORES_MB * 1024 * 1024,
+    "bytes": 0,
+    "aciertos": 0,
+    "fallos": 0,
+    "descartes": 0,
+}
+
+
+def clave_cache(symbol: str, interval: str, total_candles: int) -> tuple:
+    """Clave de caché para un conjunto de velas con los periodos actuales."""
+    return (symbol.upper(), interval, int(total_candles), periodos_indicadores())
+
+
+def obtener(clave: tuple):
+    """
+    Devuelve el DataFrame guardado para `clave` (y lo marca como recién usado)
+    o None si no está en caché.
+    """
+    entrada = _entradas.get(clave)
+    if entrada is None:
+        _estado["fallos"] += 1
+        return None
+    _entradas.move_to_end(clave)
+    _estado["aciertos"] += 1
+    return entrada[0]
+
+
+def guardar(clave: tuple, df: pd.DataFrame):
+    """
+    Guarda df bajo `clave`. Si el DataFrame por sí solo excede el límite de
+    memoria, no se guarda.
+    """
+    tam = int(df.memory_usage(index=True, deep=True).sum())
+    if tam > _estado["limite"]:
+        return
+
+    if clave in _entradas:
+        _estado["bytes"] -= _entradas.pop(clave)[1]
+    _entradas[clave] = (df, tam)
+    _estado["bytes"] += tam
+    _recortar()
+
+
+def _recortar():
+    """Descarta las entradas menos usadas hasta respetar el límite."""
+    while _entradas and _estado["bytes"] > _estado["limite"]:
+        _, (_, tam_viejo) = _entradas.popitem(last=False)
+        _estado["bytes"] -= tam_viejo
+        _estado["descartes"] += 1
+
+
+def limpiar():
+    """Vacía la caché y reinicia sus contadores."""
+    _entradas.clear()
+    _estado.update(bytes=0, aciertos=0, fallos=0, descartes=0)
+
+
+def fijar_limite_mb(megabytes: float):
+    """Cambia el límite de memoria y descarta lo que sobre."""
+    _estado["limite"] = int(megabytes * 1024 * 1024)
+    _recortar()
+
+
+def estadisticas() -> dict:
+    """Entradas, memoria usada (MB), aciertos, fallos y descartes."""
+    return {
+        "entradas": len(_entradas),
+        "memoria_mb": round(_estado["bytes"] / (1024 * 1024), 2),
+        "aciertos": _estado["aciertos"],
+        "fallos": _estado["fallos"],
+        "descartes": _estado["descartes"],
+    }
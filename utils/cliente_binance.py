@@ -0,0 +1,315 @@
+# utils/cliente_binance.py
+
+"""
+Módulo: utils/cliente_binance.py
+
+Cliente HTTP único para la API de Binance, compartido por
+utils/binance_data.py, utils/getCandles.py (vía utils/descarga_klines.py)
+y utils/binance_fetcher.py:
+
+  - Conexiones persistentes (keep-alive): una requests.Session por hilo, de
+    modo que el bucle de main.py no abre una conexión TLS nueva cada 5 s.
+  - Reintentos con backoff exponencial y jitter ante errores de conexión,
+    HTTP 5xx y 418/429 (este último respeta Retry-After y pausa a todos).
+  - Limitador de peso (PresupuestoPeso) compartido por todos los hilos del
+    proceso y, si config.PESO_COMPARTIDO_ARCHIVO indica un archivo, también
+    entre procesos (workers de mass_test.py, monitores en vivo, …). Cada API
+    (url_base) tiene su propio límite y su propio archivo de estado.
+  - Estadísticas por endpoint: llamadas, reintentos, errores y latencia.
+
+Uso:
+    from utils.cliente_binance import cliente, URL_FUTUROS
+    data = cliente().get("/fapi/v1/klines", params, peso=5)
+
+Los errores definitivos (sin respuesta tras REINTENTOS, HTTP 4xx o un
+{"code": …} de Binance) se lanzan como ErrorBinance.
+"""
+
+import hashlib
+import os
+import random
+import struct
+import threading
+import time
+
+import config
+
+URL_FUTUROS = "https://fapi.binance.com"
+URL_SPOT = "https://api.binance.com"
+
+# Límite de peso por minuto y por IP de cada API
+PESO_POR_MINUTO = {URL_FUTUROS: 2400, URL_SPOT: 6000}
+PESO_POR_DEFECTO = 1200
+FRACCION_PESO = 0.8             # parte del límite que se usa (margen para otros clientes)
+
+REINTENTOS = 5
+BACKOFF_BASE = 0.5              # segundos
+BACKOFF_MAX = 30.0
+TIMEOUT = 10
+
+
+class ErrorBinance(Exception):
+    """Respuesta de error de Binance o petición sin éxito tras los reintentos."""
+
+
+def peso_klines(limit: int) -> int:
+    """Peso que Binance Futures asigna a /fapi/v1/klines según `limit`."""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+def _bloquear(f):
+    if os.name == "nt":
+        import msvcrt
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+
+def _desbloquear(f):
+    if os.name == "nt":
+        import msvcrt
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def ruta_presupuesto(archivo: str, url_base: str) -> str:
+    """
+    Archivo de estado del presupuesto de `url_base`: `archivo` con un sufijo
+    derivado de la URL (p. ej. data/peso_binance.3f2a9c1d.bin), de modo que
+    spot y futuros no mezclan sus pesos. None si `archivo` es None.
+    """
+    if archivo is None:
+        return None
+    base, extension = os.path.splitext(archivo)
+    sufijo = hashlib.sha1(url_base.rstrip("/").encode()).hexdigest()[:8]
+    return f"{base}.{sufijo}{extension}"
+
+
+class PresupuestoPeso:
+    """
+    Cubeta de fichas con el peso disponible por minuto, compartida por hilos.
+
+    Parámetros:
+        peso_por_minuto (int)  : Límite de peso de la API por minuto.
+        fraccion        (float): Parte del límite a usar (0..1).
+        ruta            (str)  : Opcional, archivo de estado para compartir
+                                 el presupuesto entre procesos.
+    """
+
+    _FORMATO = "3d"   # fichas, última reposición, pausa hasta (time.time())
+
+    def __init__(self, peso_por_minuto: int = PESO_POR_DEFECTO, fraccion: float = FRACCION_PESO,
+                 ruta: str = None):
+        self.capacidad = peso_por_minuto * fraccion
+        self.limite_servidor = peso_por_minuto
+        self.por_segundo = self.capacidad / 60
+        self.ruta = ruta
+        self.esperado = 0.0
+        self._estado = [self.capacidad, time.time(), 0.0]
+        self._candado = threading.Lock()
+
+    def _transaccion(self, funcion):
+        """Ejecuta funcion(estado) con el estado bloqueado (y persistido si hay archivo)."""
+        with self._candado:
+            if self.ruta is None:
+                return funcion(self._estado)
+            with open(self.ruta, "a+b") as f:
+                _bloquear(f)
+                try:
+                    f.seek(0)
+                    crudo = f.read(struct.calcsize(self._FORMATO))
+                    estado = list(struct.unpack(self._FORMATO, crudo)) if len(crudo) == struct.calcsize(
+                        self._FORMATO) else [self.capacidad, time.time(), 0.0]
+                    resultado = funcion(estado)
+                    f.seek(0)
+                    f.truncate()
+                    f.write(struct.pack(self._FORMATO, *estado))
+                    f.flush()
+                finally:
+                    _desbloquear(f)
+            return resultado
+
+    def _reponer(self, estado, ahora: float):
+        estado[0] = min(self.capacidad, estado[0] + max(ahora - estado[1], 0) * self.por_segundo)
+        estado[1] = ahora
+
+    def consumir(self, peso: int):
+        """Bloquea hasta que haya `peso` disponible y lo descuenta."""
+        def intentar(estado):
+            ahora = time.time()
+            self._reponer(estado, ahora)
+            if ahora >= estado[2] and estado[0] >= peso:
+                estado[0] -= peso
+                return 0.0
+            return max(estado[2] - ahora, (peso - estado[0]) / self.por_segundo)
+
+        while True:
+            espera = self._transaccion(intentar)
+            if espera <= 0:
+                return
+            self.esperado += espera
+            time.sleep(espera)
+
+    def informar_usado(self, usado: int):
+        """Ajusta las fichas al peso usado que informa el servidor (X-MBX-USED-WEIGHT-1M)."""
+        def ajustar(estado):
+            self._reponer(estado, time.time())
+            disponible = self.capacidad - max(0, usado - (self.limite_servidor - self.capacidad))
+            estado[0] = min(estado[0], disponible)
+        self._transaccion(ajustar)
+
+    def pausar(self, segundos: float):
+        """Detiene todas las peticiones durante `segundos` (429/418 con Retry-After)."""
+        def detener(estado):
+            estado[2] = max(estado[2], time.time() + segundos)
+            estado[0] = 0.0
+        self._transaccion(detener)
+
+
+class ClienteBinance:
+    """
+    Cliente con sesiones persistentes, reintentos y limitador de peso.
+
+    Parámetros:
+        url_base    (str)            : Servidor de la API (URL_FUTUROS, URL_SPOT o uno local).
+        presupuesto (PresupuestoPeso): Limitador; por defecto uno según url_base.
+        reintentos  (int)            : Intentos por petición.
+    """
+
+    def __init__(self, url_base: str = URL_FUTUROS, presupuesto: PresupuestoPeso = None,
+                 reintentos: int = REINTENTOS):
+        self.url_base = url_base.rstrip("/")
+        self.presupuesto = presupuesto or PresupuestoPeso(
+            PESO_POR_MINUTO.get(self.url_base, PESO_POR_DEFECTO),
+            ruta=ruta_presupuesto(getattr(config, "PESO_COMPARTIDO_ARCHIVO", None), self.url_base)
+        )
+        self.reintentos = reintentos
+        self._local = threading.local()
+        self._estadisticas = {}      # ruta -> [llamadas, reintentos, errores, segundos, máximo]
+        self._candado = threading.Lock()
+
+    def _sesion(self) -> "requests.Session":
+        """Una sesión (conexiones keep-alive) por hilo."""
+        sesion = getattr(self._local, "sesion", None)
+        if sesion is None:
+            import requests     # solo al primer uso: los backtests con datos locales no lo cargan
+            sesion = self._local.sesion = requests.Session()
+        return sesion
+
+    def _anotar(self, ruta: str, segundos: float = 0.0, reintento: bool = False, error: bool = False):
+        with self._candado:
+            e = self._estadisticas.setdefault(ruta, [0, 0, 0, 0.0, 0.0])
+            if reintento:
+                e[1] += 1
+            elif error:
+                e[2] += 1
+            else:
+                e[0] += 1
+                e[3] += segundos
+                e[4] = max(e[4], segundos)
+
+    @staticmethod
+    def _backoff(intento: int) -> float:
+        """Espera exponencial con jitter completo."""
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** intento))
+
+    def get(self, ruta: str, params: dict = None, peso: int = 1):
+        """
+        GET a `ruta` (p. ej. "/fapi/v1/klines") y devuelve el JSON.
+
+        Parámetros:
+            ruta   (str) : Endpoint relativo a url_base.
+            params (dict): Parámetros de la consulta.
+            peso   (int) : Peso de la petición según Binance.
+
+        Lanza:
+            ErrorBinance: Error de la API o sin éxito tras los reintentos.
+        """
+        import requests
+
+        url = self.url_base + ruta
+        ultimo_error = None
+        for intento in range(self.reintentos):
+            self.presupuesto.consumir(peso)
+            inicio = time.perf_counter()
+            try:
+                resp = self._sesion().get(url, params=params, timeout=TIMEOUT)
+            except requests.exceptions.RequestException as e:
+                ultimo_error = e
+                self._anotar(ruta, reintento=True)
+                time.sleep(self._backoff(intento))
+                continue
+            segundos = time.perf_counter() - inicio
+
+            usado = resp.headers.get("X-MBX-USED-WEIGHT-1M")
+            if usado is not None:
+                self.presupuesto.informar_usado(int(usado))
+            if resp.status_code in (418, 429):
+                espera = float(resp.headers.get("Retry-After", self._backoff(intento)))
+                print(f"⚠️ Límite de peso alcanzado (HTTP {resp.status_code}); pausa de {espera:.0f}s")
+                self.presupuesto.pausar(espera)
+                ultimo_error = f"HTTP {resp.status_code}"
+                self._anotar(ruta, reintento=True)
+                continue
+            if resp.status_code >= 500:
+                ultimo_error = f"HTTP {resp.status_code}"
+                self._anotar(ruta, reintento=True)
+                time.sleep(self._backoff(intento))
+                continue
+
+            try:
+                data = resp.json()
+            except ValueError:
+                data = None
+            if resp.status_code >= 400 or (isinstance(data, dict) and data.get("code")):
+                self._anotar(ruta, error=True)
+                raise ErrorBinance(f"Error en respuesta de Binance (HTTP {resp.status_code}): "
+                                   f"{data if data is not None else resp.text[:200]}")
+            self._anotar(ruta, segundos)
+            return data
+
+        self._anotar(ruta, error=True)
+        raise ErrorBinance(f"Sin respuesta de {ruta} tras {self.reintentos} intentos: {ultimo_error}")
+
+    def estadisticas(self) -> dict:
+        """{ruta: llamadas, reintentos, errores, latencia media y máxima (ms)}."""
+        with self._candado:
+            return {
+                ruta: {
+                    "llamadas": e[0],
+                    "reintentos": e[1],
+                    "errores": e[2],
+                    "latencia_media_ms": round(e[3] * 1000 / e[0], 2) if e[0] else None,
+                    "latencia_max_ms": round(e[4] * 1000, 2),
+                }
+                for ruta, e in self._estadisticas.items()
+            }
+
+
+_clientes = {}
+_candado_clientes = threading.Lock()
+
+
+def cliente(url_base: str = URL_FUTUROS) -> ClienteBinance:
+    """Cliente compartido del proceso para `url_base` (se crea la primera vez)."""
+    url_base = url_base.rstrip("/")
+    with _candado_clientes:
+        if url_base not in _clientes:
+            _clientes[url_base] = ClienteBinance(url_base)
+        return _clientes[url_base]
+
+
+def estadisticas() -> dict:
+    """Estadísticas de todos los clientes compartidos, por url_base."""
+    return {url: c.estadisticas() for url, c in _clientes.items()}
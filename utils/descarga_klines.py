@@ -0,0 +1,308 @@
+# utils/descarga_klines.py
+# python -m utils.descarga_klines BTCUSDT:1m:100000 ETHUSDT:15m:5000 --hilos 8
+
+"""
+Módulo: utils/descarga_klines.py
+
+Descarga concurrente de velas (klines) de Binance Futures.
+
+obtener_klines_pandas pedía páginas de 1000 velas una tras otra, caminando
+endTime hacia atrás con una pausa fija de 500 ms. Aquí el rango pedido se
+divide en ventanas independientes de MAX_LIMIT velas (startTime/endTime
+conocidos de antemano) que se descargan en paralelo con un pool de hilos.
+
+El ritmo no lo fija una pausa sino el presupuesto de peso de la API
+(PresupuestoPeso del cliente compartido, utils/cliente_binance.py): cada
+petición consume el peso que Binance le asigna según `limit`, el
+presupuesto se repone de forma continua y se corrige con la cabecera
+X-MBX-USED-WEIGHT-1M de cada respuesta. Un 429/418 pausa a todos los hilos
+durante Retry-After. Así el caudal queda limitado solo por el límite de
+peso.
+
+descargar_series() baja varias (símbolo, intervalo) en una sola llamada,
+compartiendo hilos y presupuesto; actualizar_series() además las guarda en
+el almacén de velas (utils/almacen_velas.py).
+
+actualizar_delta() es la descarga incremental: compara el rango pedido con
+la cobertura registrada en el almacén y descarga solo lo que falta (el
+principio, el final o huecos intermedios). Refrescar 15 minutos después
+cuesta una petición pequeña, no la ventana completa.
+
+La URL es un parámetro (url_base), de modo que se puede probar contra un
+servidor HTTP local que imite /fapi/v1/klines.
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytz
+
+from config import TIMEZONE
+from utils import almacen_velas
+from utils.cliente_binance import (
+    ClienteBinance, PresupuestoPeso, URL_FUTUROS, cliente, peso_klines
+)
+
+tz_local = pytz.timezone(TIMEZONE)
+
+URL_BASE = URL_FUTUROS
+RUTA_KLINES = "/fapi/v1/klines"
+MAX_LIMIT = 1000                # velas por petición (máximo de Binance)
+HILOS = 8
+
+COLUMNAS_KLINE = [
+    "timestamp", "Open", "High", "Low", "Close", "Volume",
+    "Close_time", "Quote_asset_volume", "Number_of_trades",
+    "Taker_buy_base", "Taker_buy_quote", "Ignore"
+]
+
+# Duración fija de cada intervalo (ms); "1M" no tiene duración fija
+_MS_INTERVALO = almacen_velas.PASO_MS
+# Las velas semanales abren el lunes; la época (1970-01-01) fue jueves
+_DESFASE_MS = {"1w": 4 * 86_400_000}
+
+
+def apertura_actual(interval: str, fin_ms: int = None) -> int:
+    """Apertura (ms UTC) de la vela en curso en `fin_ms` (por defecto, ahora)."""
+    if fin_ms is None:
+        fin_ms = int(time.time() * 1000)
+    return fin_ms - (fin_ms - _DESFASE_MS.get(interval, 0)) % _MS_INTERVALO[interval]
+
+
+def ventanas_rango(interval: str, inicio_ms: int, fin_ms: int) -> list:
+    """
+    Divide las velas que abren en [inicio_ms, fin_ms) en ventanas de hasta
+    MAX_LIMIT velas. `inicio_ms` debe ser una apertura de vela.
+
+    Retorna:
+        list[tuple]: (startTime, endTime, limit) en ms, de la más antigua a la más reciente.
+    """
+    paso = _MS_INTERVALO[interval]
+    salida = []
+    for inicio in range(inicio_ms, fin_ms, MAX_LIMIT * paso):
+        limit = min(MAX_LIMIT, (fin_ms - inicio - 1) // paso + 1)
+        salida.append((inicio, inicio + limit * paso - 1, limit))
+    return salida
+
+
+def ventanas(interval: str, total: int, fin_ms: int = None) -> list:
+    """
+    Divide las últimas `total` velas hasta `fin_ms` (por defecto, ahora) en
+    ventanas independientes de hasta MAX_LIMIT velas.
+
+    Retorna:
+        list[tuple]: (startTime, endTime, limit) en ms, de la más antigua a la más reciente.
+    """
+    paso = _MS_INTERVALO[interval]
+    # Apertura de la vela en curso (incluida, como hace Binance sin startTime)
+    ultima = apertura_actual(interval, fin_ms)
+    return ventanas_rango(interval, ultima - (total - 1) * paso, ultima + paso)
+
+
+def _a_dataframe(filas: list) -> pd.DataFrame:
+    """Filas crudas de klines → DataFrame ["Datetime", "Open", …, "Volume"] ascendente."""
+    if not filas:
+        return pd.DataFrame()
+    crudo = np.array([f[:6] for f in filas], dtype=object)
+    df = pd.DataFrame({
+        "Datetime": pd.to_datetime(crudo[:, 0].astype(np.int64), unit="ms", utc=True).tz_convert(tz_local),
+        "Open": crudo[:, 1].astype(np.float64),
+        "High": crudo[:, 2].astype(np.float64),
+        "Low": crudo[:, 3].astype(np.float64),
+        "Close": crudo[:, 4].astype(np.float64),
+        "Volume": crudo[:, 5].astype(np.float64),
+    })
+    df = df.drop_duplicates(subset=["Datetime"], keep="last").sort_values("Datetime")
+    return df.reset_index(drop=True)
+
+
+def descargar_series(pedidos, hilos: int = HILOS, presupuesto: PresupuestoPeso = None,
+                     url_base: str = URL_BASE, fin_ms: int = None) -> dict:
+    """
+    Descarga varias series a la vez.
+
+    Parámetros:
+        pedidos     (list[tuple])    : (symbol, interval, total) por serie.
+        hilos       (int)            : Peticiones simultáneas.
+        presupuesto (PresupuestoPeso): Opcional, limitador propio en lugar del
+                                       del cliente compartido.
+        url_base    (str)            : Servidor (p. ej. "http://127.0.0.1:8000" para pruebas).
+        fin_ms      (int)            : Opcional, fin del rango (ms UTC); por defecto ahora.
+
+    Retorna:
+        dict: {(SYMBOL, interval): DataFrame ["Datetime", "Open", "High", "Low",
+              "Close", "Volume"] ascendente}; vacío si la serie falló.
+    """
+    tareas = []
+    for symbol, interval, total in pedidos:
+        clave = (symbol.upper(), interval)
+        if interval in _MS_INTERVALO:
+            for inicio, fin, limit in ventanas(interval, int(total), fin_ms):
+                tareas.append((clave, {"symbol": clave[0], "interval": interval,
+                                       "startTime": inicio, "endTime": fin, "limit": limit}))
+        else:
+            # Intervalos sin duración fija ("1M"): una petición con las últimas velas
+            params = {"symbol": clave[0], "interval": interval, "limit": min(int(total), MAX_LIMIT)}
+            if fin_ms is not None:
+                params["endTime"] = fin_ms
+            tareas.append((clave, params))
+    series, fallidas = _ejecutar(tareas, [(s.upper(), i) for s, i, _ in pedidos],
+                                 hilos, presupuesto, url_base)
+    return {clave: pd.DataFrame() if clave in fallidas else df for clave, df in series.items()}
+
+
+def _ejecutar(tareas, claves, hilos: int, presupuesto: PresupuestoPeso, url_base: str) -> dict:
+    """
+    Descarga las tareas (clave, params) en paralelo.
+
+    Retorna:
+        tuple: ({clave: DataFrame}, claves con alguna ventana fallida).
+    """
+    api = cliente(url_base) if presupuesto is None else ClienteBinance(url_base, presupuesto)
+
+    def ejecutar(tarea):
+        clave, params = tarea
+        try:
+            return clave, api.get(RUTA_KLINES, params, peso=peso_klines(params["limit"]))
+        except Exception as e:
+            print(f"❌ Falló la ventana {params.get('startTime')} de {clave[0]} [{clave[1]}]: {e}")
+            return clave, None
+
+    filas = {clave: [] for clave in claves}
+    fallidas = set()
+    with ThreadPoolExecutor(max_workers=max(1, hilos)) as pool:
+        for clave, datos in pool.map(ejecutar, tareas):
+            if datos is None:
+                fallidas.add(clave)
+            else:
+                filas[clave].extend(datos)
+
+    return {clave: _a_dataframe(f) for clave, f in filas.items()}, fallidas
+
+
+def descargar_rangos(symbol: str, interval: str, rangos, hilos: int = HILOS,
+                     presupuesto: PresupuestoPeso = None, url_base: str = URL_BASE) -> pd.DataFrame:
+    """
+    Descarga las velas que abren en cada rango [inicio_ms, fin_ms) de `rangos`
+    (intervalos de duración fija).
+
+    Retorna:
+        pd.DataFrame: Velas ascendentes (vacío si los rangos no tienen velas),
+                      o None si falló alguna ventana.
+    """
+    clave = (symbol.upper(), interval)
+    tareas = [
+        (clave, {"symbol": clave[0], "interval": interval,
+                 "startTime": inicio, "endTime": fin, "limit": limit})
+        for a, b in rangos for inicio, fin, limit in ventanas_rango(interval, a, b)
+    ]
+    series, fallidas = _ejecutar(tareas, [clave], hilos, presupuesto, url_base)
+    return None if fallidas else series[clave]
+
+
+def descargar_klines(symbol: str, interval: str, total: int = 1000, **opciones) -> pd.DataFrame:
+    """descargar_series para una sola serie (mismas opciones)."""
+    return descargar_series([(symbol, interval, total)], **opciones)[(symbol.upper(), interval)]
+
+
+def actualizar_series(pedidos, carpeta: str = "data", **opciones) -> dict:
+    """
+    Descarga las series y las agrega a su almacén data/{SYMBOL}_{interval}.velas.
+
+    Retorna:
+        dict: {(SYMBOL, interval): velas descargadas}.
+    """
+    series = descargar_series(pedidos, **opciones)
+    os.makedirs(carpeta, exist_ok=True)
+    for (symbol, interval), df in series.items():
+        if df.empty:
+            print(f"⚠️ No se obtuvieron datos para {symbol} en intervalo {interval}.")
+            continue
+        ruta = almacen_velas.ruta_almacen(symbol, interval, carpeta)
+        almacen_velas.guardar(ruta, df.set_index("Datetime"))
+        print(f"✅ {symbol} [{interval}]: {len(df)} velas → {ruta}")
+    return series
+
+
+def rangos_faltantes(almacen, interval: str, total: int, fin_ms: int = None) -> list:
+    """
+    Rangos [inicio_ms, fin_ms) a descargar para tener las últimas `total`
+    velas hasta la vela en curso. Lista vacía si el almacén ya las tiene.
+    La vela en curso no se registra como cubierta: si falta, o si el
+    almacén tiene algún hueco sin cubrir, se pide junto con lo que falte
+    hasta ahora.
+    """
+    paso = _MS_INTERVALO[interval]
+    ultima = apertura_actual(interval, fin_ms)
+    primera = ultima - (total - 1) * paso
+    if almacen is None or len(almacen) == 0:
+        return [(primera, ultima + paso)]
+    faltan = [(a // 1_000_000, b // 1_000_000) for a, b in
+              almacen.faltantes(primera * 1_000_000, ultima * 1_000_000)]
+    if int(almacen.marcas()[-1]) // 1_000_000 < ultima:
+        cola = faltan.pop()[0] if faltan and faltan[-1][1] == ultima else ultima
+        faltan.append((cola, ultima + paso))
+    elif faltan and faltan[-1][1] == ultima:
+        faltan[-1] = (faltan[-1][0], ultima + paso)
+    return faltan
+
+
+def actualizar_delta(symbol: str, interval: str, total: int, carpeta: str = "data",
+                     fin_ms: int = None, **opciones):
+    """
+    Completa el almacén data/{SYMBOL}_{interval}.velas para que tenga las
+    últimas `total` velas, descargando solo los rangos que faltan, y
+    registra esos rangos como cubiertos (sin la vela en curso).
+
+    Retorna:
+        AlmacenVelas: El almacén actualizado (None si no hay datos).
+    """
+    ruta = almacen_velas.ruta_almacen(symbol, interval, carpeta)
+    almacen = almacen_velas.abrir(ruta)
+    rangos = rangos_faltantes(almacen, interval, total, fin_ms)
+    if not rangos:
+        return almacen
+
+    velas = sum(-(-(b - a) // _MS_INTERVALO[interval]) for a, b in rangos)
+    print(f"🌐 Descargando {velas} velas faltantes de {symbol.upper()} [{interval}] "
+          f"en {len(rangos)} rango(s) …")
+    df = descargar_rangos(symbol, interval, rangos, **opciones)
+    if df is None:
+        print(f"❌ No se pudieron descargar velas para {symbol.upper()}-{interval}.")
+        return almacen
+    if df.empty and almacen is None:
+        print(f"⚠️ No hay velas de {symbol.upper()} [{interval}] en el rango pedido.")
+        return None
+
+    if not df.empty:
+        os.makedirs(carpeta, exist_ok=True)
+        almacen = almacen_velas.guardar(ruta, df.set_index("Datetime"))
+    cerrada = apertura_actual(interval, fin_ms) * 1_000_000
+    for a, b in rangos:
+        if a * 1_000_000 < cerrada:
+            almacen.cubrir(a * 1_000_000, min(b * 1_000_000, cerrada))
+    print(f"✅ Archivo actualizado: {ruta}")
+    return almacen
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Descarga concurrente de velas de Binance Futures")
+    parser.add_argument("series", nargs="+", help="SYMBOL:INTERVAL[:TOTAL], p. ej. BTCUSDT:1m:100000")
+    parser.add_argument("--hilos", type=int, default=HILOS,
+                        help=f"Peticiones simultáneas (por defecto {HILOS})")
+    parser.add_argument("--url", default=URL_BASE,
+                        help="Servidor de la API (para probar contra un servidor local)")
+    args = parser.parse_args()
+
+    pedidos = []
+    for serie in args.series:
+        partes = serie.split(":")
+        pedidos.append((partes[0], partes[1], int(partes[2]) if len(partes) > 2 else 1000))
+
+    inicio = time.perf_counter()
+    actualizar_series(pedidos, hilos=args.hilos, url_base=args.url)
+    print(f"⏱️ {time.perf_counter() - inicio:.1f}s | {cliente(args.url).estadisticas()}")
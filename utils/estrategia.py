@@ -1,23 +1,43 @@
 # utils/estrategia.py
 
 import os
-from pygame import mixer
+from itertools import product
+
+import numpy as np
 import config
+from utils.parametros import parametros_actuales
 
-# Inicializa el reproductor una vez
-mixer.init()
+# Reproductor de pygame: se importa e inicializa con el primer sonido, no al
+# importar el módulo (los backtests no lo necesitan y puede no haber audio)
+_reproductor = {"mixer": None, "error": None}
 
 # Rutas de sonido
 SONIDO_LONG = os.path.join("wav", "sound2.wav")
 SONIDO_SHORT = os.path.join("wav", "sound3.wav")
 
 
+def _mixer():
+    """pygame.mixer inicializado, o None si no hay pygame o audio (se avisa una sola vez)."""
+    if _reproductor["mixer"] is None and _reproductor["error"] is None:
+        try:
+            from pygame import mixer
+            mixer.init()
+            _reproductor["mixer"] = mixer
+        except Exception as e:
+            _reproductor["error"] = e
+            print(f"⚠️ Sonido desactivado (pygame/audio no disponible): {e}")
+    return _reproductor["mixer"]
+
+
 def reproducir_sonido(ruta):
     """
     Reproduce un archivo de sonido si existe. 
     """
     try:
         if os.path.exists(ruta):
+            mixer = _mixer()
+            if mixer is None:
+                return
             mixer.music.load(ruta)
             mixer.music.play()
         else:
@@ -26,6 +46,137 @@ def reproducir_sonido(ruta):
         print(f"⚠️ Error al reproducir sonido: {e}")
 
 
+def evaluar_senales(df, parametros=None):
+    """
+    Versión vectorizada de evaluar_senal(solo_tipo=True): evalúa las mismas
+    condiciones para todas las velas de df en una sola pasada.
+
+    Usa los mismos umbrales de config.py (RSI_CORTE, ADX_THRESHOLD,
+    DIFERENCIA_DI, SMA_CORTA, SMA_LARGA), salvo que se entregue un conjunto
+    explícito de `parametros`. La posición i del resultado coincide con
+    evaluar_senal(df.iloc[:i+1], solo_tipo=True).
+
+    Parámetros:
+        df         (pd.DataFrame|dict): Velas con columnas de indicadores, o un
+                                        dict {columna: np.ndarray}.
+        parametros (Parametros)       : Opcional, ver utils/parametros.py.
+
+    Retorna:
+        tuple[np.ndarray, np.ndarray]: (long, short), booleanos por vela.
+    """
+    p = parametros if parametros is not None else config
+    try:
+        rsi = np.asarray(df["RSI"], dtype=float)
+        plus_di = np.asarray(df["+DI"], dtype=float)
+        minus_di = np.asarray(df["-DI"], dtype=float)
+        adx = np.asarray(df["ADX"], dtype=float)
+        sma_fast = np.asarray(df[f"SMA{p.SMA_CORTA}"], dtype=float)
+        sma_slow = np.asarray(df[f"SMA{p.SMA_LARGA}"], dtype=float)
+    except KeyError as e:
+        print(f"⚠️ Falta columna en df: {e}.")
+        vacio = np.zeros(len(df["Close"]) if "Close" in df else 0, dtype=bool)
+        return vacio, vacio.copy()
+
+    tendencia = adx > p.ADX_THRESHOLD
+    long_cond = (
+        (rsi > p.RSI_CORTE) &
+        (plus_di > minus_di) &
+        ((plus_di - minus_di) >= p.DIFERENCIA_DI) &
+        tendencia &
+        (sma_fast > sma_slow)
+    )
+    short_cond = (
+        (rsi < p.RSI_CORTE) &
+        (minus_di > plus_di) &
+        ((minus_di - plus_di) >= p.DIFERENCIA_DI) &
+        tendencia &
+        (sma_fast < sma_slow)
+    )
+    # Igual que evaluar_senal: LONG tiene prioridad sobre SHORT
+    short_cond &= ~long_cond
+    return long_cond, short_cond
+
+
+def evaluar_senales_lote(df, lista_parametros):
+    """
+    Evalúa evaluar_senales para muchos conjuntos de umbrales a la vez.
+
+    Cada condición se calcula una sola vez por vela y luego se compara contra
+    todos los umbrales con broadcasting de NumPy: el resultado es una matriz
+    (combinaciones × velas) en lugar de una evaluación por combinación.
+
+    Parámetros:
+        df               (pd.DataFrame|dict): Velas con columnas de indicadores.
+        lista_parametros (list[Parametros]) : Un conjunto de umbrales por fila.
+
+    Retorna:
+        tuple[np.ndarray, np.ndarray]: (long, short) de forma (K, n); la fila k
+        coincide con evaluar_senales(df, lista_parametros[k]).
+    """
+    rsi = np.asarray(df["RSI"], dtype=float)
+    plus_di = np.asarray(df["+DI"], dtype=float)
+    minus_di = np.asarray(df["-DI"], dtype=float)
+    adx = np.asarray(df["ADX"], dtype=float)
+
+    rsi_corte = np.array([p.RSI_CORTE for p in lista_parametros], dtype=float)[:, None]
+    adx_min = np.array([p.ADX_THRESHOLD for p in lista_parametros], dtype=float)[:, None]
+    dif_min = np.array([p.DIFERENCIA_DI for p in lista_parametros], dtype=float)[:, None]
+
+    # Cruce de medias: una fila por par (SMA_CORTA, SMA_LARGA) distinto
+    pares = sorted({(p.SMA_CORTA, p.SMA_LARGA) for p in lista_parametros})
+    fila_par = np.array([pares.index((p.SMA_CORTA, p.SMA_LARGA)) for p in lista_parametros])
+    sma_sube = np.empty((len(pares), len(rsi)), dtype=bool)
+    sma_baja = np.empty((len(pares), len(rsi)), dtype=bool)
+    for fila, (corta, larga) in enumerate(pares):
+        sma_fast = np.asarray(df[f"SMA{corta}"], dtype=float)
+        sma_slow = np.asarray(df[f"SMA{larga}"], dtype=float)
+        sma_sube[fila] = sma_fast > sma_slow
+        sma_baja[fila] = sma_fast < sma_slow
+
+    tendencia = adx[None, :] > adx_min
+    long_cond = (
+        (rsi[None, :] > rsi_corte) &
+        (plus_di > minus_di)[None, :] &
+        ((plus_di - minus_di)[None, :] >= dif_min) &
+        tendencia &
+        sma_sube[fila_par]
+    )
+    short_cond = (
+        (rsi[None, :] < rsi_corte) &
+        (minus_di > plus_di)[None, :] &
+        ((minus_di - plus_di)[None, :] >= dif_min) &
+        tendencia &
+        sma_baja[fila_par]
+    )
+    short_cond &= ~long_cond
+    return long_cond, short_cond
+
+
+def evaluar_senales_grilla(df, rsi_list, adx_list, di_list, parametros=None):
+    """
+    Matriz de señales para toda la grilla RSI_CORTE × ADX_THRESHOLD ×
+    DIFERENCIA_DI (por ejemplo, las listas de grid_config.py).
+
+    Parámetros:
+        df         (pd.DataFrame|dict): Velas con columnas de indicadores.
+        rsi_list, adx_list, di_list (list): Umbrales a combinar.
+        parametros (Parametros)       : Base para el resto de los valores
+                                        (por defecto, config.py).
+
+    Retorna:
+        tuple[list[Parametros], np.ndarray, np.ndarray]: combinaciones en el
+        orden de itertools.product(rsi_list, adx_list, di_list) y sus
+        matrices (long, short) de forma (K, n).
+    """
+    base = parametros if parametros is not None else parametros_actuales()
+    combinaciones = [
+        base._replace(RSI_CORTE=rsi_val, ADX_THRESHOLD=adx_val, DIFERENCIA_DI=dif_val)
+        for rsi_val, adx_val, dif_val in product(rsi_list, adx_list, di_list)
+    ]
+    long_cond, short_cond = evaluar_senales_lote(df, combinaciones)
+    return combinaciones, long_cond, short_cond
+
+
 def evaluar_senal(df, solo_tipo=False):
     if df.empty:
         return None
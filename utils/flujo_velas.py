@@ -0,0 +1,293 @@
+# utils/flujo_velas.py
+
+"""
+Módulo: utils/flujo_velas.py
+
+Velas en vivo por WebSocket (streams <symbol>@kline_<intervalo> de Binance
+Futures), en lugar de consultar la API REST cada 5 segundos:
+
+  - Cada evento actualiza en su lugar la vela en formación del símbolo
+    (SerieVelas.vela).
+  - Un evento de vela cerrada ("x": true) la agrega a la serie en memoria y
+    al almacén del símbolo y llama de inmediato a al_cerrar(symbol, serie)
+    con las velas cerradas.
+  - Si la conexión se corta, se reconecta con espera exponencial. Las velas
+    cerradas que falten entre la última conocida y la del primer evento
+    recibido (corte, arranque o evento perdido) se rellenan por REST.
+  - Si no llega ningún evento en SIN_EVENTOS_S, se da la conexión por caída.
+  - Un mensaje que no es JSON o no tiene la forma de un evento se descarta
+    (y se cuenta) sin cortar la conexión.
+
+Varios símbolos comparten una conexión (stream combinado, hasta
+MAX_STREAMS por conexión) y un solo bucle asyncio. Cada símbolo tiene su
+propio estado (SerieVelas) y su cola de eventos; los eventos de un símbolo
+se aplican en orden, en hilos, para que el relleno por REST o la escritura
+en disco de uno no detenga a los demás.
+
+La URL del WebSocket y la de REST son parámetros, de modo que se puede
+probar contra servidores locales que imiten a Binance.
+
+Uso:
+    flujo = FlujoVelas([SerieVelas("BTCUSDT"), SerieVelas("ETHUSDT")])
+    flujo.ejecutar(al_cerrar=lambda symbol, serie: ...,
+                   al_actualizar=lambda symbol, vela: ...)
+"""
+
+import asyncio
+import json
+import os
+
+import pandas as pd
+import pytz
+import websockets
+
+from config import TIMEZONE, LIMIT, BASE_INTERVAL_STR
+from utils import almacen_velas, binance_data
+from utils.almacen_velas import PASO_MS
+from utils.buffer_velas import BufferVelas, capacidad_en_vivo
+from utils.cliente_binance import URL_FUTUROS, ErrorBinance, cliente, peso_klines
+
+tz_local = pytz.timezone(TIMEZONE)
+
+URL_WS = "wss://fstream.binance.com"
+RUTA_KLINES = "/fapi/v1/klines"
+MAX_STREAMS = 200               # streams por conexión (límite de Binance)
+SIN_EVENTOS_S = 60              # sin eventos en este tiempo se reconecta
+RECONEXION_MAX_S = 30
+
+COLUMNAS = ["Open", "High", "Low", "Close", "Volume",
+            "Quote_asset_volume", "Number_of_trades", "Taker_buy_base", "Taker_buy_quote"]
+# Posición de cada columna en el evento "k" del stream y en las filas de /fapi/v1/klines
+_CAMPOS_EVENTO = ["o", "h", "l", "c", "v", "q", "n", "V", "Q"]
+_CAMPOS_REST = [1, 2, 3, 4, 5, 7, 8, 9, 10]
+
+
+def _a_dataframe(aperturas_ms: list, filas: list) -> pd.DataFrame:
+    """Velas (apertura en ms, valores en el orden de COLUMNAS) → DataFrame como obtener_klines."""
+    indice = pd.to_datetime(aperturas_ms, unit="ms", utc=True).tz_convert(tz_local)
+    df = pd.DataFrame(filas, columns=COLUMNAS, index=indice.rename("timestamp"), dtype=float)
+    df["Number_of_trades"] = df["Number_of_trades"].astype(int)
+    return df
+
+
+class SerieVelas:
+    """
+    Estado de un símbolo: últimas velas cerradas (buffer de tamaño fijo; la
+    historia queda en el almacén data/{SYMBOL}_{intervalo}.velas) y vela en
+    formación.
+
+    Parámetros:
+        symbol   (str): Símbolo (ej. "BTCUSDT").
+        interval (str): Intervalo de las velas.
+        carpeta  (str): Carpeta de los almacenes.
+        ventana  (int): Opcional, máximo de velas cerradas en memoria (por
+                        defecto capacidad_en_vivo(interval)).
+    """
+
+    def __init__(self, symbol: str, interval: str = BASE_INTERVAL_STR, carpeta: str = "data",
+                 ventana: int = None):
+        self.symbol = symbol.upper()
+        self.interval = interval
+        self.ruta = almacen_velas.ruta_almacen(self.symbol, interval, carpeta)
+        self.ventana = ventana or capacidad_en_vivo(interval)
+        self.vela = None            # vela en formación (pd.Series, se actualiza en su lugar)
+        self._buffer = None
+
+    def _cargado(self) -> BufferVelas:
+        """Buffer de velas cerradas (se llena desde el almacén la primera vez)."""
+        if self._buffer is None:
+            self._buffer = BufferVelas(self.ventana)
+            self._buffer.agregar(almacen_velas.cargar(self.ruta, ultimas=self.ventana))
+        return self._buffer
+
+    def cerradas(self) -> pd.DataFrame:
+        """Velas cerradas en memoria."""
+        return self._cargado().a_dataframe()
+
+    def ultima_ms(self):
+        """Apertura (ms) de la última vela cerrada, o None si no hay."""
+        ultima = self._cargado().ultima_marca()
+        return None if ultima is None else ultima.value // 1_000_000
+
+    def incorporar(self, cerradas: pd.DataFrame) -> pd.DataFrame:
+        """Agrega las velas cerradas posteriores a la última conocida (memoria y almacén)."""
+        buffer = self._cargado()
+        ultima = buffer.ultima_marca()
+        if ultima is not None:
+            cerradas = cerradas[cerradas.index > ultima]
+        if cerradas.empty:
+            return buffer.a_dataframe()
+        if almacen_velas.existe(self.ruta):
+            almacen_velas.AlmacenVelas(self.ruta).agregar(cerradas)
+        else:
+            os.makedirs(os.path.dirname(self.ruta), exist_ok=True)
+            almacen_velas.crear(self.ruta, cerradas)
+        buffer.agregar(cerradas)
+        return buffer.a_dataframe()
+
+
+class SerieLocal(SerieVelas):
+    """SerieVelas del bucle de main.py: la serie en memoria de utils/binance_data.py."""
+
+    def __init__(self):
+        super().__init__(binance_data.SYMBOL, binance_data.BASE_INTERVAL_STR)
+
+    def cerradas(self) -> pd.DataFrame:
+        return binance_data.serie_local()
+
+    def ultima_ms(self):
+        df = self.cerradas()
+        return None if df.empty else df.index[-1].value // 1_000_000
+
+    def incorporar(self, cerradas: pd.DataFrame) -> pd.DataFrame:
+        return binance_data.incorporar_cerradas(cerradas)
+
+
+class FlujoVelas:
+    """
+    Streams de velas de una o varias series del mismo intervalo.
+
+    Parámetros:
+        series   (list[SerieVelas]): Por defecto, la serie de utils/binance_data.py.
+        url_ws   (str)             : Servidor del WebSocket (por defecto Binance Futures).
+        url_rest (str)             : Servidor REST para rellenar huecos.
+    """
+
+    def __init__(self, series=None, url_ws: str = URL_WS, url_rest: str = URL_FUTUROS):
+        series = list(series) if series else [SerieLocal()]
+        self.series = {s.symbol: s for s in series}
+        self.interval = series[0].interval
+        self.paso_ms = PASO_MS[self.interval]
+        streams = [f"{s.lower()}@kline_{self.interval}" for s in self.series]
+        self.urls = [f"{url_ws.rstrip('/')}/stream?streams=" + "/".join(streams[i:i + MAX_STREAMS])
+                     for i in range(0, len(streams), MAX_STREAMS)]
+        self.url_rest = url_rest
+        self.reconexiones = 0
+        self.rellenadas = 0
+        self.descartados = 0        # mensajes del stream que no son eventos de vela
+
+    def rellenar(self, serie: SerieVelas, hasta_ms: int):
+        """Descarga por REST las velas cerradas que abren antes de `hasta_ms` y faltan en la serie."""
+        ultima = serie.ultima_ms()
+        desde = hasta_ms - LIMIT * self.paso_ms if ultima is None else ultima + self.paso_ms
+        while desde < hasta_ms:
+            limit = min(LIMIT, (hasta_ms - desde) // self.paso_ms)
+            params = {"symbol": serie.symbol, "interval": self.interval,
+                      "startTime": desde, "endTime": hasta_ms - 1, "limit": limit}
+            try:
+                filas = cliente(self.url_rest).get(RUTA_KLINES, params, peso=peso_klines(limit))
+            except ErrorBinance as e:
+                print(f"❌ No se pudo rellenar el hueco de velas de {serie.symbol}: {e}")
+                return
+            if not filas:
+                return
+            serie.incorporar(_a_dataframe([f[0] for f in filas], [[f[i] for i in _CAMPOS_REST] for f in filas]))
+            self.rellenadas += len(filas)
+            desde = filas[-1][0] + self.paso_ms
+
+    def procesar(self, evento: dict):
+        """
+        Aplica un evento del stream a la serie de su símbolo.
+
+        Retorna:
+            pd.DataFrame: Velas cerradas del símbolo si el evento cerró una vela;
+                          None si solo actualizó la vela en formación (o era antiguo).
+        """
+        datos = evento.get("data", evento)
+        serie = self.series.get(datos["s"].upper())
+        if serie is None:
+            return None
+        k = datos["k"]
+        apertura = k["t"]
+        ultima = serie.ultima_ms()
+        if ultima is not None and apertura <= ultima:
+            return None
+        if ultima is None or apertura > ultima + self.paso_ms:
+            self.rellenar(serie, apertura)
+
+        valores = [k[c] for c in _CAMPOS_EVENTO]
+        if k["x"]:
+            serie.vela = None
+            return serie.incorporar(_a_dataframe([apertura], [valores]))
+
+        marca = pd.Timestamp(apertura, unit="ms", tz="UTC").tz_convert(tz_local)
+        if serie.vela is None or serie.vela.name != marca:
+            serie.vela = pd.Series(0.0, index=COLUMNAS, name=marca)
+        serie.vela.iloc[:] = [float(v) for v in valores]
+        return None
+
+    async def _conectar(self, url: str, colas: dict, terminado: asyncio.Event):
+        """
+        Recibe los eventos de una conexión y los reparte en la cola de cada
+        símbolo hasta que se marque `terminado` (en Python 3.11 wait_for puede
+        tragarse la cancelación si el mensaje llega a la vez, de ahí el chequeo).
+        """
+        espera = 1
+        while not terminado.is_set():
+            try:
+                async with websockets.connect(url) as ws:
+                    print(f"🔌 Conectado al stream de velas ({url.count('@')} símbolos)")
+                    espera = 1
+                    while not terminado.is_set():
+                        mensaje = await asyncio.wait_for(ws.recv(), SIN_EVENTOS_S)
+                        try:
+                            evento = json.loads(mensaje)
+                            symbol = evento.get("data", evento).get("s", "").upper()
+                        except (ValueError, AttributeError, TypeError):
+                            self.descartados += 1
+                            print(f"⚠️ Mensaje del stream descartado (no es un evento de vela): {mensaje[:80]!r}")
+                            continue
+                        cola = colas.get(symbol)
+                        if cola is not None:
+                            cola.put_nowait(evento)
+            except (OSError, asyncio.TimeoutError, websockets.exceptions.WebSocketException) as e:
+                if terminado.is_set():
+                    return
+                self.reconexiones += 1
+                print(f"⚠️ Stream de velas interrumpido ({e or type(e).__name__}); reconexión en {espera}s")
+                await asyncio.sleep(espera)
+                espera = min(espera * 2, RECONEXION_MAX_S)
+
+    async def escuchar(self, al_cerrar, al_actualizar=None, cierres: int = None):
+        """
+        Escucha los streams hasta `cierres` velas cerradas en total (None =
+        sin fin), reconectando ante cortes.
+
+        Parámetros:
+            al_cerrar     (callable): al_cerrar(symbol, serie) con las velas cerradas, al cerrar cada vela.
+            al_actualizar (callable): Opcional, al_actualizar(symbol, vela) en cada evento de la vela en formación.
+            cierres       (int)     : Opcional, cantidad de cierres antes de terminar.
+        """
+        colas = {symbol: asyncio.Queue() for symbol in self.series}
+        terminado = asyncio.Event()
+        restantes = [cierres]
+
+        async def aplicar(symbol: str):
+            serie, cola = self.series[symbol], colas[symbol]
+            while True:
+                evento = await cola.get()
+                try:
+                    cerradas = await asyncio.to_thread(self.procesar, evento)
+                    if cerradas is not None:
+                        al_cerrar(symbol, cerradas)
+                        if restantes[0] is not None:
+                            restantes[0] -= 1
+                            if restantes[0] <= 0:
+                                terminado.set()
+                    elif al_actualizar is not None and serie.vela is not None:
+                        al_actualizar(symbol, serie.vela)
+                except Exception as e:
+                    print(f"❌ Error al procesar una vela de {symbol}: {e}")
+
+        tareas = [asyncio.create_task(aplicar(symbol)) for symbol in self.series]
+        tareas += [asyncio.create_task(self._conectar(url, colas, terminado)) for url in self.urls]
+        try:
+            await terminado.wait()
+        finally:
+            for tarea in tareas:
+                tarea.cancel()
+            await asyncio.gather(*tareas, return_exceptions=True)
+
+    def ejecutar(self, al_cerrar, al_actualizar=None, cierres: int = None):
+        """Versión bloqueante de escuchar()."""
+        asyncio.run(self.escuchar(al_cerrar, al_actualizar, cierres))
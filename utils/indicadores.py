@@ -1,8 +1,29 @@
 # utils/indicadores.py
 
 import pandas as pd
-from ta.momentum import RSIIndicator
-from ta.volatility import BollingerBands
+
+# Periodos usados por calcular_indicadores
+PERIODOS_SMA = (9, 20, 100, 200)
+PERIODO_BB = 20
+DESVIO_BB = 2
+PERIODO_RSI = 14
+PERIODO_ADX = 14
+# Periodos de calentamiento de las RMA/EWM (RSI, ADX): tras 20 × 14 velas el
+# valor inicial pesa (13/14)^280 ≈ 1e-9 en el resultado
+CALENTAMIENTO_RMA = 20
+
+
+def periodos_indicadores():
+    """Tupla con todos los periodos de calcular_indicadores (útil como clave de caché)."""
+    return (PERIODOS_SMA, PERIODO_BB, DESVIO_BB, PERIODO_RSI, PERIODO_ADX)
+
+def velas_necesarias():
+    """
+    Velas (del intervalo de análisis) que necesita calcular_indicadores para
+    que la última fila no dependa de dónde empieza la historia: la SMA más
+    larga o el calentamiento de las RMA, lo que sea mayor.
+    """
+    return max(max(PERIODOS_SMA), PERIODO_BB, CALENTAMIENTO_RMA * max(PERIODO_RSI, PERIODO_ADX))
 
 def rma(series, length):
     return series.ewm(alpha=1 / length, adjust=False).mean()
@@ -41,19 +62,21 @@ def calcular_adx(df, window=14):
     return df
 
 def calcular_indicadores(df):
-    df["SMA9"] = df["Close"].rolling(window=9).mean()
-    df["SMA20"] = df["Close"].rolling(window=20).mean()
-    df["SMA100"] = df["Close"].rolling(window=100).mean()
-    df["SMA200"] = df["Close"].rolling(window=200).mean()
+    # ta se importa al primer cálculo, no al importar el módulo (arranque más rápido)
+    from ta.momentum import RSIIndicator
+    from ta.volatility import BollingerBands
+
+    for periodo in PERIODOS_SMA:
+        df[f"SMA{periodo}"] = df["Close"].rolling(window=periodo).mean()
 
-    bb = BollingerBands(close=df["Close"], window=20, window_dev=2)
+    bb = BollingerBands(close=df["Close"], window=PERIODO_BB, window_dev=DESVIO_BB)
     df["BB_Media"] = bb.bollinger_mavg()
     df["BB_Superior"] = bb.bollinger_hband()
     df["BB_Inferior"] = bb.bollinger_lband()
 
-    rsi = RSIIndicator(close=df["Close"], window=14)
+    rsi = RSIIndicator(close=df["Close"], window=PERIODO_RSI)
     df["RSI"] = rsi.rsi()
 
-    df = calcular_adx(df, window=14)
+    df = calcular_adx(df, window=PERIODO_ADX)
 
     return df
@@ -0,0 +1,245 @@
+# utils/indicadores_incrementales.py
+
+"""
+Módulo: utils/indicadores_incrementales.py
+
+Los mismos indicadores de utils/indicadores.py (SMA, Bollinger, RSI, +DI/-DI
+y ADX), pero calculados vela a vela en el bucle en vivo. calcular_indicadores
+recalcula todo el historial en cada ciclo solo para usar la última fila.
+
+IndicadoresIncrementales guarda el estado de cada indicador: sumas móviles
+de los cierres y el valor de cada media RMA/EWM. Al cerrar una vela todo se
+actualiza en tiempo constante. Para la vela en formación se obtiene un valor
+provisional sin modificar el estado.
+
+Las medias exponenciales replican a pandas (ewm(adjust=False), incluido el
+tratamiento de NaN y min_periods), de modo que el resultado coincide con
+calcular_indicadores sobre las mismas velas, salvo diferencias de redondeo.
+
+Uso:
+    motor = IndicadoresIncrementales()
+    df_final = indicadores_en_vivo(df, motor)   # en cada ciclo; DataFrame de una fila
+    mostrar_ultimo(df_final, symbol); evaluar_senal(df_final)
+"""
+
+import math
+from collections import deque
+from itertools import islice
+
+import pandas as pd
+
+from config import ANALYSIS_INTERVAL
+from utils.resample import resamplear
+from utils.indicadores import PERIODOS_SMA, PERIODO_BB, DESVIO_BB, PERIODO_RSI, PERIODO_ADX
+
+COLUMNAS = ([f"SMA{p}" for p in PERIODOS_SMA] + ["BB_Media", "BB_Superior", "BB_Inferior", "RSI"]
+            + ["+DI", "-DI", "ADX"])
+RESINCRONIZAR = 1000            # cada tantas velas las sumas móviles se recalculan (evita arrastre de redondeo)
+
+_NAN = float("nan")
+_MINUTO_NS = 60 * 10**9
+_COLUMNAS_VELA = ["Open", "High", "Low", "Close", "Volume"]       # las que conserva resamplear
+
+
+def _dividir(a: float, b: float) -> float:
+    """a / b con la semántica de pandas: x/0 = ±inf y 0/0 = NaN."""
+    if b == 0:
+        if a == 0 or a != a:
+            return _NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+class _Ewm:
+    """Estado de series.ewm(alpha, adjust=False, min_periods).mean() (igual que pandas)."""
+
+    __slots__ = ("alfa", "min_obs", "estado")
+
+    def __init__(self, alfa: float, min_obs: int = 0):
+        self.alfa = alfa
+        self.min_obs = max(min_obs, 1)
+        self.estado = (_NAN, 1.0, 0)        # (media, peso anterior, observaciones)
+
+    def siguiente(self, x: float) -> tuple:
+        """Estado tras agregar x (sin aplicarlo)."""
+        media, peso, obs = self.estado
+        es_obs = x == x
+        obs += es_obs
+        if media == media:
+            peso *= 1.0 - self.alfa
+            if es_obs:
+                if media != x:
+                    media = (peso * media + self.alfa * x) / (peso + self.alfa)
+                peso = 1.0
+        elif es_obs:
+            media = x
+        return media, peso, obs
+
+    def valor(self, estado: tuple) -> float:
+        media, _, obs = estado
+        return media if obs >= self.min_obs else _NAN
+
+
+class IndicadoresIncrementales:
+    """
+    Indicadores de calcular_indicadores actualizados en O(1) por vela.
+
+    Las velas deben llegar en orden y ser las mismas que recibiría
+    calcular_indicadores (por ejemplo, ya resampleadas a ANALYSIS_INTERVAL).
+    """
+
+    def __init__(self):
+        self._periodos = sorted(set(PERIODOS_SMA) | {PERIODO_BB})
+        self._cierres = deque(maxlen=self._periodos[-1])
+        self._sumas = {p: 0.0 for p in self._periodos}
+        self._previa = None                 # (High, Low, Close) de la última vela cerrada
+        self._rsi = (_Ewm(1 / PERIODO_RSI, PERIODO_RSI), _Ewm(1 / PERIODO_RSI, PERIODO_RSI))
+        self._adx = tuple(_Ewm(1 / PERIODO_ADX) for _ in range(4))     # TR, +DM, -DM, DX
+        self.velas = 0
+        self.ultima = None                  # índice de la última vela cerrada
+        self.valores = None                 # indicadores de esa vela
+
+    def _calcular(self, high: float, low: float, close: float) -> tuple:
+        """Indicadores de una vela nueva y el estado resultante, sin aplicarlo."""
+        cierres = self._cierres
+        n = len(cierres) + 1
+        sumas = {p: self._sumas[p] + close - (cierres[-p] if len(cierres) >= p else 0.0)
+                 for p in self._periodos}
+        valores = {f"SMA{p}": sumas[p] / p if n >= p else _NAN for p in PERIODOS_SMA}
+
+        if n >= PERIODO_BB:
+            media = sumas[PERIODO_BB] / PERIODO_BB
+            ventana = islice(cierres, len(cierres) - PERIODO_BB + 1, None)
+            varianza = (sum((x - media) ** 2 for x in ventana) + (close - media) ** 2) / PERIODO_BB
+            desvio = math.sqrt(varianza)
+            valores.update(BB_Media=media, BB_Superior=media + DESVIO_BB * desvio,
+                           BB_Inferior=media - DESVIO_BB * desvio)
+        else:
+            valores.update(BB_Media=_NAN, BB_Superior=_NAN, BB_Inferior=_NAN)
+
+        # RSI (ta.momentum.RSIIndicator): la primera diferencia cuenta como 0
+        if self._previa is None:
+            sube = baja = 0.0
+            plus_dm = minus_dm = 0.0
+            tr = high - low
+        else:
+            high_prev, low_prev, close_prev = self._previa
+            dif = close - close_prev
+            sube = dif if dif > 0 else 0.0
+            baja = -dif if dif < 0 else 0.0
+            up_move = high - high_prev
+            down_move = low_prev - low
+            plus_dm = up_move if up_move > down_move and up_move > 0 else 0.0
+            minus_dm = down_move if down_move > up_move and down_move > 0 else 0.0
+            tr = max(high - low, abs(high - close_prev), abs(low - close_prev))
+
+        ewm_sube, ewm_baja = self._rsi
+        estados_rsi = (ewm_sube.siguiente(sube), ewm_baja.siguiente(baja))
+        media_sube, media_baja = ewm_sube.valor(estados_rsi[0]), ewm_baja.valor(estados_rsi[1])
+        valores["RSI"] = 100.0 if media_baja == 0 else 100 - 100 / (1 + _dividir(media_sube, media_baja))
+
+        # ADX con RMA (utils/indicadores.py: calcular_adx)
+        ewm_tr, ewm_plus, ewm_minus, ewm_dx = self._adx
+        estados_adx = [ewm_tr.siguiente(tr), ewm_plus.siguiente(plus_dm), ewm_minus.siguiente(minus_dm)]
+        tr_rma, plus_rma, minus_rma = (e.valor(s) for e, s in zip(self._adx, estados_adx))
+        plus_di = _dividir(100 * plus_rma, tr_rma)
+        minus_di = _dividir(100 * minus_rma, tr_rma)
+        dx = _dividir(100 * abs(plus_di - minus_di), plus_di + minus_di)
+        estados_adx.append(ewm_dx.siguiente(dx))
+        valores.update({"+DI": plus_di, "-DI": minus_di, "ADX": ewm_dx.valor(estados_adx[3])})
+
+        return valores, (sumas, estados_rsi, estados_adx)
+
+    def agregar(self, vela) -> dict:
+        """
+        Incorpora una vela cerrada.
+
+        Parámetros:
+            vela (pd.Series|dict): Con High, Low y Close (el nombre de la
+                                   Series queda como `ultima`).
+
+        Retorna:
+            dict: {columna: valor} de los indicadores de esa vela (ver COLUMNAS).
+        """
+        high, low, close = float(vela["High"]), float(vela["Low"]), float(vela["Close"])
+        valores, (sumas, estados_rsi, estados_adx) = self._calcular(high, low, close)
+
+        self._cierres.append(close)
+        self.velas += 1
+        if self.velas % RESINCRONIZAR == 0:
+            for p in self._periodos:
+                if len(self._cierres) >= p:
+                    sumas[p] = math.fsum(islice(self._cierres, len(self._cierres) - p, None))
+        self._sumas = sumas
+        for ewm, estado in zip(self._rsi + self._adx, estados_rsi + tuple(estados_adx)):
+            ewm.estado = estado
+        self._previa = (high, low, close)
+        self.ultima = getattr(vela, "name", None)
+        self.valores = valores
+        return valores
+
+    def provisional(self, vela) -> dict:
+        """Indicadores que tendría la vela en formación si cerrara así (no cambia el estado)."""
+        return self._calcular(float(vela["High"]), float(vela["Low"]), float(vela["Close"]))[0]
+
+    def actualizar(self, cerradas: pd.DataFrame, en_formacion=None) -> pd.DataFrame:
+        """
+        Incorpora las velas de `cerradas` posteriores a la última procesada y
+        devuelve la última fila como la daría calcular_indicadores: la de
+        `en_formacion` (valores provisionales) si se entrega, o la última cerrada.
+
+        Parámetros:
+            cerradas     (pd.DataFrame)          : Velas cerradas (OHLCV), en orden.
+            en_formacion (pd.Series|pd.DataFrame): Opcional, vela aún abierta.
+
+        Retorna:
+            pd.DataFrame: Una fila con las columnas de la vela más las de COLUMNAS
+                          (vacío si aún no hay velas).
+        """
+        nuevas = cerradas if self.ultima is None else \
+            cerradas.iloc[cerradas.index.searchsorted(self.ultima, side="right"):]
+        for marca, high, low, close in zip(nuevas.index, nuevas["High"], nuevas["Low"], nuevas["Close"]):
+            self.agregar({"High": high, "Low": low, "Close": close})
+            self.ultima = marca
+
+        if isinstance(en_formacion, pd.DataFrame):
+            en_formacion = en_formacion.iloc[-1] if not en_formacion.empty else None
+        if en_formacion is not None:
+            vela, valores = en_formacion, self.provisional(en_formacion)
+        elif self.ultima is not None and self.ultima in cerradas.index:
+            vela, valores = cerradas.loc[self.ultima], self.valores
+        else:
+            return pd.DataFrame(columns=list(cerradas.columns) + COLUMNAS)
+        return pd.DataFrame([{**vela.to_dict(), **valores}],
+                            index=pd.Index([vela.name], name=cerradas.index.name))
+
+
+def indicadores_en_vivo(df: pd.DataFrame, motor: IndicadoresIncrementales, en_formacion=None,
+                        interval: str = ANALYSIS_INTERVAL) -> pd.DataFrame:
+    """
+    Reemplazo de calcular_indicadores(resamplear(df, interval)) para el bucle
+    en vivo: solo se remuestrean las velas desde la última incorporada al
+    motor. La última vela remuestreada (la que puede seguir abierta) se evalúa
+    como provisional y las anteriores se incorporan.
+
+    Parámetros:
+        df           (pd.DataFrame)            : Velas base, en orden (puede incluir la vela en formación).
+        motor        (IndicadoresIncrementales): Estado del símbolo.
+        en_formacion (pd.Series)               : Opcional, vela base en formación que no está en df.
+        interval     (str)                     : Intervalo de análisis.
+
+    Retorna:
+        pd.DataFrame: Última fila con indicadores (ver IndicadoresIncrementales.actualizar).
+    """
+    if motor.ultima is not None:
+        df = df.iloc[df.index.searchsorted(motor.ultima):]
+    if en_formacion is not None:
+        df = pd.concat([df, en_formacion.to_frame().T])
+    paso = pd.Timedelta(interval).value
+    if paso <= _MINUTO_NS and not (df.index.asi8 % paso).any():
+        # Velas ya alineadas al intervalo (p. ej. 1m con ANALYSIS_INTERVAL="1min"):
+        # remuestrear no cambiaría nada y es lo más caro del ciclo.
+        df_resampled = df[_COLUMNAS_VELA].dropna()
+    else:
+        df_resampled = resamplear(df, interval)
+    return motor.actualizar(df_resampled.iloc[:-1], df_resampled.iloc[-1:])
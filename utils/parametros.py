@@ -0,0 +1,48 @@
+# utils/parametros.py
+
+"""
+Módulo: utils/parametros.py
+
+Conjunto inmutable de parámetros de estrategia y backtest.
+
+Los scripts históricos leen y modifican variables globales de config.py
+(config.RSI_CORTE, config.TP, …), lo que impide ejecutar varias combinaciones
+a la vez. `Parametros` agrupa esos mismos valores en una tupla inmutable que
+se pasa explícitamente a evaluar_senales / run_backtest y que puede enviarse
+sin problemas a otros procesos.
+
+Los nombres de los campos son los mismos de config.py.
+
+Ejemplo:
+    base = parametros_actuales()
+    p = base._replace(RSI_CORTE=55, TP=6)
+"""
+
+from typing import NamedTuple
+
+import config
+
+
+class Parametros(NamedTuple):
+    RSI_CORTE: float
+    ADX_THRESHOLD: float
+    DIFERENCIA_DI: float
+    SMA_CORTA: int
+    SMA_LARGA: int
+    TP: float
+    SL: float
+    APALANCAMIENTO: float
+    CONFIRMACION_AVISO: int
+    SALDO_INICIAL: float
+    DIAS_TEST: int
+    LIMITE_DRAWDOWN: float = None
+
+
+def parametros_actuales() -> Parametros:
+    """
+    Toma una instantánea de los valores actuales de config.py.
+
+    Retorna:
+        Parametros: Tupla con los valores vigentes en este momento.
+    """
+    return Parametros(**{campo: getattr(config, campo) for campo in Parametros._fields})
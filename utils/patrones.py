@@ -1,24 +1,79 @@
 # utils/patrones.py
 
+import numpy as np
+import pandas as pd
+
 from utils.patrones_velas import *
 
+# Patrones en el orden de precedencia de determinar_patron_dominante:
+# (nombre, función, mensaje). Los cuatro primeros son de dos velas.
+PATRONES = [
+    ("estrella_amanecer", es_estrella_amanecer, "🌅 Estrella del amanecer: Posible reversión alcista"),
+    ("estrella_atardecer", es_estrella_atardecer, "🌇 Estrella del atardecer: Posible reversión bajista"),
+    ("harami_alcista", es_harami_alcista, "🟢 Harami alcista: Posible reversión alcista"),
+    ("harami_bajista", es_harami_bajista, "🔻 Harami bajista: Posible reversión bajista"),
+    ("hammer", es_hammer, "🔨 Hammer: Posible rebote alcista tras caída"),
+    ("hanging_man", es_hanging_man, "🚨 Hanging Man: Advertencia de reversión bajista"),
+    ("inverted_hammer", es_inverted_hammer, "🪓 Inverted Hammer: Posible reversión alcista"),
+    ("shooting_star", es_shooting_star, "🌠 Shooting Star: Posible reversión bajista"),
+    ("doji", es_doji, "⚠️ Doji: Señal de indecisión"),
+]
+_DOS_VELAS = 4
+SIN_PATRON = -1
+
+
 def determinar_patron_dominante(vela_anterior, vela):
-    if es_estrella_amanecer(vela_anterior, vela):
-        return "🌅 Estrella del amanecer: Posible reversión alcista"
-    elif es_estrella_atardecer(vela_anterior, vela):
-        return "🌇 Estrella del atardecer: Posible reversión bajista"
-    elif es_harami_alcista(vela_anterior, vela):
-        return "🟢 Harami alcista: Posible reversión alcista"
-    elif es_harami_bajista(vela_anterior, vela):
-        return "🔻 Harami bajista: Posible reversión bajista"
-    elif es_hammer(vela):
-        return "🔨 Hammer: Posible rebote alcista tras caída"
-    elif es_hanging_man(vela):
-        return "🚨 Hanging Man: Advertencia de reversión bajista"
-    elif es_inverted_hammer(vela):
-        return "🪓 Inverted Hammer: Posible reversión alcista"
-    elif es_shooting_star(vela):
-        return "🌠 Shooting Star: Posible reversión bajista"
-    elif es_doji(vela):
-        return "⚠️ Doji: Señal de indecisión"
-    return None
\ No newline at end of file
+    for i, (_, es_patron, mensaje) in enumerate(PATRONES):
+        if es_patron(vela_anterior, vela) if i < _DOS_VELAS else es_patron(vela):
+            return mensaje
+    return None
+
+
+def detectar_patrones(df) -> pd.DataFrame:
+    """
+    Todos los patrones de PATRONES para todas las velas de df en una sola
+    pasada vectorizada (patrones_vectorizados), sin llamar a las funciones
+    es_* fila por fila. Los de dos velas comparan cada vela con la anterior.
+
+    Parámetros:
+        df (pd.DataFrame|dict): Velas con Open, High, Low y Close.
+
+    Retorna:
+        pd.DataFrame: Una columna booleana por patrón, en orden de precedencia
+                      (mismo índice que df si es un DataFrame).
+    """
+    columnas = patrones_vectorizados(df["Open"], df["High"], df["Low"], df["Close"])
+    indice = df.index if isinstance(df, pd.DataFrame) else None
+    return pd.DataFrame({nombre: columnas[nombre] for nombre, _, _ in PATRONES}, index=indice)
+
+
+def mascara_patrones(df) -> np.ndarray:
+    """
+    Patrones de cada vela como máscara de bits: el bit k indica PATRONES[k].
+
+    Retorna:
+        np.ndarray: uint16, una máscara por vela.
+    """
+    columnas = patrones_vectorizados(df["Open"], df["High"], df["Low"], df["Close"])
+    mascara = np.zeros(len(columnas["doji"]), dtype=np.uint16)
+    for k, (nombre, _, _) in enumerate(PATRONES):
+        mascara |= columnas[nombre].astype(np.uint16) << k
+    return mascara
+
+
+def patron_dominante(df) -> np.ndarray:
+    """
+    Versión vectorizada de determinar_patron_dominante: la posición i es el
+    patrón que daría determinar_patron_dominante(df.iloc[i-1], df.iloc[i]).
+    En la primera vela solo se evalúan los patrones de una vela.
+
+    Retorna:
+        np.ndarray: int8, índice en PATRONES del patrón dominante de cada vela
+                    o SIN_PATRON (-1). El mensaje es PATRONES[k][2].
+    """
+    columnas = patrones_vectorizados(df["Open"], df["High"], df["Low"], df["Close"])
+    dominante = np.full(len(columnas["doji"]), SIN_PATRON, dtype=np.int8)
+    # De menor a mayor precedencia: cada patrón pisa a los que van después
+    for k in reversed(range(len(PATRONES))):
+        dominante[columnas[PATRONES[k][0]]] = k
+    return dominante
@@ -1,5 +1,7 @@
 # utils/patrones_velas.py
 
+import numpy as np
+
 def es_doji(vela):
     cuerpo = abs(vela["Close"] - vela["Open"])
     mecha_superior = vela["High"] - max(vela["Close"], vela["Open"])
@@ -56,3 +58,51 @@ def es_estrella_atardecer(vela_anterior, vela):
         vela["Open"] > vela_anterior["Close"] and
         vela["Close"] < vela_anterior["Open"]
     )
+
+
+def patrones_vectorizados(open_, high, low, close):
+    """
+    Las mismas condiciones de las funciones es_* para todas las velas a la
+    vez (arreglos NumPy, sin recorrer filas en Python).
+
+    Los patrones de dos velas comparan cada vela con la anterior; en la
+    primera vela son False.
+
+    Parámetros:
+        open_, high, low, close (array-like): Precios, uno por vela.
+
+    Retorna:
+        dict[str, np.ndarray]: {nombre sin "es_": booleanos por vela}.
+    """
+    o = np.asarray(open_, dtype=float)
+    h = np.asarray(high, dtype=float)
+    l = np.asarray(low, dtype=float)
+    c = np.asarray(close, dtype=float)
+
+    cuerpo = np.abs(c - o)
+    arriba = np.maximum(c, o)
+    abajo = np.minimum(c, o)
+    mecha_superior = h - arriba
+    mecha_inferior = abajo - l
+    sube = c > o
+    baja = c < o
+
+    # Vela anterior de cada vela (la primera no tiene: NaN, sus comparaciones dan False)
+    o_ant = np.full_like(o, np.nan)
+    c_ant = np.full_like(c, np.nan)
+    o_ant[1:] = o[:-1]
+    c_ant[1:] = c[:-1]
+    ant_baja = c_ant < o_ant
+    ant_sube = c_ant > o_ant
+
+    return {
+        "estrella_amanecer": ant_baja & (o < c_ant) & (c > o_ant),
+        "estrella_atardecer": ant_sube & (o > c_ant) & (c < o_ant),
+        "harami_alcista": ant_baja & sube & (o > c_ant) & (c < o_ant),
+        "harami_bajista": ant_sube & baja & (o < c_ant) & (c > o_ant),
+        "hammer": (mecha_inferior > cuerpo * 2) & sube,
+        "hanging_man": (mecha_inferior > cuerpo * 2) & baja,
+        "inverted_hammer": (mecha_superior > cuerpo * 2) & baja,
+        "shooting_star": (mecha_superior > cuerpo * 2) & baja,
+        "doji": cuerpo < (mecha_superior + mecha_inferior) * 0.3,
+    }
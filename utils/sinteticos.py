@@ -0,0 +1,58 @@
+# utils/sinteticos.py
+
+"""
+Módulo: utils/sinteticos.py
+
+Velas OHLCV sintéticas y reproducibles (semilla fija) para medir y probar
+sin conexión a Binance. El precio sigue un paseo aleatorio geométrico con
+tramos de tendencia, de modo que los indicadores y la estrategia generan
+señales y operaciones como con datos reales.
+"""
+
+import numpy as np
+import pandas as pd
+
+from config import TIMEZONE
+
+
+def generar_velas(n: int, semilla: int = 42, frecuencia: str = "1min",
+                  inicio: str = "2024-01-01", precio_inicial: float = 30000.0) -> pd.DataFrame:
+    """
+    Genera `n` velas OHLCV.
+
+    Parámetros:
+        n              (int)  : Cantidad de velas.
+        semilla        (int)  : Semilla del generador (mismo valor → mismas velas).
+        frecuencia     (str)  : Frecuencia de pandas entre velas ("1min", "15min", …).
+        inicio         (str)  : Fecha UTC de la primera vela.
+        precio_inicial (float): Close de referencia inicial.
+
+    Retorna:
+        pd.DataFrame: Columnas Open, High, Low, Close, Volume con índice
+                      "Datetime" en la zona horaria de config.TIMEZONE.
+    """
+    rng = np.random.default_rng(semilla)
+
+    # Deriva que cambia por tramos (tendencias) + ruido
+    tramos = max(1, n // 500)
+    deriva = np.repeat(rng.normal(0, 0.0001, tramos), -(-n // tramos))[:n]
+    retornos = deriva + rng.normal(0, 0.0005, n)
+    cierre = precio_inicial * np.exp(np.cumsum(retornos))
+
+    apertura = np.empty(n)
+    apertura[0] = precio_inicial
+    apertura[1:] = cierre[:-1]
+    mechas = np.abs(rng.normal(0, 0.0002, (2, n)))
+    maximo = np.maximum(apertura, cierre) * (1 + mechas[0])
+    minimo = np.minimum(apertura, cierre) * (1 - mechas[1])
+    volumen = rng.lognormal(mean=3.0, sigma=0.5, size=n)
+
+    indice = pd.date_range(pd.Timestamp(inicio, tz="UTC"), periods=n, freq=frecuencia)
+    indice = indice.tz_convert(TIMEZONE).rename("Datetime")
+    return pd.DataFrame({
+        "Open": apertura,
+        "High": maximo,
+        "Low": minimo,
+        "Close": cierre,
+        "Volume": volumen,
+    }, index=indice)
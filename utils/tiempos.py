@@ -0,0 +1,200 @@
+# utils/tiempos.py
+
+"""
+Módulo: utils/tiempos.py
+
+Medición por etapas (tiempo de reloj, llamadas y filas procesadas) de
+run_backtest y mass_test.py, para saber dónde se va el tiempo de una grilla:
+
+  - datos       : _asegurar_datos (lectura del CSV o descarga).
+  - indicadores : calcular_indicadores.
+  - recorte     : recorte a los últimos DIAS_TEST días.
+  - senales     : evaluación de señales (por lote en backtest_lote).
+  - huellas     : huellas de señales/niveles para reutilizar simulaciones.
+  - simulacion  : recorrido de las velas (simular_tp_sl o bucle de run_backtest).
+  - metricas    : armado de las métricas de cada backtest.
+
+Está apagada por defecto. Se enciende con la variable de entorno
+TIEMPOS_ETAPAS=1 o con activar() (mass_test.py --tiempos). Apagada, etapa()
+y combinacion() devuelven un contexto vacío compartido: no se toma el reloj
+ni se guarda nada.
+
+Cada medición se suma al total de su etapa y, si ocurre dentro de
+combinacion(...), también a esa combinación (p. ej. símbolo / intervalo /
+total / umbrales). resumen() imprime la tabla y volcar() guarda todo en JSON.
+"""
+
+import json
+import os
+import time
+from contextlib import nullcontext
+
+_NULO = nullcontext()
+
+_estado = {"activo": os.environ.get("TIEMPOS_ETAPAS", "").lower() in ("1", "true", "si", "sí")}
+_pila = []                 # partes de la combinación actual
+_agregado = {}             # etapa -> [segundos, llamadas, filas]
+_por_combinacion = {}      # "parte / parte" -> {etapa: [segundos, llamadas, filas]}
+
+
+def activar(valor: bool = True):
+    """Enciende (o apaga) la medición."""
+    _estado["activo"] = bool(valor)
+
+
+def activo() -> bool:
+    return _estado["activo"]
+
+
+def _sumar(destino: dict, nombre: str, segundos: float, llamadas: int, filas: int):
+    acumulado = destino.get(nombre)
+    if acumulado is None:
+        destino[nombre] = [segundos, llamadas, filas]
+    else:
+        acumulado[0] += segundos
+        acumulado[1] += llamadas
+        acumulado[2] += filas
+
+
+class _Cronometro:
+    __slots__ = ("nombre", "filas", "inicio")
+
+    def __init__(self, nombre: str, filas: int):
+        self.nombre = nombre
+        self.filas = filas
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        segundos = time.perf_counter() - self.inicio
+        _sumar(_agregado, self.nombre, segundos, 1, self.filas)
+        if _pila:
+            _sumar(_por_combinacion.setdefault(" / ".join(_pila), {}),
+                   self.nombre, segundos, 1, self.filas)
+        return False
+
+
+class _Combinacion:
+    __slots__ = ("partes",)
+
+    def __init__(self, partes):
+        self.partes = partes
+
+    def __enter__(self):
+        _pila.extend(self.partes)
+        return self
+
+    def __exit__(self, *exc):
+        del _pila[len(_pila) - len(self.partes):]
+        return False
+
+
+def etapa(nombre: str, filas: int = 0):
+    """
+    Contexto que mide una etapa.
+
+    Parámetros:
+        nombre (str): Nombre de la etapa ("senales", "simulacion", …).
+        filas  (int): Filas (velas) procesadas por esta llamada.
+
+    Uso:
+        with tiempos.etapa("indicadores", len(df)):
+            df = calcular_indicadores(df)
+    """
+    if not _estado["activo"]:
+        return _NULO
+    return _Cronometro(nombre, filas)
+
+
+def combinacion(*partes):
+    """
+    Contexto que asigna las mediciones internas a una combinación. Se puede
+    anidar (símbolo / intervalo / total y, dentro, los umbrales). Las partes
+    se convierten a texto solo si la medición está activa.
+    """
+    if not _estado["activo"]:
+        return _NULO
+    return _Combinacion([str(p) for p in partes])
+
+
+def contexto() -> tuple:
+    """Partes de la combinación actual (para reproducirla en otro proceso)."""
+    return tuple(_pila)
+
+
+def limpiar():
+    """Borra todas las mediciones."""
+    _agregado.clear()
+    _por_combinacion.clear()
+
+
+def extraer() -> dict:
+    """Devuelve las mediciones de este proceso y las borra (para combinar())."""
+    datos = {"agregado": dict(_agregado), "por_combinacion": dict(_por_combinacion)}
+    limpiar()
+    return datos
+
+
+def combinar(datos: dict):
+    """Suma las mediciones devueltas por extraer() en otro proceso."""
+    for nombre, (segundos, llamadas, filas) in datos["agregado"].items():
+        _sumar(_agregado, nombre, segundos, llamadas, filas)
+    for clave, etapas in datos["por_combinacion"].items():
+        destino = _por_combinacion.setdefault(clave, {})
+        for nombre, (segundos, llamadas, filas) in etapas.items():
+            _sumar(destino, nombre, segundos, llamadas, filas)
+
+
+def _fila(segundos: float, llamadas: int, filas: int) -> dict:
+    return {
+        "segundos": round(segundos, 6),
+        "llamadas": llamadas,
+        "filas": filas,
+        "ms_por_llamada": round(segundos * 1000 / llamadas, 4) if llamadas else None,
+        "filas_por_seg": round(filas / segundos, 1) if segundos > 0 and filas else None,
+    }
+
+
+def estadisticas() -> dict:
+    """{"agregado": {etapa: métricas}, "por_combinacion": {combinación: {etapa: métricas}}}."""
+    return {
+        "agregado": {nombre: _fila(*v) for nombre, v in _agregado.items()},
+        "por_combinacion": {
+            clave: {nombre: _fila(*v) for nombre, v in etapas.items()}
+            for clave, etapas in _por_combinacion.items()
+        },
+    }
+
+
+def resumen(mas_lentas: int = 5):
+    """Imprime la tabla por etapa y las `mas_lentas` combinaciones más costosas."""
+    if not _agregado:
+        print("⏱️ Sin mediciones por etapa.")
+        return
+
+    total = sum(v[0] for v in _agregado.values()) or 1.0
+    print("\n" + "*"*70)
+    print("Tiempo por etapa:\n")
+    print(f"{'etapa':<14}{'llamadas':>10}{'filas':>14}{'segundos':>11}{'%':>7}{'ms/llam.':>11}{'filas/s':>13}")
+    for nombre, (segundos, llamadas, filas) in sorted(_agregado.items(), key=lambda e: -e[1][0]):
+        por_seg = f"{filas / segundos:13,.0f}" if segundos > 0 and filas else f"{'-':>13}"
+        print(f"{nombre:<14}{llamadas:>10,}{filas:>14,}{segundos:>11.3f}{segundos / total:>7.1%}"
+              f"{segundos * 1000 / llamadas:>11.3f}{por_seg}")
+
+    if _por_combinacion and mas_lentas:
+        print(f"\nCombinaciones más lentas ({len(_por_combinacion)} medidas):\n")
+        costo = sorted(_por_combinacion.items(), key=lambda e: -sum(v[0] for v in e[1].values()))
+        for clave, etapas in costo[:mas_lentas]:
+            detalle = ", ".join(f"{n}={v[0] * 1000:.1f}ms" for n, v in
+                                sorted(etapas.items(), key=lambda e: -e[1][0]))
+            print(f"  {clave}: {sum(v[0] for v in etapas.values()) * 1000:.1f} ms ({detalle})")
+    print("*"*70 + "\n")
+
+
+def volcar(ruta: str):
+    """Guarda estadisticas() en un archivo JSON."""
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(estadisticas(), f, indent=2, ensure_ascii=False)
+    print(f"💾 Tiempos por etapa guardados en {ruta}")
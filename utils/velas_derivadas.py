@@ -0,0 +1,211 @@
+# utils/velas_derivadas.py
+# python -m utils.velas_derivadas BTCUSDT              todos los intervalos
+# python -m utils.velas_derivadas BTCUSDT 5m 15m 1h
+
+"""
+Módulo: utils/velas_derivadas.py
+
+Velas de intervalos mayores (3m … 1M) construidas a partir del almacén de
+1m (utils/almacen_velas.py), en lugar de descargar y guardar cada intervalo
+por separado. Con una sola serie de 1m se sirven todos los intervalos de
+grid_config.INTERVAL_LIST.
+
+Cada intervalo derivado se guarda como un almacén más en
+data/derivadas/{SYMBOL}_{intervalo}.velas y se actualiza de forma
+incremental: solo se recalcula la última vela derivada (que puede estar
+incompleta) con las velas de 1m desde su apertura. Si la serie de 1m cambió
+antes de ese punto (más historia o huecos rellenados), el intervalo se
+reconstruye completo. El estado queda en origen.json dentro del almacén
+derivado.
+
+Alineación de los bordes, en la zona horaria local (config.TIMEZONE):
+  - Intervalos menores a un día: cada vela abre en un múltiplo del
+    intervalo contado desde la medianoche local. Hasta 1h coincide con las
+    velas de Binance (las diferencias horarias son de horas completas).
+  - 1d, 3d, 1w y 1M: días, semanas (desde el lunes) y meses locales, con los
+    días de 23 o 25 horas de los cambios de horario.
+
+Agregación: Open primera, High máximo, Low mínimo, Close última y las
+columnas de volumen sumadas (Number_of_trades queda en SIN_DATO_ENTERO si
+falta en alguna vela de 1m). Las velas sin ninguna vela de 1m no se crean,
+igual que resamplear() con dropna().
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytz
+
+from config import TIMEZONE
+from utils import almacen_velas
+from utils.almacen_velas import PASO_MS, SIN_DATO_ENTERO
+
+tz_local = pytz.timezone(TIMEZONE)
+
+BASE = "1m"
+INTERVALOS = ["3m", "5m", "15m", "30m", "1h", "2h", "4h", "6h", "8h", "12h",
+              "1d", "3d", "1w", "1M"]
+
+_NS_DIA = 86_400 * 10**9
+
+
+def ruta_derivada(symbol: str, interval: str, carpeta: str = "data") -> str:
+    """data/derivadas/{SYMBOL}_{interval}.velas"""
+    return almacen_velas.ruta_almacen(symbol, interval, os.path.join(carpeta, "derivadas"))
+
+
+def _aperturas(marcas: np.ndarray, interval: str) -> np.ndarray:
+    """Apertura (ns UTC) de la vela de `interval` a la que pertenece cada marca de 1m."""
+    pared = (pd.DatetimeIndex(marcas.view("M8[ns]")).tz_localize("UTC")
+             .tz_convert(tz_local).tz_localize(None).asi8)
+    paso = PASO_MS.get(interval, 0) * 1_000_000
+    if 0 < paso < _NS_DIA:
+        # Misma diferencia horaria que la marca: las horas repetidas no se mezclan
+        return marcas - pared % paso
+
+    if interval == "1M":
+        inicio = pared.view("M8[ns]").astype("M8[M]").astype("M8[ns]").view(np.int64)
+    else:
+        dias = pared // _NS_DIA
+        if interval == "3d":
+            dias = dias - dias % 3
+        elif interval == "1w":
+            # La época (1970-01-01) fue jueves: los lunes son el día 4 (mód 7)
+            dias = dias - (dias - 4) % 7
+        inicio = dias * _NS_DIA
+    # Medianoche local → UTC (solo una vez por vela derivada)
+    unicos, posiciones = np.unique(inicio, return_inverse=True)
+    locales = (pd.DatetimeIndex(unicos.view("M8[ns]"))
+               .tz_localize(tz_local, ambiguous=True, nonexistent="shift_forward")
+               .tz_convert("UTC").asi8)
+    return locales[posiciones]
+
+
+def agrupar(marcas: np.ndarray, columnas: dict, interval: str) -> tuple:
+    """
+    Agrega velas de 1m (marcas ns UTC ascendentes, {columna: arreglo}) en velas
+    de `interval`.
+
+    Retorna:
+        tuple: (aperturas ns UTC, {columna: arreglo}) de las velas derivadas.
+    """
+    if len(marcas) == 0:
+        return marcas[:0], {c: v[:0] for c, v in columnas.items()}
+    aperturas = _aperturas(marcas, interval)
+    inicios = np.flatnonzero(np.r_[True, aperturas[1:] != aperturas[:-1]])
+    finales = np.r_[inicios[1:] - 1, len(marcas) - 1]
+
+    salida = {}
+    for c, v in columnas.items():
+        if c == "Open":
+            salida[c] = v[inicios]
+        elif c == "Close":
+            salida[c] = v[finales]
+        elif c == "High":
+            salida[c] = np.maximum.reduceat(v, inicios)
+        elif c == "Low":
+            salida[c] = np.minimum.reduceat(v, inicios)
+        elif v.dtype.kind == "i":
+            suma = np.add.reduceat(v, inicios)
+            salida[c] = np.where(np.minimum.reduceat(v, inicios) == SIN_DATO_ENTERO, SIN_DATO_ENTERO, suma)
+        else:
+            salida[c] = np.add.reduceat(v, inicios)
+    return aperturas[inicios], salida
+
+
+def agregar_velas(df: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """Versión con DataFrame de agrupar(): velas de 1m (DatetimeIndex) → velas de `interval`."""
+    indice = pd.DatetimeIndex(df.index)
+    if indice.tz is None:
+        indice = indice.tz_localize(tz_local)
+    aperturas, columnas = agrupar(indice.tz_convert("UTC").asi8,
+                                  {c: df[c].to_numpy() for c in df.columns}, interval)
+    nuevo = pd.DatetimeIndex(aperturas.view("M8[ns]")).tz_localize("UTC").tz_convert(tz_local)
+    return pd.DataFrame(columnas, index=nuevo.rename(df.index.name or "Datetime"))
+
+
+def _leer_origen(ruta: str):
+    try:
+        with open(os.path.join(ruta, "origen.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _guardar_origen(ruta: str, origen: dict):
+    temporal = os.path.join(ruta, "origen.json.tmp")
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(origen, f)
+    os.replace(temporal, os.path.join(ruta, "origen.json"))
+
+
+def actualizar(symbol: str, interval: str, carpeta: str = "data"):
+    """
+    Pone al día el almacén derivado de `interval` con el almacén de 1m.
+
+    Retorna:
+        AlmacenVelas: El almacén derivado (None si no hay velas de 1m).
+    """
+    fuente = almacen_velas.abrir(almacen_velas.ruta_almacen(symbol, BASE, carpeta))
+    if fuente is None or len(fuente) == 0:
+        return None
+    marcas = fuente.marcas()
+    ruta = ruta_derivada(symbol, interval, carpeta)
+    destino = almacen_velas.abrir(ruta, importar=False)
+    origen = _leer_origen(ruta) if destino is not None else None
+
+    # Incremental solo si la serie de 1m no cambió antes del último corte
+    incremental = (
+        destino is not None and len(destino) > 0 and origen is not None
+        and origen["primera"] == int(marcas[0])
+        and int(np.searchsorted(marcas, origen["corte"])) == origen["filas"]
+        and set(destino.tipos) == set(fuente.tipos)
+    )
+    desde = int(np.searchsorted(marcas, destino.marcas()[-1])) if incremental else 0
+    aperturas, columnas = agrupar(marcas[desde:], {c: fuente.columna(c)[desde:] for c in fuente.columnas},
+                                  interval)
+    indice = pd.DatetimeIndex(aperturas.view("M8[ns]")).tz_localize("UTC").tz_convert(tz_local)
+    df = pd.DataFrame(columnas, index=indice.rename("Datetime"))
+
+    if not incremental:
+        destino = almacen_velas.crear(ruta, df, dict(fuente.tipos), interval)
+    else:
+        previas = destino.marcas()[-1:]
+        sin_cambios = (len(aperturas) == 1 and aperturas[0] == previas[0]
+                       and all(np.array_equal(columnas[c], destino.columna(c)[-1:], equal_nan=True)
+                               for c in destino.columnas))
+        if sin_cambios:
+            return destino
+        destino.reemplazar_cola(df)
+
+    corte = int(destino.marcas()[-1])
+    _guardar_origen(ruta, {"primera": int(marcas[0]), "corte": corte,
+                           "filas": int(np.searchsorted(marcas, corte))})
+    return destino
+
+
+def cargar_derivadas(symbol: str, interval: str, ultimas: int = None, columnas=None,
+                     carpeta: str = "data") -> pd.DataFrame:
+    """
+    Velas de `interval` derivadas del almacén de 1m (actualizadas antes de
+    leer), con el mismo formato que almacen_velas.cargar().
+    """
+    if actualizar(symbol, interval, carpeta) is None:
+        return pd.DataFrame()
+    return almacen_velas.cargar(ruta_derivada(symbol, interval, carpeta), ultimas, columnas)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python -m utils.velas_derivadas SYMBOL [INTERVALO …]")
+        sys.exit(1)
+    simbolo = sys.argv[1]
+    for intervalo in sys.argv[2:] or INTERVALOS:
+        almacen = actualizar(simbolo, intervalo)
+        if almacen is None:
+            print(f"⚠️ No hay velas de {BASE} para {simbolo.upper()} en data/.")
+            break
+        print(f"✅ {simbolo.upper()} [{intervalo}]: {len(almacen)} velas → {almacen.ruta}")